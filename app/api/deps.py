@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status
 
 from app.api.v1.services.auth import AuthService, get_auth_service, oauth2_scheme
-from app.db.models.users import UserPublic, UserInDB
+from app.db.models.users import UserPublic, UserInDB, UserRole
 
 
 async def get_current_active_user(
@@ -17,7 +17,7 @@ async def get_current_active_user(
 async def get_current_admin_user(
         current_user: UserPublic = Depends(get_current_active_user)
 ) -> UserPublic:
-    if current_user.role not in ["admin", "super_admin"]:
+    if current_user.role not in [UserRole.ADMIN, UserRole.SUPER_ADMIN]:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
@@ -1,12 +1,138 @@
 import logging
+from datetime import datetime
+from typing import List, Optional
 
-from fastapi import APIRouter, Header, Response
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, status
+
+from app.api.deps import get_current_admin_user
+from app.api.v1.services.heatmap import HeatmapService, get_heatmap_service
+from app.db.managers.analytics import AnalyticsManager, ROLLUP_DIMENSIONS, get_analytics_manager
+from app.db.managers.jobs import JobManager, get_job_manager
+from app.db.models.analytics import DurationMetric, DurationRow, RollupGranularity, RollupRow
+from app.db.models.jobs import JobType
+from app.db.models.reports import ReportCategory, ReportPriority, ReportStatus
+from app.db.models.users import UserPublic
+from app.db.snapshot import report_snapshot
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/")
-def verify(authorization: str = Header(None)) -> Response:
-    return Response("{'success': True, 'route': 'analytics'}")
+def parse_group_by(group_by: str, allowed: tuple) -> List[str]:
+    keys = [key.strip() for key in group_by.split(",") if key.strip()]
+    unknown = set(keys) - set(allowed)
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Cannot group by {', '.join(sorted(unknown))}"
+        )
+    return keys
+
+
+@router.get("/reports", response_model=List[RollupRow])
+async def report_activity(
+        granularity: RollupGranularity = RollupGranularity.DAY,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        zone: Optional[str] = None,
+        category: Optional[ReportCategory] = None,
+        priority: Optional[ReportPriority] = None,
+        report_status: Optional[ReportStatus] = Query(None, alias="status"),
+        group_by: str = Query("bucket,status", description="Comma separated: bucket, zone, category, priority, status"),
+        current_user: UserPublic = Depends(get_current_admin_user),
+        analytics_manager: AnalyticsManager = Depends(get_analytics_manager)
+):
+    """
+    Reports entering each status per hour / day, read from pre-aggregated rollups.
+    With granularity=current, the number of reports currently in each status.
+    """
+    allowed = ROLLUP_DIMENSIONS if granularity == RollupGranularity.CURRENT else ("bucket", *ROLLUP_DIMENSIONS)
+    return await analytics_manager.query(
+        granularity,
+        {"zone": zone, "category": category, "priority": priority, "status": report_status},
+        parse_group_by(group_by, allowed),
+        start,
+        end
+    )
+
+
+@router.get("/durations", response_model=List[DurationRow])
+async def report_durations(
+        metric: DurationMetric = DurationMetric.RESOLUTION,
+        granularity: RollupGranularity = RollupGranularity.DAY,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        zone: Optional[str] = None,
+        category: Optional[ReportCategory] = None,
+        priority: Optional[ReportPriority] = None,
+        group_by: str = Query("", description="Comma separated: zone, category, priority"),
+        current_user: UserPublic = Depends(get_current_admin_user),
+        analytics_manager: AnalyticsManager = Depends(get_analytics_manager)
+):
+    """
+    p50 / p90 / p99 in seconds of time to resolution or to first intervention,
+    for reports reaching that point in the period (within ANALYTICS_SKETCH_ACCURACY)
+    """
+    if granularity == RollupGranularity.CURRENT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Durations are only kept per hour or day"
+        )
+    return await analytics_manager.durations(
+        metric,
+        granularity,
+        {"zone": zone, "category": category, "priority": priority},
+        parse_group_by(group_by, ("zone", "category", "priority")),
+        [0.5, 0.9, 0.99],
+        start,
+        end
+    )
+
+
+@router.get("/counts")
+async def report_counts(
+        by: str = Query("status", pattern="^(category|status|priority)$"),
+        category: Optional[ReportCategory] = None,
+        report_status: Optional[ReportStatus] = Query(None, alias="status"),
+        priority: Optional[ReportPriority] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        current_user: UserPublic = Depends(get_current_admin_user)
+) -> dict:
+    """Number of reports per category, status or priority, counted on the in-memory snapshot"""
+    await report_snapshot.refresh()
+    mask = report_snapshot.select(category, report_status, priority, start, end)
+    return {"version": report_snapshot.version, "counts": report_snapshot.count_by(by, mask)}
+
+
+@router.get("/heatmap/{z}/{x}/{y}")
+async def report_heatmap(
+        z: int = Path(..., ge=0, le=22),
+        x: int = Path(..., ge=0),
+        y: int = Path(..., ge=0),
+        size: int = Query(256, ge=16, le=1024),
+        category: Optional[ReportCategory] = None,
+        report_status: Optional[ReportStatus] = Query(None, alias="status"),
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        heatmap_service: HeatmapService = Depends(get_heatmap_service)
+) -> dict:
+    """
+    Report density grid (size x size) of a z/x/y map tile, filtered by category,
+    status and creation date. Only non-empty cells are returned as [row, col, count].
+    """
+    if x >= 2 ** z or y >= 2 ** z:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tile out of range")
+    return await heatmap_service.get_tile(z, x, y, size, category, report_status, start, end)
+
+
+@router.post("/backfill")
+async def backfill_rollups(
+        current_user: UserPublic = Depends(get_current_admin_user),
+        job_manager: JobManager = Depends(get_job_manager)
+):
+    """Queue a rebuild of all rollups from the reports collection (admin only)"""
+    job_id = await job_manager.enqueue(JobType.ANALYTICS_BACKFILL, priority=-10)
+    return {"message": "Analytics rollups rebuild queued", "job_id": job_id}
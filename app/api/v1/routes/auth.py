@@ -1,7 +1,7 @@
 import logging
 from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 
 from app.api.v1.routes.utils import response_helper
@@ -21,7 +21,6 @@ router = APIRouter()
 @router.post("/register", response_model=UserPublic)
 async def register(
         user_create: UserCreate,
-        background_tasks: BackgroundTasks,
         auth_service: AuthService = Depends(get_auth_service),
         email_service: EmailService = Depends(get_email_service),
         user_manager: UserManager = Depends(get_user_manager)
@@ -38,12 +37,11 @@ async def register(
     verification_token = auth_service.create_email_verification_token(user.email)
     verification_url = f"{settings.FRONTEND_URL}/verify-email?token={verification_token}"
 
-    # email_service.send_email_background(
-    #     background_tasks,
+    # await email_service.queue_email(
     #     "Verify your email",
     #     [user.email],
     #     "verify_email.html",
-    #     {"verification_url": verification_url, "user": user}
+    #     {"verification_url": verification_url, "user": {"full_name": user.full_name}}
     # )
     return response_helper(user)
 
@@ -97,7 +95,6 @@ async def refresh_access_token(
 @router.post("/password-reset/request")
 async def request_password_reset(
         request: PasswordResetRequest,
-        background_tasks: BackgroundTasks,
         auth_service: AuthService = Depends(get_auth_service),
         email_service: EmailService = Depends(get_email_service),
         user_manager=Depends(get_user_manager)
@@ -107,12 +104,12 @@ async def request_password_reset(
         reset_token = auth_service.create_password_reset_token(user.email)
         reset_url = f"{settings.FRONTEND_URL}/reset-password?token={reset_token}"
 
-        email_service.send_email_background(
-            background_tasks,
+        await email_service.queue_email(
             "Password Reset Request",
             [user.email],
             "password_reset.html",
-            {"reset_url": reset_url, "user": user}
+            {"reset_url": reset_url, "user": {"full_name": user.full_name}},
+            priority=10
         )
 
     # Always return success to prevent email enumeration
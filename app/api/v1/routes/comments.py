@@ -1,12 +1,55 @@
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Header, Response
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_active_user
+from app.api.v1.services.comments import CommentService, get_comment_service
+from app.db.models.comments import Comment, CommentCreate, CommentPage, CommentTarget
+from app.db.models.users import UserPublic, UserRole
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/")
-def verify(authorization: str = Header(None)) -> Response:
-    return Response("{'success': True, 'route': 'comments'}")
+@router.get("/{target_type}/{target_id}", response_model=CommentPage)
+async def list_comments(
+        target_type: CommentTarget,
+        target_id: str,
+        cursor: Optional[str] = None,
+        comment_service: CommentService = Depends(get_comment_service)
+):
+    """Comments of a report or intervention, newest first; pass next_cursor to read older ones"""
+    return await comment_service.list_comments(target_type, target_id, cursor)
+
+
+@router.post("/{target_type}/{target_id}", response_model=Comment)
+async def add_comment(
+        target_type: CommentTarget,
+        target_id: str,
+        comment_create: CommentCreate,
+        current_user: UserPublic = Depends(get_current_active_user),
+        comment_service: CommentService = Depends(get_comment_service)
+):
+    """Comment on a report or intervention, or reply to a comment with parent_seq"""
+    return await comment_service.add_comment(target_type, target_id, comment_create, str(current_user.id))
+
+
+@router.delete("/{target_type}/{target_id}/{seq}")
+async def delete_comment(
+        target_type: CommentTarget,
+        target_id: str,
+        seq: int,
+        current_user: UserPublic = Depends(get_current_active_user),
+        comment_service: CommentService = Depends(get_comment_service)
+):
+    """Delete a comment (its author or an admin); replies keep their place in the thread"""
+    await comment_service.delete_comment(
+        target_type,
+        target_id,
+        seq,
+        str(current_user.id),
+        is_admin=current_user.role in [UserRole.ADMIN, UserRole.SUPER_ADMIN]
+    )
+    return {"message": "Comment deleted successfully"}
@@ -0,0 +1,50 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from app.api.deps import get_current_active_user
+from app.api.v1.services.events import EventHub, Subscription, get_event_hub
+from app.core.configs import settings
+from app.db.models.users import UserPublic
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+
+def event_stream(event_hub: EventHub, subscription: Subscription) -> StreamingResponse:
+    return StreamingResponse(event_hub.stream(subscription), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
+@router.get("/")
+async def stream_events(
+        report_id: List[str] = Query([]),
+        zone: List[str] = Query([]),
+        event_hub: EventHub = Depends(get_event_hub)
+):
+    """
+    Server-Sent Events of report and intervention status changes for the given
+    reports and/or zones. A `resync` event means some events were dropped
+    because the client read too slowly; refetch the state it cares about.
+    """
+    if not report_id and not zone:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Give at least one report_id or zone")
+    if len(report_id) + len(zone) > settings.EVENTS_MAX_FILTERS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.EVENTS_MAX_FILTERS} report ids and zones per stream"
+        )
+    return event_stream(event_hub, Subscription(report_ids=report_id, zones=zone))
+
+
+@router.get("/me")
+async def stream_my_events(
+        current_user: UserPublic = Depends(get_current_active_user),
+        event_hub: EventHub = Depends(get_event_hub)
+):
+    """Server-Sent Events of changes on the current user's reports and interventions"""
+    return event_stream(event_hub, Subscription(user_id=str(current_user.id)))
@@ -1,16 +1,23 @@
+from datetime import date, datetime
 from typing import Optional, List
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, Query, status
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_admin_user
+from app.api.v1.services.dispatch import DispatchService, get_dispatch_service
+from app.api.v1.services.uploads import intervention_photo_upload
 from app.api.v1.services.interventions import InterventionService, get_intervention_service
+from app.api.v1.services.media_urls import MediaUrlService, get_media_url_service
 from app.db.models.base import PyObjectId
 from app.db.models.interventions import (
     InterventionCreate,
     InterventionPublic,
-    InterventionUpdate
+    InterventionStatus,
+    InterventionUpdate,
+    RoutePlan,
+    TechnicianSuggestion
 )
-from app.db.models.users import UserInDB
+from app.db.models.users import UserInDB, UserRole
 
 router = APIRouter()
 
@@ -18,63 +25,83 @@ router = APIRouter()
 @router.post("/", response_model=InterventionPublic)
 async def create_intervention(
         intervention_data: InterventionCreate,
-        current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        auto_assign: bool = False,
+        current_user: UserInDB = Depends(get_current_admin_user),
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
-    """Create a new intervention (admin only)"""
-    if current_user.role not in ["admin", "super_admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can create interventions"
-        )
+    """Create a new intervention (admin only), optionally assigning the best nearby technician"""
+    return media_urls.sign_intervention(await intervention_service.create_intervention(
+        intervention_data,
+        str(current_user.id),
+        auto_assign
+    ))
 
-    return await intervention_service.create_intervention(intervention_data)
+
+@router.get("/report/{report_id}/suggested-technicians", response_model=List[TechnicianSuggestion])
+async def suggest_technicians(
+        report_id: str,
+        limit: int = Query(5, ge=1, le=50),
+        max_distance: Optional[float] = Query(None, gt=0, description="In meters"),
+        current_user: UserInDB = Depends(get_current_admin_user),
+        dispatch_service: DispatchService = Depends(get_dispatch_service)
+):
+    """Rank technicians for a report by distance, open interventions and availability (admin only)"""
+    return await dispatch_service.suggest_technicians(report_id, limit, max_distance)
 
 
 @router.get("/{intervention_id}", response_model=InterventionPublic)
 async def get_intervention(
         intervention_id: str,
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get intervention details"""
     intervention = await intervention_service.get_intervention(intervention_id)
     if not intervention:
         raise HTTPException(status_code=404, detail="Intervention not found")
-    return intervention
+    return media_urls.sign_intervention(intervention)
 
 
 @router.put("/{intervention_id}/status", response_model=InterventionPublic)
 async def update_intervention_status(
         intervention_id: str,
-        report_id: str,
-        new_status: str,
+        new_status: InterventionStatus,
         current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update intervention status (technician only)"""
-    return await intervention_service.update_intervention_status(
+    intervention = await intervention_service.update_intervention_status(
         intervention_id,
-        report_id,
         new_status,
         str(current_user.id)
     )
+    if not intervention:
+        raise HTTPException(status_code=404, detail="Intervention not found")
+    return media_urls.sign_intervention(intervention)
 
 
-@router.post("/{intervention_id}/photos", response_model=InterventionPublic)
+@router.post(
+    "/{intervention_id}/photos",
+    response_model=InterventionPublic,
+    openapi_extra=intervention_photo_upload.openapi()
+)
 async def add_intervention_photo(
         intervention_id: str,
-        photo: UploadFile = File(...),
         photo_type: str = "progress",
         current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        photo: UploadFile = Depends(intervention_photo_upload),
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Add photo to intervention (technician only)"""
     # Todo: check current user rights
-    return await intervention_service.add_intervention_photo(
+    return media_urls.sign_intervention(await intervention_service.add_intervention_photo(
         intervention_id,
         photo,
         photo_type
-    )
+    ))
 
 
 @router.post("/{intervention_id}/complete-step", response_model=InterventionPublic)
@@ -83,13 +110,14 @@ async def complete_step(
         step_name: str,
         current_user: UserInDB = Depends(get_current_active_user),
         # Todo: check current user rights
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Mark a step as completed (technician only)"""
-    return await intervention_service.complete_intervention_step(
+    return media_urls.sign_intervention(await intervention_service.complete_intervention_step(
         intervention_id,
         step_name
-    )
+    ))
 
 
 @router.put("/{intervention_id}", response_model=InterventionPublic)
@@ -98,16 +126,25 @@ async def update_intervention(
         update_data: InterventionUpdate,
         current_user: UserInDB = Depends(get_current_active_user),
         # Todo: check current user rights
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update intervention details (technician only)"""
-    intervention = await intervention_service.intervention_manager.update(
-        intervention_id,
-        update_data.dict(exclude_unset=True)
-    )
+    fields = update_data.dict(exclude_unset=True)
+    # Status changes go through the state machine to keep the report in sync
+    new_status = fields.pop("status", None)
+    if new_status:
+        await intervention_service.update_intervention_status(
+            intervention_id,
+            new_status,
+            str(current_user.id)
+        )
+    if fields:
+        await intervention_service.intervention_manager.update(intervention_id, fields)
+    intervention = await intervention_service.get_intervention(intervention_id)
     if not intervention:
         raise HTTPException(status_code=404, detail="Intervention not found")
-    return intervention
+    return media_urls.sign_intervention(intervention)
 
 
 @router.post("/{intervention_id}/assign-technicians", response_model=InterventionPublic)
@@ -115,29 +152,24 @@ async def assign_technicians(
         intervention_id: str,
         technician_ids: List[str],
         is_primary: bool = False,
-        current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        current_user: UserInDB = Depends(get_current_admin_user),
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Assign technicians to intervention (admin only)"""
-    if current_user.role not in ["admin", "super_admin"]:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Only admins can assign technicians"
-        )
-
-    return await intervention_service.assign_technicians_to_intervention(
+    return media_urls.sign_intervention(await intervention_service.assign_technicians_to_intervention(
         intervention_id,
         technician_ids,
         is_primary
-    )
+    ))
 
 
 @router.post("/{intervention_id}/complete", response_model=InterventionPublic)
 async def complete_intervention(
         intervention_id: str,
-        report_id: str,
         current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Mark intervention as completed (assigned technician only)"""
     # Verify current user is assigned to this intervention
@@ -151,24 +183,24 @@ async def complete_intervention(
             detail="You are not assigned to this intervention"
         )
 
-    return await intervention_service.complete_intervention(
+    return media_urls.sign_intervention(await intervention_service.complete_intervention(
         intervention_id,
-        report_id,
         str(current_user.id)
-    )
+    ))
 
 
 @router.get("/report/{report_id}", response_model=List[InterventionPublic])
 async def get_report_interventions(
         report_id: str,
         intervention_status: Optional[str] = None,
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get all interventions for a report"""
-    return await intervention_service.intervention_manager.get_report_interventions(
+    return media_urls.sign_interventions(await intervention_service.intervention_manager.get_report_interventions(
         report_id,
         intervention_status
-    )
+    ))
 
 
 @router.get("/technician/{technician_id}", response_model=List[InterventionPublic])
@@ -176,17 +208,42 @@ async def get_technician_interventions(
         technician_id: str,
         intervention_status: Optional[str] = None,
         current_user: UserInDB = Depends(get_current_active_user),
-        intervention_service: InterventionService = Depends(get_intervention_service)
+        intervention_service: InterventionService = Depends(get_intervention_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get all interventions for a technician"""
     # Admins can view any technician's interventions
-    if current_user.role not in ["admin", "super_admin"] and str(current_user.id) != technician_id:
+    if current_user.role not in (UserRole.ADMIN, UserRole.SUPER_ADMIN) and str(current_user.id) != technician_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Can only view your own interventions"
         )
 
-    return await intervention_service.intervention_manager.get_technician_interventions(
+    return media_urls.sign_interventions(await intervention_service.intervention_manager.get_technician_interventions(
         technician_id,
         intervention_status
+    ))
+
+
+@router.get("/technician/{technician_id}/route", response_model=RoutePlan)
+async def plan_technician_route(
+        technician_id: str,
+        day: Optional[date] = None,
+        start_lat: Optional[float] = Query(None, ge=-90, le=90),
+        start_lng: Optional[float] = Query(None, ge=-180, le=180),
+        current_user: UserInDB = Depends(get_current_active_user),
+        intervention_service: InterventionService = Depends(get_intervention_service)
+):
+    """Ordered visiting plan of a technician's open interventions for a day (defaults to today)"""
+    if current_user.role not in (UserRole.ADMIN, UserRole.SUPER_ADMIN) and str(current_user.id) != technician_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Can only plan your own route"
+        )
+
+    start = (start_lat, start_lng) if start_lat is not None and start_lng is not None else None
+    return await intervention_service.plan_technician_route(
+        technician_id,
+        day or datetime.utcnow().date(),
+        start
     )
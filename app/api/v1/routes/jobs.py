@@ -0,0 +1,43 @@
+import logging
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import get_current_admin_user
+from app.db.managers.jobs import JobManager, get_job_manager
+from app.db.models.jobs import Job, JobRetry, JobStats
+from app.db.models.users import UserPublic
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/stats", response_model=List[JobStats])
+async def get_job_stats(
+        current_user: UserPublic = Depends(get_current_admin_user),
+        job_manager: JobManager = Depends(get_job_manager)
+):
+    """Job counts per type and status, with the oldest due date (admin only)"""
+    return await job_manager.get_stats()
+
+
+@router.get("/dead", response_model=List[Job])
+async def get_dead_jobs(
+        limit: int = Query(50, ge=1, le=500),
+        current_user: UserPublic = Depends(get_current_admin_user),
+        job_manager: JobManager = Depends(get_job_manager)
+):
+    """Jobs that ran out of attempts, most recent first (admin only)"""
+    return await job_manager.get_dead(limit)
+
+
+@router.post("/retry")
+async def retry_dead_jobs(
+        retry: JobRetry,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        job_manager: JobManager = Depends(get_job_manager)
+):
+    """Queue dead jobs again with a fresh set of attempts (admin only)"""
+    retried = await job_manager.retry([str(job_id) for job_id in retry.ids])
+    return {"retried": retried}
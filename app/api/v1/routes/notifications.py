@@ -1,12 +1,49 @@
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, Header, Response
+from fastapi import APIRouter, Depends, Query
+
+from app.api.deps import get_current_active_user
+from app.api.v1.services.notifications import NotificationService, get_notification_service
+from app.db.models.notifications import DigestPreference, NotificationPage, NotificationRead
+from app.db.models.users import UserPublic
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/")
-def verify(authorization: str = Header(None)) -> Response:
-    return Response("{'success': True, 'route': 'notifications'}")
+@router.get("/", response_model=NotificationPage)
+async def get_inbox(
+        cursor: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=100),
+        current_user: UserPublic = Depends(get_current_active_user),
+        notification_service: NotificationService = Depends(get_notification_service)
+):
+    """The current user's notifications, newest first; pass next_cursor for older ones"""
+    return await notification_service.get_inbox(str(current_user.id), cursor, limit)
+
+
+@router.post("/read")
+async def mark_notifications_read(
+        read: NotificationRead,
+        current_user: UserPublic = Depends(get_current_active_user),
+        notification_service: NotificationService = Depends(get_notification_service)
+):
+    """Mark the given notifications read, or the whole inbox when no ids are given"""
+    unread = await notification_service.mark_read(
+        str(current_user.id),
+        [str(notification_id) for notification_id in read.ids] if read.ids is not None else None
+    )
+    return {"unread": unread}
+
+
+@router.put("/digest", response_model=DigestPreference)
+async def set_digest_preference(
+        preference: DigestPreference,
+        current_user: UserPublic = Depends(get_current_active_user),
+        notification_service: NotificationService = Depends(get_notification_service)
+):
+    """Opt into daily or weekly email digests of unread notifications, or out with `none`"""
+    await notification_service.set_digest_frequency(str(current_user.id), preference.frequency)
+    return preference
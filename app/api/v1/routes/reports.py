@@ -1,12 +1,21 @@
-from typing import List
+from typing import List, Optional
 
 # from app.services.report import ReportService, get_report_service
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_admin_user
 from app.api.v1.routes.utils import response_helper
+from app.api.v1.services.exports import EXPORT_MEDIA_TYPES, ReportExportService, get_report_export_service
+from app.api.v1.services.media_urls import MediaUrlService, get_media_url_service
 from app.api.v1.services.services import ReportService, get_report_service
+from app.api.v1.services.uploads import report_media_upload
+from app.db.managers.jobs import JobManager, get_job_manager
+from app.db.models.jobs import JobType
 from app.db.models.reports import (
+    DuplicateCandidate,
+    ExportFormat,
+    ReportCategory,
     ReportCreate,
     ReportPublic,
     ReportUpdate,
@@ -21,22 +30,62 @@ router = APIRouter()
 async def create_report(
         report_create: ReportCreate,
         # media_files: Optional[List[UploadFile]] = File(None),
+        link_duplicates: bool = True,
         current_user: UserPublic = Depends(get_current_active_user),
-        report_service: ReportService = Depends(get_report_service)
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
-    """Create a new report"""
-    report = await report_service.create_report(
+    """
+    Create a new report. A likely duplicate of a nearby open report is linked
+    to it as a confirmation instead, and that report is returned with
+    `duplicate` set (pass link_duplicates=false to always create).
+    """
+    report, created = await report_service.create_report(
         report_create,
         str(current_user.id),
         # media_files
+        link_duplicates=link_duplicates
     )
-    return response_helper(report)
+    return {**response_helper(media_urls.sign_report(report)), "duplicate": not created}
+
+
+@router.post("/duplicates", response_model=List[DuplicateCandidate])
+async def find_duplicate_reports(
+        report_create: ReportCreate,
+        current_user: UserPublic = Depends(get_current_active_user),
+        report_service: ReportService = Depends(get_report_service)
+):
+    """Open reports that look like the one about to be submitted, most similar first"""
+    return await report_service.find_duplicates(report_create)
+
+
+@router.get("/trending", response_model=List[ReportPublic])
+async def trending_reports(
+        zone: Optional[str] = None,
+        category: Optional[ReportCategory] = None,
+        limit: int = Query(20, ge=1, le=100),
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
+):
+    """Open reports ranked by hot score (priority and engagement, decayed with age)"""
+    return media_urls.sign_reports(await report_service.get_trending(zone, category, limit))
+
+
+@router.post("/trending/recompute")
+async def recompute_hot_scores(
+        current_user: UserPublic = Depends(get_current_admin_user),
+        job_manager: JobManager = Depends(get_job_manager)
+):
+    """Queue a recompute of the hot scores that differ from the current weights (admin only)"""
+    job_id = await job_manager.enqueue(JobType.HOT_SCORES_RECOMPUTE, priority=-10)
+    return {"message": "Hot scores recompute queued", "job_id": job_id}
 
 
 @router.get("/{report_id}", response_model=ReportPublic)
 async def get_report(
         report_id: str,
-        report_service: ReportService = Depends(get_report_service)
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get a specific report"""
     report = await report_service.get_report(report_id)
@@ -45,7 +94,7 @@ async def get_report(
 
     # Track view count
     await report_service.increment_views(report_id)
-    return report
+    return media_urls.sign_report(report)
 
 
 @router.put("/{report_id}", response_model=ReportPublic)
@@ -53,7 +102,8 @@ async def update_report(
         report_id: str,
         update_data: ReportUpdate,
         current_user: UserPublic = Depends(get_current_active_user),
-        report_service: ReportService = Depends(get_report_service)
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update a report"""
     report = await report_service.update_report(
@@ -63,7 +113,7 @@ async def update_report(
     )
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    return report
+    return media_urls.sign_report(report)
 
 
 @router.post("/search", response_model=List[ReportPublic])
@@ -72,36 +122,55 @@ async def search_reports(
         # Todo: Check this usage to make pagination
         # skip: int = 0,
         # limit: int = 100,
-        report_service: ReportService = Depends(get_report_service)
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Search reports with filters"""
-    return await report_service.search_reports(search)
+    return media_urls.sign_reports(await report_service.search_reports(search))
+
+
+@router.post("/export")
+async def export_reports(
+        search: ReportSearch,
+        format: ExportFormat = ExportFormat.NDJSON,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        export_service: ReportExportService = Depends(get_report_export_service)
+):
+    """
+    Every report matching the filters, streamed as NDJSON, CSV or a GeoJSON
+    FeatureCollection. Unlike /search, nothing is paged or held in memory.
+    """
+    return StreamingResponse(
+        export_service.stream(search, format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{export_service.filename(format)}"'}
+    )
 
 
-@router.post("/{report_id}/media", response_model=ReportPublic)
+@router.post("/{report_id}/media", response_model=ReportPublic, openapi_extra=report_media_upload.openapi())
 async def add_report_media(
         report_id: str,
-        media_file: UploadFile = File(...),
         # current_user: UserPublic = Depends(get_current_active_user),
-        report_service: ReportService = Depends(get_report_service)
+        media_file: UploadFile = Depends(report_media_upload),
+        report_service: ReportService = Depends(get_report_service),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Add media to a report"""
     # Todo: make checks on the current_user that is adding media to report
     report = await report_service.add_media(report_id, media_file)
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
-    return report
+    return media_urls.sign_report(report)
 
 
 @router.post("/{report_id}/confirm")
 async def confirm_report(
         report_id: str,
-        # current_user: UserPublic = Depends(get_current_active_user),
+        current_user: UserPublic = Depends(get_current_active_user),
         report_service: ReportService = Depends(get_report_service)
 ):
-    """Confirm a report (community validation)"""
-    # Todo: make checks on the current_user that is adding media to report
-    report = await report_service.increment_views(report_id)
+    """Confirm a report (community validation), counted once per citizen"""
+    report = await report_service.confirm_report(report_id, str(current_user.id))
     if not report:
         raise HTTPException(status_code=404, detail="Report not found")
     return {"message": "Report confirmed"}
@@ -1,13 +1,18 @@
 from typing import List
 
-from fastapi import APIRouter, Depends, File, UploadFile, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, HTTPException
 
-from app.api.deps import get_current_active_user
+from app.api.deps import get_current_active_user, get_current_admin_user
 from app.api.v1.services.auth import get_auth_service, AuthService
 from app.api.v1.services.file import FileService
+from app.api.v1.services.media_urls import MediaUrlService, get_media_url_service
+from app.api.v1.services.tracking import PositionTracker, get_position_tracker
+from app.api.v1.services.uploads import avatar_upload
 from app.api.v1.services.user import UserService
 from app.db.models.base import PyObjectId
-from app.db.models.users import UserPublic, UserSearch, UserUpdate, PasswordChange, UserRoleUpdate, UserStatusUpdate
+from app.db.models.positions import LastKnownPosition, PositionBatch
+from app.db.models.users import UserPublic, UserSearch, UserUpdate, PasswordChange, UserRoleUpdate, UserStatusUpdate, \
+    UserRole
 
 router = APIRouter()
 
@@ -19,10 +24,11 @@ router = APIRouter()
 @router.post("/search", response_model=List[UserPublic])
 async def search_users(
         search_params: UserSearch,
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Search users with filters"""
-    return await user_service.search_users(search_params)
+    return media_urls.sign_users(await user_service.search_users(search_params))
 
 
 @router.get("/actives", response_model=List[UserPublic])
@@ -30,23 +36,25 @@ async def get_active_users(
         skip: int = 0,
         limit: int = 100,
         user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """
     Get active users with reports (optimized aggregation version)
     """
-    return await user_service.get_active_reporting_users(skip, limit)
+    return media_urls.sign_users(await user_service.get_active_reporting_users(skip, limit))
 
 
 @router.get("/{user_id}", response_model=UserPublic)
 async def get_user(
         user_id: PyObjectId,
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get public user profile"""
     user = await user_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    return media_urls.sign_user(user)
 
 
 # ----------------------
@@ -55,20 +63,22 @@ async def get_user(
 
 @router.get("/me", response_model=UserPublic)
 async def get_my_profile(
-        current_user: UserPublic = Depends(get_current_active_user)
+        current_user: UserPublic = Depends(get_current_active_user),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Get current user's profile"""
-    return current_user
+    return media_urls.sign_user(current_user)
 
 
 @router.put("/me", response_model=UserPublic)
 async def update_my_profile(
         update_data: UserUpdate,
         current_user: UserPublic = Depends(get_current_active_user),
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update current user's profile"""
-    return await user_service.update_user(current_user.id, update_data)
+    return media_urls.sign_user(await user_service.update_user(current_user.id, update_data))
 
 
 @router.put("/me/password")
@@ -90,32 +100,56 @@ async def change_my_password(
     return {"message": "Password updated successfully"}
 
 
-@router.put("/me/avatar")
+@router.put("/me/avatar", openapi_extra=avatar_upload.openapi())
 async def update_my_avatar(
-        avatar: UploadFile = File(...),
         current_user: UserPublic = Depends(get_current_active_user),
+        avatar: UploadFile = Depends(avatar_upload),
         user_service: UserService = Depends(UserService),
-        file_service: FileService = Depends(FileService)
+        file_service: FileService = Depends(FileService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Upload and update user avatar"""
     avatar_url = await file_service.upload_avatar(avatar, current_user.id)
-    return await user_service.update_user(current_user.id, UserUpdate(avatar=avatar_url))
+    return media_urls.sign_user(await user_service.update_user(current_user.id, UserUpdate(avatar=avatar_url)))
+
+
+@router.post("/me/positions", status_code=202)
+async def report_my_positions(
+        batch: PositionBatch,
+        current_user: UserPublic = Depends(get_current_active_user),
+        tracker: PositionTracker = Depends(get_position_tracker)
+):
+    """Submit a batch of GPS pings (technician only), written asynchronously in bulk"""
+    if current_user.role != UserRole.TECHNICIAN:
+        raise HTTPException(status_code=403, detail="Only technicians report positions")
+    tracker.add(str(current_user.id), batch.pings)
+    return {"accepted": len(batch.pings)}
 
 
 # ----------------------
 # Admin Endpoints
 # ----------------------
 
+@router.get("/technicians/positions", response_model=List[LastKnownPosition])
+async def get_technician_positions(
+        current_user: UserPublic = Depends(get_current_admin_user),
+        tracker: PositionTracker = Depends(get_position_tracker)
+):
+    """Last known position of every technician (admin only)"""
+    return await tracker.get_last_positions()
+
+
 @router.get("/", response_model=List[UserPublic])
 async def list_users(
         skip: int = 0,
         limit: int = 100,
         current_user: UserPublic = Depends(get_current_active_user),
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """List all users (admin only)"""
     # Todo: Check current user role before sending the users list
-    return await user_service.list_users(skip, limit)
+    return media_urls.sign_users(await user_service.list_users(skip, limit))
 
 
 @router.put("/{user_id}/role", response_model=UserPublic)
@@ -123,13 +157,14 @@ async def update_user_role(
         user_id: PyObjectId,
         role_update: UserRoleUpdate,
         current_user: UserPublic = Depends(get_current_active_user),
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update user role (admin only)"""
     # Todo: Check current user role and authorizations before
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot change your own role")
-    return await user_service.update_user(user_id, UserUpdate(role=role_update.role))
+    return media_urls.sign_user(await user_service.update_user(user_id, UserUpdate(role=role_update.role)))
 
 
 @router.put("/{user_id}/status", response_model=UserPublic)
@@ -137,13 +172,14 @@ async def update_user_status(
         user_id: PyObjectId,
         status_update: UserStatusUpdate,
         current_user: UserPublic = Depends(get_current_active_user),
-        user_service: UserService = Depends(UserService)
+        user_service: UserService = Depends(UserService),
+        media_urls: MediaUrlService = Depends(get_media_url_service)
 ):
     """Update user status (admin only)"""
     # Todo: Check current user role and authorizations before
     if current_user.id == user_id:
         raise HTTPException(status_code=400, detail="Cannot change your own status")
-    return await user_service.update_user(user_id, UserUpdate(role=status_update.status))
+    return media_urls.sign_user(await user_service.update_user(user_id, UserUpdate(role=status_update.status)))
 
 
 @router.delete("/{user_id}")
@@ -1,12 +1,53 @@
 import logging
+from typing import Dict
 
-from fastapi import APIRouter, Header, Response
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_active_user, get_current_admin_user
+from app.api.v1.services.votes import VoteService, get_vote_service
+from app.db.models.users import UserPublic
+from app.db.models.votes import VoteLookup, VoteStatus
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/")
-def verify(authorization: str = Header(None)) -> Response:
-    return Response("{'success': True, 'route': 'users'}")
+@router.put("/reports/{report_id}", response_model=VoteStatus)
+async def vote_for_report(
+        report_id: str,
+        current_user: UserPublic = Depends(get_current_active_user),
+        vote_service: VoteService = Depends(get_vote_service)
+):
+    """Vote for a report; voting twice is a no-op"""
+    return await vote_service.vote(report_id, str(current_user.id))
+
+
+@router.delete("/reports/{report_id}", response_model=VoteStatus)
+async def remove_vote(
+        report_id: str,
+        current_user: UserPublic = Depends(get_current_active_user),
+        vote_service: VoteService = Depends(get_vote_service)
+):
+    """Withdraw a vote"""
+    return await vote_service.unvote(report_id, str(current_user.id))
+
+
+@router.post("/lookup", response_model=Dict[str, bool])
+async def lookup_votes(
+        lookup: VoteLookup,
+        current_user: UserPublic = Depends(get_current_active_user),
+        vote_service: VoteService = Depends(get_vote_service)
+):
+    """Whether the current user voted for each of the given reports (one query for a whole feed)"""
+    return await vote_service.lookup(str(current_user.id), [str(report_id) for report_id in lookup.report_ids])
+
+
+@router.post("/rebuild")
+async def rebuild_vote_counts(
+        current_user: UserPublic = Depends(get_current_admin_user),
+        vote_service: VoteService = Depends(get_vote_service)
+):
+    """Queue a recomputation of report vote counters from the votes collection (admin only)"""
+    job_id = await vote_service.rebuild_counts()
+    return {"message": "Vote counters rebuild queued", "job_id": job_id}
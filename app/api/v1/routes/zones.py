@@ -1,12 +1,94 @@
 import logging
+from typing import List
 
-from fastapi import APIRouter, Header, Response
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+
+from app.api.deps import get_current_admin_user
+from app.db.managers.zones import ZoneManager, get_zone_manager, zone_resolver
+from app.db.models.users import UserPublic
+from app.db.models.zones import ZoneCreate, ZonePublic, ZoneUpdate
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-@router.get("/")
-def verify(authorization: str = Header(None)) -> Response:
-    return Response("{'success': True, 'route': 'zone'}")
+@router.get("/", response_model=List[ZonePublic])
+async def list_zones(
+        skip: int = 0,
+        limit: int = 100,
+        zone_manager: ZoneManager = Depends(get_zone_manager)
+):
+    """List administrative zones"""
+    return await zone_manager.get_many({}, skip=skip, limit=limit, sort=[("name", 1)])
+
+
+@router.get("/resolve")
+async def resolve_zone(
+        lat: float = Query(..., ge=-90, le=90),
+        lng: float = Query(..., ge=-180, le=180)
+) -> dict:
+    """Name of the zone containing a point (null outside every zone)"""
+    await zone_resolver.refresh()
+    return {"zone": zone_resolver.resolve(lat, lng)}
+
+
+@router.post("/", response_model=ZonePublic)
+async def create_zone(
+        zone_create: ZoneCreate,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        zone_manager: ZoneManager = Depends(get_zone_manager)
+):
+    """Create a zone (admin only)"""
+    if await zone_manager.exists({"name": zone_create.name}):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Zone name already exists"
+        )
+    return await zone_manager.create_zone(zone_create)
+
+
+@router.get("/{zone_id}", response_model=ZonePublic)
+async def get_zone(
+        zone_id: str,
+        zone_manager: ZoneManager = Depends(get_zone_manager)
+):
+    """Get a zone"""
+    zone = await zone_manager.get(zone_id)
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return zone
+
+
+@router.put("/{zone_id}", response_model=ZonePublic)
+async def update_zone(
+        zone_id: str,
+        update_data: ZoneUpdate,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        zone_manager: ZoneManager = Depends(get_zone_manager)
+):
+    """Update a zone (admin only); the zone index is reloaded right away"""
+    fields = update_data.dict(exclude_unset=True)
+    if fields.get("name") and await zone_manager.exists(
+            {"name": fields["name"], "_id": {"$ne": zone_manager.object_id(zone_id)}}
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Zone name already exists"
+        )
+    zone = await zone_manager.update_zone(zone_id, fields)
+    if not zone:
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return zone
+
+
+@router.delete("/{zone_id}")
+async def delete_zone(
+        zone_id: str,
+        current_user: UserPublic = Depends(get_current_admin_user),
+        zone_manager: ZoneManager = Depends(get_zone_manager)
+):
+    """Delete a zone (admin only)"""
+    if not await zone_manager.delete_zone(zone_id):
+        raise HTTPException(status_code=404, detail="Zone not found")
+    return {"message": "Zone deleted successfully"}
@@ -0,0 +1,90 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException, status
+
+from app.db.managers.comments import get_comment_manager
+from app.db.managers.interventions import get_intervention_manager
+from app.db.managers.reports import get_report_manager
+from app.db.models.comments import Comment, CommentCreate, CommentPage, CommentTarget
+
+
+class CommentService:
+    def __init__(self):
+        self.comment_manager = get_comment_manager()
+        self.report_manager = get_report_manager()
+        self.intervention_manager = get_intervention_manager()
+
+    async def _next_seq(self, target_type: CommentTarget, target_id: str) -> int:
+        """
+        Bump the comment counter denormalized on the target (`engagement.comments`
+        of a report, which also moves its hot score, or `comment_count` of an
+        intervention) and return the new comment's sequence number.
+        """
+        if target_type == CommentTarget.REPORT:
+            report = await self.report_manager.increment_engagement(target_id, "comments")
+            seq = report.engagement["comments"] if report else None
+        else:
+            seq = await self.intervention_manager.increment_comment_count(target_id)
+        if seq is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{target_type.value.capitalize()} not found")
+        return seq
+
+    async def add_comment(
+            self,
+            target_type: CommentTarget,
+            target_id: str,
+            comment_data: CommentCreate,
+            user_id: str
+    ) -> Comment:
+        seq = await self._next_seq(target_type, target_id)
+        if comment_data.parent_seq is not None and comment_data.parent_seq >= seq:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Parent comment not found")
+        comment = Comment(
+            seq=seq,
+            author_id=user_id,
+            body=comment_data.body,
+            parent_seq=comment_data.parent_seq,
+            created_at=datetime.utcnow()
+        )
+        await self.comment_manager.add_comment(target_type, target_id, comment.dict())
+        return comment
+
+    async def list_comments(
+            self,
+            target_type: CommentTarget,
+            target_id: str,
+            cursor: Optional[str] = None
+    ) -> CommentPage:
+        """One page of a thread, newest first; `cursor` comes from the previous page's next_cursor"""
+        page = None
+        if cursor is not None:
+            if not cursor.isdigit():
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+            page = int(cursor)
+        bucket = await self.comment_manager.get_page(target_type, target_id, page)
+        if bucket is None:
+            return CommentPage(comments=[])
+        return CommentPage(
+            comments=list(reversed(bucket.comments)),
+            next_cursor=str(bucket.page - 1) if bucket.page > 0 else None
+        )
+
+    async def delete_comment(
+            self,
+            target_type: CommentTarget,
+            target_id: str,
+            seq: int,
+            user_id: str,
+            is_admin: bool = False
+    ) -> None:
+        """Authors delete their own comments, admins any comment"""
+        deleted = await self.comment_manager.delete_comment(
+            target_type, target_id, seq, author_id=None if is_admin else user_id
+        )
+        if not deleted:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+
+
+def get_comment_service() -> CommentService:
+    return CommentService()
@@ -0,0 +1,75 @@
+import logging
+from datetime import datetime, timedelta
+from typing import Dict
+
+from app.api.v1.services.email import get_email_service
+from app.core.configs import settings
+from app.db.managers.notifications import get_notification_manager
+from app.db.models.notifications import DigestFrequency
+
+logger = logging.getLogger(__name__)
+
+DIGEST_WINDOWS: Dict[DigestFrequency, timedelta] = {
+    DigestFrequency.DAILY: timedelta(days=1),
+    DigestFrequency.WEEKLY: timedelta(days=7),
+}
+
+
+def digest_period_end(frequency: DigestFrequency, now: datetime) -> datetime:
+    """End of the latest complete digest period at `now` (DIGEST_HOUR_UTC, on Mondays for weekly digests)"""
+    end = now.replace(hour=settings.DIGEST_HOUR_UTC, minute=0, second=0, microsecond=0)
+    if end > now:
+        end -= timedelta(days=1)
+    if frequency == DigestFrequency.WEEKLY:
+        end -= timedelta(days=end.weekday())
+    return end
+
+
+class DigestService:
+    """
+    Emails opted-in users one message per period summarizing their unread
+    notifications by zone, instead of one email per status change. Users are
+    read with a single grouped aggregation and their messages handed to the
+    email jobs EMAIL_BATCH_SIZE at a time.
+    """
+
+    def __init__(self):
+        self.notification_manager = get_notification_manager()
+        self.email_service = get_email_service()
+
+    async def _flush(self, messages: list, user_ids: list, end: datetime) -> None:
+        await self.email_service.queue_emails(messages, priority=-5)
+        await self.notification_manager.mark_digested(user_ids, end)
+
+    async def send_digests(self, frequency: DigestFrequency, end: datetime) -> int:
+        """Queue the digests of the period ending at `end`; returns the number of users emailed"""
+        frequency = DigestFrequency(frequency)
+        messages, user_ids, sent = [], [], 0
+        async for user in self.notification_manager.iter_digests(frequency, end - DIGEST_WINDOWS[frequency], end):
+            total = sum(zone["count"] for zone in user["zones"])
+            messages.append(self.email_service.message(
+                f"Your {frequency.value} digest: {total} update{'s' if total > 1 else ''}",
+                [user["email"]],
+                "digest.html",
+                {
+                    "user": {"full_name": f"{user.get('firstname', '')} {user.get('lastname', '')}".strip()},
+                    "frequency": frequency.value,
+                    "total": total,
+                    "zones": user["zones"],
+                    "frontend_url": settings.FRONTEND_URL,
+                }
+            ))
+            user_ids.append(str(user["_id"]))
+            if len(messages) >= settings.EMAIL_BATCH_SIZE:
+                await self._flush(messages, user_ids, end)
+                sent += len(messages)
+                messages, user_ids = [], []
+        if messages:
+            await self._flush(messages, user_ids, end)
+            sent += len(messages)
+        logger.info(f"Queued {sent} {frequency.value} digests up to {end:%Y-%m-%d %H:%M}")
+        return sent
+
+
+def get_digest_service() -> DigestService:
+    return DigestService()
@@ -0,0 +1,166 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException
+
+from app.core.configs import settings
+from app.db.managers.reports import get_report_manager
+from app.db.managers.users import get_user_manager
+from app.db.models.interventions import TechnicianSuggestion
+from app.db.models.users import TechnicianAvailability, UserRole, UserStatus
+from app.utils.geospatial import GridIndex, point_lat_lng
+
+INITIAL_SEARCH_RADIUS_M = 2_000
+
+
+class TechnicianIndex:
+    """
+    Per-worker spatial index of technician positions, load and availability.
+
+    Kept current with delta refreshes (technicians whose `technician.updated_at`
+    moved since the last refresh, plus the live positions saved since then)
+    and a periodic full rebuild, so ranking a report never queries the users
+    collection.
+    """
+
+    def __init__(self):
+        self.grid = GridIndex()
+        self.technicians: Dict[str, dict] = {}
+        self.refreshed_at: Optional[datetime] = None
+        self._checked_at = 0.0
+        self._rebuilt_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def upsert(self, doc: dict) -> None:
+        technician_id = str(doc["_id"])
+        technician = doc.get("technician") or {}
+        # Live GPS position first, then the home location from the profile
+        position = point_lat_lng(technician.get("position")) or \
+            point_lat_lng((doc.get("location") or {}).get("coordinates"))
+        if (
+                doc.get("role") != UserRole.TECHNICIAN
+                or doc.get("status", UserStatus.ACTIVE) != UserStatus.ACTIVE
+                or position is None
+        ):
+            self.remove(technician_id)
+            return
+        self.technicians[technician_id] = {
+            "availability": technician.get("availability", TechnicianAvailability.AVAILABLE),
+            "open_interventions": max(technician.get("open_interventions", 0), 0),
+        }
+        self.grid.upsert(technician_id, *position)
+
+    def move(self, doc: dict) -> None:
+        """Apply a live position to a technician already in the index"""
+        technician_id = str(doc["_id"])
+        position = point_lat_lng((doc.get("technician") or {}).get("position"))
+        if technician_id in self.technicians and position is not None:
+            self.grid.upsert(technician_id, *position)
+
+    def remove(self, technician_id: str) -> None:
+        self.technicians.pop(technician_id, None)
+        self.grid.remove(technician_id)
+
+    def add_load(self, technician_ids: List[str], amount: int = 1) -> None:
+        """Apply a local assignment right away instead of waiting for the next refresh"""
+        for technician_id in technician_ids:
+            technician = self.technicians.get(str(technician_id))
+            if technician:
+                technician["open_interventions"] = max(technician["open_interventions"] + amount, 0)
+
+    async def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.DISPATCH_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            if not force and now - self._checked_at < settings.DISPATCH_REFRESH_SECONDS:
+                return
+            rebuild = force or now - self._rebuilt_at >= settings.DISPATCH_FULL_REFRESH_SECONDS
+            started_at = datetime.utcnow()
+            user_manager = get_user_manager()
+            # A rebuild fills a fresh index and swaps it in, so concurrent rankings never see a partial one
+            target = TechnicianIndex() if rebuild else self
+            async for doc in user_manager.iter_technicians(None if rebuild else self.refreshed_at):
+                target.upsert(doc)
+            if not rebuild and self.refreshed_at is not None:
+                async for doc in user_manager.iter_moved_technicians(self.refreshed_at):
+                    self.move(doc)
+            if rebuild:
+                self.grid, self.technicians = target.grid, target.technicians
+            self.refreshed_at = started_at
+            self._checked_at = now
+            if rebuild:
+                self._rebuilt_at = now
+
+    def rank(
+            self,
+            lat: float,
+            lng: float,
+            limit: int = 5,
+            max_distance: Optional[float] = None
+    ) -> List[TechnicianSuggestion]:
+        """Best technicians for a location: closest first, penalised by load and busyness"""
+        max_distance = max_distance or settings.DISPATCH_MAX_DISTANCE_KM * 1000
+        load_penalty = settings.DISPATCH_LOAD_PENALTY_KM * 1000
+        busy_penalty = settings.DISPATCH_BUSY_PENALTY_KM * 1000
+
+        # Scores are never below the distance: once `limit` candidates score within the
+        # searched radius nobody farther can beat them, so start small and widen only if needed
+        radius = min(INITIAL_SEARCH_RADIUS_M, max_distance)
+        while True:
+            scored = []
+            for technician_id, distance in self.grid.nearby(lat, lng, radius):
+                technician = self.technicians[technician_id]
+                if technician["availability"] == TechnicianAvailability.OFF_DUTY:
+                    continue
+                score = distance + technician["open_interventions"] * load_penalty
+                if technician["availability"] == TechnicianAvailability.BUSY:
+                    score += busy_penalty
+                scored.append((score, distance, technician_id))
+            best = heapq.nsmallest(limit, scored)
+            if radius >= max_distance or (len(best) == limit and best[-1][0] <= radius):
+                break
+            radius = min(radius * 2, max_distance)
+
+        return [
+            TechnicianSuggestion(
+                technician_id=technician_id,
+                distance=round(distance, 1),
+                open_interventions=self.technicians[technician_id]["open_interventions"],
+                availability=self.technicians[technician_id]["availability"],
+                score=round(score, 1)
+            )
+            for score, distance, technician_id in best
+        ]
+
+
+technician_index = TechnicianIndex()
+
+
+class DispatchService:
+    def __init__(self):
+        self.report_manager = get_report_manager()
+        self.index = technician_index
+
+    async def suggest_technicians(
+            self,
+            report_id: str,
+            limit: int = 5,
+            max_distance: Optional[float] = None
+    ) -> List[TechnicianSuggestion]:
+        report = await self.report_manager.get(report_id)
+        if not report:
+            raise HTTPException(status_code=404, detail="Report not found")
+        position = point_lat_lng(report.location.coordinates)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Report has no valid location")
+
+        await self.index.refresh()
+        return self.index.rank(*position, limit=limit, max_distance=max_distance)
+
+
+def get_dispatch_service() -> DispatchService:
+    return DispatchService()
@@ -1,62 +1,185 @@
-from typing import List
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import AsyncIterator, List, Optional
 
-from fastapi import BackgroundTasks
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
+import aiosmtplib
+from fastapi.encoders import jsonable_encoder
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 from pydantic import EmailStr
 
 from app.core.configs import settings
+from app.db.managers.jobs import get_job_manager
+from app.db.models.jobs import JobType
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_FOLDER = "./app/templates/v1/emails"
+
+TRANSIENT_SMTP_ERRORS = (
+    aiosmtplib.SMTPServerDisconnected,
+    aiosmtplib.SMTPConnectError,
+    aiosmtplib.SMTPTimeoutError,
+)
+
+
+def is_transient(error: Exception) -> bool:
+    if isinstance(error, TRANSIENT_SMTP_ERRORS):
+        return True
+    # 4xx replies (mailbox busy, rate limited, ...) are worth another try, 5xx are not
+    return isinstance(error, aiosmtplib.SMTPResponseException) and 400 <= error.code < 500
+
+
+class SMTPPool:
+    """
+    Persistent SMTP connections shared by the coroutines of one process.
+    Connections are opened on first use, reopened when they were dropped or
+    sat idle past EMAIL_IDLE_SECONDS, and closed after an error.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.created = 0
+        self.idle: asyncio.LifoQueue = asyncio.LifoQueue()
+
+    @staticmethod
+    def _client() -> aiosmtplib.SMTP:
+        return aiosmtplib.SMTP(
+            hostname=settings.EMAIL_SERVER,
+            port=settings.EMAIL_PORT,
+            username=settings.EMAIL_USERNAME or None,
+            password=settings.EMAIL_PASSWORD or None,
+            use_tls=settings.EMAIL_USE_TLS,
+            start_tls=settings.EMAIL_STARTTLS,
+            timeout=settings.EMAIL_TIMEOUT_SECONDS
+        )
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[aiosmtplib.SMTP]:
+        if self.idle.empty() and self.created < self.size:
+            self.created += 1
+            client, last_used = self._client(), 0.0
+        else:
+            client, last_used = await self.idle.get()
+        try:
+            if client.is_connected and time.monotonic() - last_used > settings.EMAIL_IDLE_SECONDS:
+                client.close()
+            if not client.is_connected:
+                await client.connect()
+            yield client
+        except Exception:
+            if client.is_connected:
+                client.close()
+            raise
+        finally:
+            self.idle.put_nowait((client, time.monotonic()))
+
+    async def close(self) -> None:
+        while not self.idle.empty():
+            client, _ = self.idle.get_nowait()
+            if client.is_connected:
+                try:
+                    await client.quit()
+                except aiosmtplib.SMTPException:
+                    client.close()
+        self.created = 0
 
 
 class EmailService:
+    """
+    Renders emails from the cached compiled templates of TEMPLATE_FOLDER and
+    sends them through a per-process SMTP connection pool. Requests only
+    queue emails (`queue_email` / `queue_emails`); job workers send them.
+    """
+
     def __init__(self):
-        print({
-            "MAIL_USERNAME": settings.EMAIL_USERNAME,
-            "MAIL_PASSWORD": settings.EMAIL_PASSWORD,
-            "MAIL_FROM": settings.EMAIL_FROM,
-            "MAIL_PORT": settings.EMAIL_PORT,
-            "MAIL_SERVER": settings.EMAIL_SERVER,
-            "MAIL_FROM_NAME": settings.EMAIL_FROM_NAME,
-        })
-        self.conf = ConnectionConfig(
-            MAIL_USERNAME=settings.EMAIL_USERNAME,
-            MAIL_PASSWORD=settings.EMAIL_PASSWORD,
-            MAIL_FROM=settings.EMAIL_FROM,
-            MAIL_PORT=settings.EMAIL_PORT,
-            MAIL_SERVER=settings.EMAIL_SERVER,
-            MAIL_FROM_NAME=settings.EMAIL_FROM_NAME,
-            # MAIL_STARTTLS=True,
-            MAIL_STARTTLS=False,
-            MAIL_SSL_TLS=True,
-            USE_CREDENTIALS=True,
-            TEMPLATE_FOLDER="./app/templates/v1/emails"
+        self.templates = Environment(
+            loader=FileSystemLoader(TEMPLATE_FOLDER),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False  # compiled once per process, no stat() per render
         )
+        self.templates.globals["settings"] = settings
+        self.pool = SMTPPool(settings.EMAIL_POOL_SIZE)
+        self.sender = formataddr((settings.EMAIL_FROM_NAME, settings.EMAIL_FROM))
+
+    def render(self, subject: str, recipients: List[str], template: str, context: dict) -> EmailMessage:
+        message = EmailMessage()
+        message["Subject"] = subject
+        message["From"] = self.sender
+        message["To"] = ", ".join(recipients)
+        message.set_content(self.templates.get_template(template).render(**context), subtype="html")
+        return message
 
     async def send_email_async(self, subject: str, recipients: List[EmailStr], template: str, context: dict):
-        message = MessageSchema(
-            subject=subject,
-            recipients=recipients,
-            template_body=context,
-            subtype="html"
+        """Send one email now, retrying transient SMTP errors with backoff"""
+        message = self.render(subject, list(recipients), template, context)
+        for attempt in range(settings.EMAIL_MAX_RETRIES + 1):
+            try:
+                async with self.pool.connection() as client:
+                    await client.send_message(message)
+                return
+            except aiosmtplib.SMTPException as e:
+                if attempt == settings.EMAIL_MAX_RETRIES or not is_transient(e):
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def send_many(self, messages: List[dict]) -> List[dict]:
+        """Send `messages` concurrently over the pool; returns the ones that failed"""
+        results = await asyncio.gather(
+            *(self.send_email_async(**message) for message in messages),
+            return_exceptions=True
         )
-        fm = FastMail(self.conf)
-        await fm.send_message(message, template_name=template)
+        failed = []
+        for message, result in zip(messages, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to send \"{message['subject']}\" to {message['recipients']}: {result}")
+                failed.append(message)
+        return failed
 
-    def send_email_background(
+    @staticmethod
+    def message(subject: str, recipients: List[EmailStr], template: str, context: dict) -> dict:
+        """A queued email; the context must be JSON serializable"""
+        return {
+            "subject": subject,
+            "recipients": list(recipients),
+            "template": template,
+            "context": jsonable_encoder(context),
+        }
+
+    async def queue_email(
             self,
-            background_tasks: BackgroundTasks,
             subject: str,
             recipients: List[EmailStr],
             template: str,
-            context: dict
-    ):
-        background_tasks.add_task(
-            self.send_email_async,
-            subject,
-            recipients,
-            template,
-            context
+            context: dict,
+            priority: int = 0
+    ) -> str:
+        """Hand the email to the job workers"""
+        return await get_job_manager().enqueue(
+            JobType.EMAIL,
+            {"messages": [self.message(subject, recipients, template, context)]},
+            priority=priority
         )
 
+    async def queue_emails(self, messages: List[dict], priority: int = 0, run_at: Optional[datetime] = None) -> int:
+        """Queue many `message()`s, EMAIL_BATCH_SIZE per job so workers send them in bulk"""
+        job_manager = get_job_manager()
+        for start in range(0, len(messages), settings.EMAIL_BATCH_SIZE):
+            await job_manager.enqueue(
+                JobType.EMAIL,
+                {"messages": messages[start:start + settings.EMAIL_BATCH_SIZE]},
+                priority=priority,
+                run_at=run_at
+            )
+        return len(messages)
+
+
+email_service = EmailService()
+
 
 def get_email_service() -> EmailService:
-    return EmailService()
+    return email_service
@@ -0,0 +1,188 @@
+import asyncio
+import json
+import logging
+from collections import OrderedDict, defaultdict
+from typing import AsyncIterator, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.configs import settings
+from app.db.managers.reports import get_report_manager
+from app.db.state_machine import StatusChange, add_status_listener
+
+logger = logging.getLogger(__name__)
+
+REPORT_INFO_CACHE_SIZE = 10_000  # report id -> (zone, citizen id), both fixed at creation
+
+
+def sse(event: str, data: dict, event_id: Optional[str] = None) -> str:
+    lines = f"id: {event_id}\n" if event_id else ""
+    return f"{lines}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+class Subscription:
+    """
+    One open stream. Holds at most EVENTS_SUBSCRIBER_BUFFER unsent events,
+    one per entity: a newer status replaces an unsent older one, and past the
+    limit the oldest is dropped and the client is told to resync.
+    """
+    __slots__ = ("report_ids", "zones", "user_id", "pending", "dropped", "wake")
+
+    def __init__(self, report_ids: Iterable[str] = (), zones: Iterable[str] = (), user_id: Optional[str] = None):
+        self.report_ids = set(report_ids)
+        self.zones = set(zones)
+        self.user_id = user_id
+        self.pending: OrderedDict = OrderedDict()
+        self.dropped = 0
+        self.wake = asyncio.Event()
+
+    def push(self, key: Tuple[str, str], message: str) -> None:
+        self.pending.pop(key, None)
+        self.pending[key] = message
+        if len(self.pending) > settings.EVENTS_SUBSCRIBER_BUFFER:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.wake.set()
+
+    def drain(self) -> str:
+        messages = []
+        if self.dropped:
+            messages.append(sse("resync", {"dropped": self.dropped}))
+            self.dropped = 0
+        messages.extend(self.pending.values())
+        self.pending.clear()
+        return "".join(messages)
+
+
+class EventHub:
+    """
+    In-process pub/sub of report and intervention status changes for SSE clients.
+
+    Changes arrive from the state machine through a bounded queue and are
+    routed by one task, through report / zone / user indexes, so the cost of
+    an event is the number of interested streams, not of open ones. Idle
+    streams cost no task of their own: a single heartbeat loop wakes them all.
+    Each worker only sees the changes written through it.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.subscriptions: Set[Subscription] = set()
+        self.by_report: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.by_zone: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.by_user: Dict[str, Set[Subscription]] = defaultdict(set)
+        self.report_info: OrderedDict = OrderedDict()
+        self._tasks = []
+        self._listening = False
+
+    def _indexes(self, subscription: Subscription):
+        for report_id in subscription.report_ids:
+            yield self.by_report, report_id
+        for zone in subscription.zones:
+            yield self.by_zone, zone
+        if subscription.user_id:
+            yield self.by_user, subscription.user_id
+
+    def subscribe(self, subscription: Subscription) -> Subscription:
+        self.subscriptions.add(subscription)
+        for index, key in self._indexes(subscription):
+            index[key].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self.subscriptions.discard(subscription)
+        for index, key in self._indexes(subscription):
+            subscribers = index.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del index[key]
+
+    def publish(self, change: StatusChange) -> None:
+        if not self.subscriptions:
+            return
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            logger.warning(f"Event queue full, dropping {change.entity} {change.entity_id} change")
+
+    async def _report_info(self, report_id: str) -> Tuple[Optional[str], Optional[str]]:
+        info = self.report_info.get(report_id)
+        if info is None:
+            info = await get_report_manager().get_zone_and_citizen(report_id)
+            self.report_info[report_id] = info
+            if len(self.report_info) > REPORT_INFO_CACHE_SIZE:
+                self.report_info.popitem(last=False)
+        else:
+            self.report_info.move_to_end(report_id)
+        return info
+
+    async def route(self, change: StatusChange) -> int:
+        targets = set(self.by_report.get(change.report_id, ()))
+        zone = change.zone
+        if self.by_zone or self.by_user:
+            if zone is None or self.by_user:
+                cached_zone, citizen_id = await self._report_info(change.report_id)
+                zone = zone or cached_zone
+                for user_id in (citizen_id, *change.technician_ids):
+                    targets.update(self.by_user.get(user_id, ()))
+            targets.update(self.by_zone.get(zone, ()))
+        if not targets:
+            return 0
+
+        message = sse(change.entity, {
+            "entity": change.entity,
+            "id": change.entity_id,
+            "report_id": change.report_id,
+            "zone": zone,
+            "previous_status": change.previous_status,
+            "status": change.status,
+            "at": change.at.isoformat(),
+        }, event_id=f"{change.entity_id}:{change.status}")
+        key = (change.entity, change.entity_id)
+        for subscription in targets:
+            subscription.push(key, message)
+        return len(targets)
+
+    async def _run(self) -> None:
+        while True:
+            change = await self.queue.get()
+            try:
+                await self.route(change)
+            except Exception as e:
+                logger.error(f"Failed to route {change.entity} {change.entity_id} event: {e}")
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await asyncio.sleep(settings.EVENTS_HEARTBEAT_SECONDS)
+            for subscription in self.subscriptions:
+                subscription.wake.set()
+
+    async def stream(self, subscription: Subscription) -> AsyncIterator[str]:
+        """SSE body of a subscription; a wake-up with nothing to send is a heartbeat"""
+        self.subscribe(subscription)
+        try:
+            yield f"retry: {int(settings.EVENTS_HEARTBEAT_SECONDS * 1000)}\n\n"
+            while True:
+                await subscription.wake.wait()
+                subscription.wake.clear()
+                yield subscription.drain() or ": ping\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    def start(self) -> None:
+        if not self._listening:
+            add_status_listener(self.publish)
+            self._listening = True
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._run()), asyncio.create_task(self._heartbeat())]
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+
+event_hub = EventHub()
+
+
+def get_event_hub() -> EventHub:
+    return event_hub
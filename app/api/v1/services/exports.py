@@ -0,0 +1,140 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Optional
+
+from app.core.configs import settings
+from app.db.hot_score import ENGAGEMENT_WEIGHTS
+from app.db.managers.reports import get_report_manager
+from app.db.models.reports import ExportFormat, ReportSearch
+from app.utils.geospatial import point_lat_lng
+
+EXPORT_MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv; charset=utf-8",
+    ExportFormat.GEOJSON: "application/geo+json",
+}
+EXPORT_COLUMNS = [
+    "id", "title", "description", "category", "priority", "status", "zone", "address", "lat", "lng",
+    *ENGAGEMENT_WEIGHTS, "interventions", "duplicate_of", "created_at", "updated_at",
+]
+# Fields read for exports (no citizen or engagement voter ids)
+EXPORT_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "category": 1,
+    "priority": 1,
+    "status": 1,
+    "location.address": 1,
+    "location.zone": 1,
+    "location.coordinates": 1,
+    **{f"engagement.{field}": 1 for field in ENGAGEMENT_WEIGHTS},
+    "intervention_stats": 1,
+    "duplicate_of": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _json_default(value):
+    return value.isoformat() if isinstance(value, datetime) else str(value)
+
+
+def export_row(doc: dict) -> dict:
+    """Flat record of a raw report document (see EXPORT_PROJECTION)"""
+    location = doc.get("location") or {}
+    lat, lng = point_lat_lng(location.get("coordinates")) or (None, None)
+    engagement = doc.get("engagement") or {}
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "description": doc.get("description"),
+        "category": doc.get("category"),
+        "priority": doc.get("priority"),
+        "status": doc.get("status"),
+        "zone": location.get("zone"),
+        "address": location.get("address"),
+        "lat": lat,
+        "lng": lng,
+        **{field: engagement.get(field, 0) for field in ENGAGEMENT_WEIGHTS},
+        "interventions": (doc.get("intervention_stats") or {}).get("total", 0),
+        "duplicate_of": str(doc["duplicate_of"]) if doc.get("duplicate_of") else None,
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+    }
+
+
+def _csv_cell(value) -> str:
+    """Cell text; citizen-written text starting like a formula is quoted so spreadsheets don't run it"""
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    text = str(value)
+    return f"'{text}" if isinstance(value, str) and text.startswith(CSV_FORMULA_PREFIXES) else text
+
+
+class ReportExportService:
+    """
+    Report dumps streamed straight from a projected cursor: documents are
+    encoded one at a time into a buffer flushed every EXPORT_CHUNK_BYTES, so
+    memory stays at one cursor batch plus one chunk whatever the size of
+    the export, and a slow client slows the cursor down instead of filling
+    the worker's memory.
+    """
+
+    def __init__(self):
+        self.report_manager = get_report_manager()
+
+    @staticmethod
+    def filename(export_format: ExportFormat, at: Optional[datetime] = None) -> str:
+        extension = "geojson" if export_format == ExportFormat.GEOJSON else export_format.value
+        return f"reports-{(at or datetime.utcnow()):%Y%m%d-%H%M%S}.{extension}"
+
+    def _write(self, buffer: io.StringIO, writer, export_format: ExportFormat, row: dict, first: bool) -> None:
+        if export_format == ExportFormat.CSV:
+            writer.writerow([_csv_cell(row[column]) for column in EXPORT_COLUMNS])
+        elif export_format == ExportFormat.NDJSON:
+            buffer.write(json.dumps(row, default=_json_default))
+            buffer.write("\n")
+        else:
+            lat, lng = row.pop("lat"), row.pop("lng")
+            feature = {
+                "type": "Feature",
+                "id": row["id"],
+                "geometry": {"type": "Point", "coordinates": [lng, lat]} if lat is not None else None,
+                "properties": row,
+            }
+            if not first:
+                buffer.write(",\n")
+            buffer.write(json.dumps(feature, default=_json_default))
+
+    async def stream(self, search: ReportSearch, export_format: ExportFormat) -> AsyncIterator[str]:
+        """Body of an export of every report matching `search`, in chunks"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if export_format == ExportFormat.CSV else None
+        if writer is not None:
+            writer.writerow(EXPORT_COLUMNS)
+        elif export_format == ExportFormat.GEOJSON:
+            buffer.write('{"type": "FeatureCollection", "features": [\n')
+
+        first = True
+        docs = self.report_manager.iter_export(search, EXPORT_PROJECTION, settings.EXPORT_CURSOR_BATCH_SIZE)
+        async for doc in docs:
+            self._write(buffer, writer, export_format, export_row(doc), first)
+            first = False
+            if buffer.tell() >= settings.EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+        if export_format == ExportFormat.GEOJSON:
+            buffer.write("\n]}\n")
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def get_report_export_service() -> ReportExportService:
+    return ReportExportService()
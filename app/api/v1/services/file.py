@@ -1,13 +1,40 @@
+import asyncio
+import base64
+import hashlib
+import mimetypes
 import os
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta
+from typing import BinaryIO, Collection, Optional, Tuple
 
 import boto3
 from botocore.exceptions import ClientError
 from fastapi import UploadFile, HTTPException, status
+from starlette.datastructures import Headers
 
+from app.api.v1.services.media_urls import get_media_url_service
+from app.api.v1.services.uploads import ATTACHMENT_TYPES, AVATAR_TYPES, StreamedUploadFile
 from app.core.configs import settings
+from app.db.managers.files import get_stored_file_manager
 from app.db.models.base import PyObjectId
+from app.utils.filetypes import SNIFF_BYTES, sniff_content_type
+
+CONTENT_PREFIX = "files"
+HASH_CHUNK_SIZE = 1024 * 1024
+TOMBSTONE_POLL_SECONDS = 0.2
+TOMBSTONE_STALE_AFTER = timedelta(minutes=1)  # a deletion still unfinished after this has failed
+TOMBSTONE_MAX_WAITS = 400
+
+
+def hash_stream(stream: BinaryIO) -> Tuple[str, int]:
+    """SHA-256 hex digest and size of a seekable stream, read once in chunks, rewound after"""
+    stream.seek(0)
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in iter(lambda: stream.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+        size += len(chunk)
+    stream.seek(0)
+    return digest.hexdigest(), size
 
 
 class FileService:
@@ -21,38 +48,69 @@ class FileService:
         )
         self.bucket_name = settings.AWS_STORAGE_BUCKET_NAME
         self.base_url = settings.AWS_STORAGE_ENDPOINT_URL
-
-    async def _generate_file_key(self, prefix: str, file_name: str) -> str:
-        """Generate unique file key with timestamp"""
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        file_ext = os.path.splitext(file_name)[1]
-        return f"{prefix}/{timestamp}_{file_name}"
-
-    async def upload_file(self, file: UploadFile, prefix: str) -> str:
-        """Generic file upload to S3 with enhanced error handling"""
+        # Private objects are served through presigned URLs (MediaUrlService)
+        self.acl = {} if settings.MEDIA_PRIVATE else {"ACL": "public-read"}
+        self.stored_file_manager = get_stored_file_manager()
+
+    @staticmethod
+    def _content_key(sha256: str, file_name: Optional[str], content_type: Optional[str]) -> str:
+        """Content-addressed key: identical bytes always map to the same object"""
+        file_ext = os.path.splitext(file_name or "")[1].lower() or mimetypes.guess_extension(content_type or "") or ""
+        return f"{CONTENT_PREFIX}/{sha256[:2]}/{sha256}{file_ext}"
+
+    async def upload_file(self, file: UploadFile) -> str:
+        """
+        Store an upload once per distinct content. The file is hashed in a
+        single pass (which also sizes it); when the hash is already indexed
+        the existing object is reused and nothing is sent to S3. New objects
+        are sent with their SHA-256, which S3 verifies in place of the
+        checksum botocore would otherwise compute in another pass.
+        """
         try:
-            file.file.seek(0, 2)  # Seek to end to get size
-            file_size = file.file.tell()
-            file.file.seek(0)  # Reset pointer
-
+            sha256 = getattr(file, "sha256", None)
+            if sha256 is not None:
+                # Hashed while it was received (UploadReader)
+                file_size = file.size
+            else:
+                sha256, file_size = await asyncio.to_thread(hash_stream, file.file)
             if file_size <= 0:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="Uploaded file is empty"
                 )
 
-            file_key = await self._generate_file_key(prefix, file.filename)
+            for _ in range(TOMBSTONE_MAX_WAITS):
+                stored = await self.stored_file_manager.find(sha256)
+                if stored is not None and stored.refs <= 0:
+                    # The last copy is being deleted: wait for it to finish (or to go stale)
+                    if not await self.stored_file_manager.purge(sha256, stale_after=TOMBSTONE_STALE_AFTER):
+                        await asyncio.sleep(TOMBSTONE_POLL_SECONDS)
+                    continue
+                sent = stored is None
+                file_key = stored.key if stored else self._content_key(sha256, file.filename, file.content_type)
+                if sent:
+                    await self._put_upload(file, file_key, file_size, sha256)
+                referenced = await self.stored_file_manager.add_reference(
+                    sha256, file_key, file_size, file.content_type
+                )
+                if referenced is None:
+                    # Released and tombstoned since `find`: the object goes away with it
+                    continue
+                stored, inserted = referenced
+                # A fresh entry may follow a deletion, completed by now, of the object `find` saw
+                # or of the one just sent
+                if inserted and (not sent or not await self._object_exists(file_key)):
+                    await self._put_upload(file, file_key, file_size, sha256)
+                break
+            else:
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="File is being deleted, retry later"
+                )
+            return self.url_for(stored.key)
 
-            self.s3_client.upload_fileobj(
-                file.file,
-                self.bucket_name,
-                file_key,
-                ExtraArgs={
-                    'ContentType': file.content_type,
-                    'ACL': 'public-read'
-                }
-            )
-            return f"{self.base_url}/{self.bucket_name}/{file_key}"
+        except HTTPException:
+            raise
 
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code')
@@ -72,40 +130,98 @@ class FileService:
                 detail=f"File upload failed: {str(e)}"
             )
 
-    async def upload_avatar(self, avatar: UploadFile, user_id: PyObjectId) -> str:
-        """Upload user avatar to S3"""
-        allowed_types = ['image/jpeg', 'image/png', 'image/gif']
-        if avatar.content_type not in allowed_types:
+    async def _put_upload(self, file: UploadFile, file_key: str, file_size: int, sha256: str) -> None:
+        file.file.seek(0)
+        await asyncio.to_thread(
+            self.s3_client.put_object,
+            Bucket=self.bucket_name,
+            Key=file_key,
+            Body=file.file,
+            ContentLength=file_size,
+            ContentType=file.content_type,
+            ChecksumSHA256=base64.b64encode(bytes.fromhex(sha256)).decode(),
+            **self.acl
+        )
+
+    async def _object_exists(self, file_key: str) -> bool:
+        try:
+            await asyncio.to_thread(self.s3_client.head_object, Bucket=self.bucket_name, Key=file_key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def key_from_url(self, file_url: str) -> str:
+        """Object key of a URL returned by `upload_file`"""
+        return file_url.split(f"/{self.bucket_name}/", 1)[1]
+
+    def url_for(self, file_key: str) -> str:
+        return f"{self.base_url}/{self.bucket_name}/{file_key}"
+
+    async def download_bytes(self, file_key: str) -> bytes:
+        response = await asyncio.to_thread(self.s3_client.get_object, Bucket=self.bucket_name, Key=file_key)
+        return await asyncio.to_thread(response["Body"].read)
+
+    async def upload_bytes(self, data: bytes, file_key: str, content_type: str) -> str:
+        await asyncio.to_thread(
+            self.s3_client.put_object,
+            Bucket=self.bucket_name,
+            Key=file_key,
+            Body=data,
+            ContentType=content_type,
+            **self.acl
+        )
+        return self.url_for(file_key)
+
+    @staticmethod
+    def _check_upload(file: UploadFile, max_bytes: int, allowed_types: Collection[str]) -> None:
+        """Size and sniffed type checks, for uploads that did not go through an UploadReader"""
+        if isinstance(file, StreamedUploadFile):
+            return
+        if file.size is not None and file.size > max_bytes:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Only JPEG, PNG, and GIF images are allowed"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File too large (max {max_bytes // (1024 * 1024)}MB)"
             )
-
-        if avatar.size > 5 * 1024 * 1024:  # 5MB limit
+        file.file.seek(0)
+        content_type = sniff_content_type(file.file.read(SNIFF_BYTES))
+        file.file.seek(0)
+        if content_type not in allowed_types:
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Avatar image too large (max 5MB)"
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported file type, expected one of: {', '.join(allowed_types)}"
             )
+        file.headers = Headers({**file.headers, "content-type": content_type})
 
-        return await self.upload_file(avatar, f"avatars/{user_id}")
+    async def upload_avatar(self, avatar: UploadFile, user_id: PyObjectId) -> str:
+        """Upload user avatar to S3"""
+        self._check_upload(avatar, settings.MAX_AVATAR_SIZE, AVATAR_TYPES)
+        return await self.upload_file(avatar)
 
     async def upload_report_attachment(self, file: UploadFile, report_id: PyObjectId) -> str:
         """Upload report attachment to S3"""
-        max_size = 10 * 1024 * 1024  # 10MB limit
-        if file.size > max_size:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail=f"File too large (max {max_size // (1024 * 1024)}MB)"
-            )
-
-        return await self.upload_file(file, f"reports/{report_id}/attachments")
+        self._check_upload(file, settings.MAX_UPLOAD_SIZE, ATTACHMENT_TYPES)
+        return await self.upload_file(file)
 
     async def delete_file(self, file_url: str) -> bool:
-        """Delete file from S3"""
+        """
+        Drop one upload of a file. The object (and its variants) is deleted
+        from S3 with the last upload sharing it; returns whether it was. Its
+        index entry stays a tombstone until then, so no upload can reference
+        the object while it is being deleted.
+        """
         try:
-            # Extract key from URL
-            key = file_url.replace(f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/", "")
-            self.s3_client.delete_object(Bucket=self.bucket_name, Key=key)
+            stored = await self.stored_file_manager.release(self.key_from_url(file_url))
+            if stored is None:
+                return False
+            keys = [stored.key] + [self.key_from_url(url) for url in stored.variants.values()]
+            await asyncio.to_thread(
+                self.s3_client.delete_objects,
+                Bucket=self.bucket_name,
+                Delete={"Objects": [{"Key": key} for key in keys], "Quiet": True}
+            )
+            await self.stored_file_manager.purge(stored.sha256)
             return True
         except ClientError as e:
             raise HTTPException(
@@ -113,26 +229,9 @@ class FileService:
                 detail=f"Failed to delete file: {str(e)}"
             )
 
-    async def generate_presigned_url(self, file_key: str, expiration: int = 3600) -> Optional[str]:
-        """Generate presigned URL using custom endpoint"""
-        try:
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params={'Bucket': self.bucket_name, 'Key': file_key},
-                ExpiresIn=expiration
-            )
-            # Replace the default endpoint with our custom one if needed
-            if "amazonaws.com" in url:
-                url = url.replace(
-                    f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com",
-                    settings.aws_s3_endpoint_url.rstrip('/')
-                )
-            return url
-        except ClientError as e:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to generate presigned URL: {str(e)}"
-            )
+    async def generate_presigned_url(self, file_key: str, expiration: int = 3600) -> str:
+        """Presigned GET URL of an object, valid `expiration` seconds from now, not cached"""
+        return get_media_url_service().presigner.presign(file_key, datetime.utcnow(), expiration)
 
 
 def get_file_service() -> FileService:
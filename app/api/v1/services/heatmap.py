@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Tuple
+
+import numpy as np
+
+from app.core.configs import settings
+from app.db.snapshot import ReportSnapshot, report_snapshot
+from app.db.models.reports import ReportCategory, ReportStatus
+from app.utils.heatmap import density_grid, mercator, tile_bounds
+
+
+class HeatmapService:
+    """
+    Density tiles computed from the in-memory report snapshot. Tiles and the
+    Mercator projection of the points are cached per snapshot version, so any
+    report change invalidates them.
+    """
+
+    def __init__(self, snapshot: ReportSnapshot):
+        self.snapshot = snapshot
+        self.cache: OrderedDict = OrderedDict()
+        self._projected: Tuple[int, np.ndarray, np.ndarray] = (-1, np.empty(0), np.empty(0))
+
+    def projected(self) -> Tuple[np.ndarray, np.ndarray]:
+        version, x, y = self._projected
+        if version != self.snapshot.version:
+            x, y = mercator(self.snapshot.column("lat"), self.snapshot.column("lng"))
+            self._projected = (self.snapshot.version, x, y)
+        return x, y
+
+    async def get_tile(
+            self,
+            z: int,
+            x: int,
+            y: int,
+            size: int = 256,
+            category: Optional[ReportCategory] = None,
+            status: Optional[ReportStatus] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ) -> dict:
+        """Report density of a z/x/y tile as sparse [row, col, count] cells"""
+        await self.snapshot.refresh()
+        key = (self.snapshot.version, z, x, y, size, category, status, start, end)
+        tile = self.cache.get(key)
+        if tile is not None:
+            self.cache.move_to_end(key)
+            return tile
+
+        mx, my = self.projected()
+        grid = density_grid(mx, my, z, x, y, size, mask=self.snapshot.select(category, status, start=start, end=end))
+        rows, cols = np.nonzero(grid)
+        south, west, north, east = tile_bounds(z, x, y)
+        tile = {
+            "z": z,
+            "x": x,
+            "y": y,
+            "size": size,
+            "bounds": {"south": south, "west": west, "north": north, "east": east},
+            "total": int(grid.sum()),
+            "max": int(grid.max()),
+            "cells": np.column_stack((rows, cols, grid[rows, cols])).tolist(),
+            "version": self.snapshot.version,
+        }
+
+        # Entries of older versions are never hit again and age out of the LRU
+        self.cache[key] = tile
+        if len(self.cache) > settings.HEATMAP_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return tile
+
+
+heatmap_service = HeatmapService(report_snapshot)
+
+
+def get_heatmap_service() -> HeatmapService:
+    return heatmap_service
@@ -1,41 +1,68 @@
-from typing import Optional, List
+from datetime import date, datetime, time, timedelta
+from typing import Optional, List, Tuple
 
-from fastapi import UploadFile
+from fastapi import UploadFile, HTTPException, status
 
+from app.core.configs import settings
+from app.api.v1.services.dispatch import get_dispatch_service
 from app.api.v1.services.file import get_file_service
+from app.api.v1.services.media import get_media_processor
 from app.db.managers.interventions import get_intervention_manager
 from app.db.managers.reports import get_report_manager
-from app.db.models.interventions import Intervention, InterventionPublic, InterventionCreate
+from app.db.managers.users import get_user_manager
+from app.db.state_machine import TransitionError, get_state_machine
+from app.db.models.interventions import (
+    Intervention,
+    InterventionPublic,
+    InterventionCreate,
+    InterventionStatus,
+    RoutePlan,
+    RouteStop
+)
+from app.utils.geospatial import point_lat_lng
+from app.utils.routing import plan_route
 
 
 class InterventionService:
     def __init__(self):
         self.intervention_manager = get_intervention_manager()
         self.report_manager = get_report_manager()
+        self.user_manager = get_user_manager()
         self.file_service = get_file_service()
+        self.media_processor = get_media_processor()
+        self.state_machine = get_state_machine()
+        self.dispatch_service = get_dispatch_service()
 
     async def create_intervention(
             self,
-            intervention_data: InterventionCreate
+            intervention_data: InterventionCreate,
+            user_id: str,
+            auto_assign: bool = False
     ) -> Intervention:
         # Convert single technician_id to list for backward compatibility
         if not isinstance(intervention_data.technician_ids, list):
             intervention_data.technician_ids = [intervention_data.technician_ids]
 
-        # Update report status to "assigned" if first intervention
-        existing_interventions = await self.intervention_manager.get_report_interventions(
-            str(intervention_data.report_id)
-        )
-
-        if not existing_interventions:
-            await self.report_manager.update_report_status(
+        if auto_assign and not intervention_data.technician_ids:
+            suggestions = await self.dispatch_service.suggest_technicians(
                 str(intervention_data.report_id),
-                "assigned",
-                str(intervention_data.technician_ids[0]),
-                "Initial intervention created"
+                limit=1
+            )
+            if not suggestions:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="No available technician near this report"
+                )
+            intervention_data.technician_ids = [suggestions[0].technician_id]
+            self.dispatch_service.index.add_load(intervention_data.technician_ids)
+
+        if not intervention_data.technician_ids:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="At least one technician is required"
             )
 
-        return await self.intervention_manager.create_intervention(intervention_data)
+        return await self.state_machine.create_intervention(intervention_data, user_id)
 
     async def get_intervention(self, intervention_id: str) -> Optional[InterventionPublic]:
         return await self.intervention_manager.get(intervention_id)
@@ -43,30 +70,13 @@ class InterventionService:
     async def update_intervention_status(
             self,
             intervention_id: str,
-            new_status: str,
-            report_id: str,
+            new_status: InterventionStatus,
             user_id: str
     ) -> Optional[Intervention]:
-        intervention = await self.intervention_manager.update(
-            intervention_id,
-            {"status": new_status}
-        )
-
-        if new_status == "in_progress":
-            report_status = "in_progress"
-        elif new_status == "completed":
-            report_status = "resolved"
-        else:
-            report_status = "assigned"
-
-        await self.report_manager.update_report_status(
-            report_id,
-            report_status,
-            user_id,
-            f"Intervention status changed to {new_status}"
-        )
-
-        return intervention
+        try:
+            return await self.state_machine.transition_intervention(intervention_id, new_status, user_id)
+        except TransitionError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
 
     async def add_intervention_photo(
             self,
@@ -80,11 +90,13 @@ class InterventionService:
             photo_file,
             report_id=intervention.report_id
         )
-        return await self.intervention_manager.add_intervention_photo(
+        intervention = await self.intervention_manager.add_intervention_photo(
             intervention_id,
             photo_url,
             photo_type
         )
+        await self.media_processor.queue_variants("intervention", intervention_id, photo_url, photo_file.content_type)
+        return intervention
 
     async def complete_intervention_step(
             self,
@@ -99,42 +111,90 @@ class InterventionService:
     async def complete_intervention(
             self,
             intervention_id: str,
-            report_id: str,
             user_id: str
     ) -> Optional[Intervention]:
-        # Mark intervention as completed
-        intervention = await self.intervention_manager.update(
+        # The report is resolved by the state machine once all its interventions are completed
+        return await self.update_intervention_status(
             intervention_id,
-            {"status": "completed"}
+            InterventionStatus.COMPLETED,
+            user_id
         )
 
-        # Check if all interventions are completed
-        all_interventions = await self.intervention_manager.get_report_interventions(report_id)
-        completed_interventions = [i for i in all_interventions if i.status == "completed"]
-
-        if len(completed_interventions) == len(all_interventions):
-            # All interventions completed, mark report as resolved
-            await self.report_manager.update_report_status(
-                report_id,
-                "resolved",
-                user_id,
-                "All interventions completed"
-            )
-
-        return intervention
-
     async def assign_technicians_to_intervention(
             self,
             intervention_id: str,
             technician_ids: List[str],
             is_primary: bool = False
     ) -> Optional[Intervention]:
-        return await self.intervention_manager.assign_technicians(
+        return await self.state_machine.assign_technicians(
             intervention_id,
             technician_ids,
             is_primary
         )
 
+    async def plan_technician_route(
+            self,
+            technician_id: str,
+            day: date,
+            start: Optional[Tuple[float, float]] = None
+    ) -> RoutePlan:
+        """Visiting order of a technician's open interventions for a day"""
+        day_start = datetime.combine(day, time.min)
+        interventions = await self.intervention_manager.get_technician_open_interventions(
+            technician_id,
+            day_start,
+            day_start + timedelta(days=1)
+        )
+        locations = await self.report_manager.get_locations(
+            list({str(i["report_id"]) for i in interventions})
+        )
+        located = [i for i in interventions if str(i["report_id"]) in locations]
+
+        if start is None:
+            technician = await self.user_manager.get(technician_id)
+            if technician and technician.technician:
+                start = point_lat_lng(technician.technician.get("position"))
+            if start is None and technician and technician.location:
+                start = point_lat_lng(technician.location.coordinates)
+
+        order, legs = plan_route(
+            [locations[str(i["report_id"])][0] for i in located],
+            [locations[str(i["report_id"])][1] for i in located],
+            start
+        )
+
+        meters_per_minute = settings.ROUTE_AVERAGE_SPEED_KMH * 1000 / 60
+        stops, elapsed, travel, work = [], 0.0, 0.0, 0
+        for index, leg in zip(order, legs):
+            intervention = located[index]
+            duration = intervention.get("estimated_duration") or 0
+            elapsed += leg / meters_per_minute
+            stops.append(RouteStop(
+                intervention_id=str(intervention["_id"]),
+                report_id=str(intervention["report_id"]),
+                title=intervention.get("title", ""),
+                location=locations[str(intervention["report_id"])],
+                distance_from_previous=round(leg, 1),
+                estimated_duration=duration,
+                arrival_offset=round(elapsed, 1)
+            ))
+            elapsed += duration
+            travel += leg
+            work += duration
+
+        return RoutePlan(
+            technician_id=technician_id,
+            day=day,
+            stops=stops,
+            total_distance=round(travel, 1),
+            travel_minutes=round(travel / meters_per_minute, 1),
+            work_minutes=work,
+            total_minutes=round(elapsed, 1),
+            unlocated_intervention_ids=[
+                str(i["_id"]) for i in interventions if str(i["report_id"]) not in locations
+            ]
+        )
+
 
 def get_intervention_service() -> InterventionService:
     return InterventionService()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from app.api.v1.services.file import get_file_service
+from app.core.configs import settings
+from app.db.managers.files import get_stored_file_manager
+from app.db.managers.interventions import get_intervention_manager
+from app.db.managers.jobs import get_job_manager
+from app.db.managers.reports import get_report_manager
+from app.db.models.jobs import JobType
+from app.utils.images import make_variants
+
+logger = logging.getLogger(__name__)
+
+MEDIA_TARGETS = ("report", "intervention")
+VARIANT_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")  # what Pillow decodes out of the box
+
+
+class MediaProcessor:
+    """
+    Resized, metadata-free variants of uploaded photos, stored next to the
+    original ("<name>.<size>.<format>") and recorded on the media item.
+
+    Uploads only queue a job; job workers decode and encode in a process pool
+    of MEDIA_WORKERS processes, so image work never runs on an event loop. At
+    most two images per process are in flight, which bounds the originals
+    held in memory.
+    """
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._slots = asyncio.Semaphore(settings.MEDIA_WORKERS * 2)
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs Mongo / S3 client threads can deadlock
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.MEDIA_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._pool
+
+    async def resize(self, data: bytes) -> Dict[str, tuple]:
+        async with self._slots:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.pool,
+                make_variants,
+                data,
+                settings.MEDIA_VARIANT_SIZES,
+                settings.MEDIA_VARIANT_FORMATS,
+                settings.MEDIA_VARIANT_QUALITY
+            )
+
+    async def queue_variants(self, target: str, owner_id: str, url: str, content_type: Optional[str]) -> None:
+        """Queue the variants of an uploaded file; anything but a supported image is left alone"""
+        if content_type not in VARIANT_TYPES:
+            return
+        await get_job_manager().enqueue(
+            JobType.MEDIA_VARIANTS,
+            {"target": target, "owner_id": str(owner_id), "url": url}
+        )
+
+    async def create_variants(self, target: str, owner_id: str, url: str) -> Dict[str, str]:
+        """
+        Download the original, resize it and upload and record the variants.
+        Variants are kept on the stored file, so the same content uploaded
+        again reuses them.
+        """
+        file_service = get_file_service()
+        stored_file_manager = get_stored_file_manager()
+        key = file_service.key_from_url(url)
+        stored = await stored_file_manager.get_by_key(key)
+        if stored is not None and stored.variants:
+            urls = stored.variants
+        else:
+            variants = await self.resize(await file_service.download_bytes(key))
+            root = os.path.splitext(key)[0]
+            urls = dict(zip(variants, await asyncio.gather(*(
+                file_service.upload_bytes(data, f"{root}.{name}", content_type)
+                for name, (data, content_type) in variants.items()
+            ))))
+            await stored_file_manager.set_variants(key, urls)
+        if target == "report":
+            recorded = await get_report_manager().set_media_variants(owner_id, url, urls)
+        else:
+            recorded = await get_intervention_manager().set_photo_variants(owner_id, url, urls)
+        if not recorded:
+            logger.warning(f"No {target} {owner_id} media at {url} to record variants on")
+        return urls
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+
+media_processor = MediaProcessor()
+
+
+def get_media_processor() -> MediaProcessor:
+    return media_processor
@@ -0,0 +1,135 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Sequence
+
+from app.core.configs import settings
+from app.db.models.interventions import Intervention
+from app.db.models.reports import Report
+from app.db.models.users import UserBase
+from app.utils.presign import S3Presigner
+
+
+class MediaUrlService:
+    """
+    Presigned GET URLs of private media, cached per object key.
+
+    URLs are signed at the start of a time window (half their lifetime) and
+    reused until the next one starts, so one is never handed out with less
+    than half its lifetime left, and every worker returns the same URL for a
+    key during a window, which browsers and CDNs can cache. Stored URLs
+    outside the bucket are returned as they are.
+    """
+
+    def __init__(self):
+        self.presigner = S3Presigner(
+            settings.AWS_STORAGE_ENDPOINT_URL,
+            settings.AWS_STORAGE_BUCKET_NAME,
+            settings.AWS_ACCESS_KEY_ID,
+            settings.AWS_SECRET_ACCESS_KEY,
+            settings.AWS_REGION,
+        )
+        self.bucket_marker = f"/{settings.AWS_STORAGE_BUCKET_NAME}/"
+        self.expires_in = settings.MEDIA_URL_EXPIRE_SECONDS
+        self.window = max(self.expires_in // 2, 1)
+        self.cache: OrderedDict = OrderedDict()  # key -> (window start, url)
+
+    def key(self, url: Optional[str]) -> Optional[str]:
+        if not url or not url.startswith(settings.AWS_STORAGE_ENDPOINT_URL) or self.bucket_marker not in url:
+            return None
+        return url.split(self.bucket_marker, 1)[1]
+
+    def sign_keys(self, keys: Iterable[str]) -> Dict[str, str]:
+        """Presigned URL of each key, signing only the ones not cached for the current window"""
+        now = int(time.time())
+        window_start = now - now % self.window
+        signed_at = None
+        urls = {}
+        for key in keys:
+            if key in urls:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None and cached[0] == window_start:
+                self.cache.move_to_end(key)
+                urls[key] = cached[1]
+                continue
+            signed_at = signed_at or datetime.utcfromtimestamp(window_start)
+            url = self.presigner.presign(key, signed_at, self.expires_in)
+            self.cache[key] = (window_start, url)
+            self.cache.move_to_end(key)
+            urls[key] = url
+        while len(self.cache) > settings.MEDIA_URL_CACHE_SIZE:
+            self.cache.popitem(last=False)
+        return urls
+
+    def sign_many(self, urls: Iterable[Optional[str]]) -> Dict[str, str]:
+        """Stored URL -> URL to serve, for every stored URL of the bucket among `urls`"""
+        if not settings.MEDIA_PRIVATE:
+            return {}
+        keys = {}
+        for url in urls:
+            key = self.key(url)
+            if key is not None:
+                keys[url] = key
+        signed = self.sign_keys(keys.values())
+        return {url: signed[key] for url, key in keys.items()}
+
+    def sign(self, url: Optional[str]) -> Optional[str]:
+        return self.sign_many([url]).get(url, url)
+
+    def sign_reports(self, reports: Sequence[Optional[Report]]) -> Sequence[Optional[Report]]:
+        """Replace the media URLs of reports (in place) with presigned ones, signed as one batch"""
+        media = [item for report in reports if report is not None for item in report.media]
+        signed = self.sign_many(
+            url
+            for item in media
+            for url in (item.url, item.thumbnail, *item.variants.values())
+        )
+        if signed:
+            for item in media:
+                item.url = signed.get(item.url, item.url)
+                item.thumbnail = signed.get(item.thumbnail, item.thumbnail)
+                item.variants = {name: signed.get(url, url) for name, url in item.variants.items()}
+        return reports
+
+    def sign_report(self, report: Optional[Report]) -> Optional[Report]:
+        return self.sign_reports([report])[0]
+
+    def sign_interventions(self, interventions: Sequence[Optional[Intervention]]) -> Sequence[Optional[Intervention]]:
+        """Replace the photo URLs of interventions (in place) with presigned ones, signed as one batch"""
+        photos = [photo for intervention in interventions if intervention is not None for photo in intervention.photos]
+        signed = self.sign_many(
+            url
+            for photo in photos
+            for url in (photo.get("url"), photo.get("thumbnail"), *(photo.get("variants") or {}).values())
+        )
+        if signed:
+            for photo in photos:
+                for field in ("url", "thumbnail"):
+                    if photo.get(field):
+                        photo[field] = signed.get(photo[field], photo[field])
+                if photo.get("variants"):
+                    photo["variants"] = {name: signed.get(url, url) for name, url in photo["variants"].items()}
+        return interventions
+
+    def sign_intervention(self, intervention: Optional[Intervention]) -> Optional[Intervention]:
+        return self.sign_interventions([intervention])[0]
+
+    def sign_users(self, users: Sequence[Optional[UserBase]]) -> Sequence[Optional[UserBase]]:
+        """Replace the avatar URLs of users (in place) with presigned ones"""
+        signed = self.sign_many(user.avatar for user in users if user is not None)
+        if signed:
+            for user in users:
+                if user is not None:
+                    user.avatar = signed.get(user.avatar, user.avatar)
+        return users
+
+    def sign_user(self, user: Optional[UserBase]) -> Optional[UserBase]:
+        return self.sign_users([user])[0]
+
+
+media_url_service = MediaUrlService()
+
+
+def get_media_url_service() -> MediaUrlService:
+    return media_url_service
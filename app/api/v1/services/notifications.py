@@ -0,0 +1,178 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from app.core.configs import settings
+from app.db.managers.interventions import get_intervention_manager
+from app.db.managers.jobs import get_job_manager
+from app.db.managers.notifications import get_notification_manager
+from app.db.managers.reports import get_report_manager
+from app.db.managers.votes import get_vote_manager
+from app.db.models.jobs import JobType
+from app.db.models.notifications import DigestFrequency, NotificationPage, NotificationType
+from app.db.models.reports import Report
+from app.db.state_machine import StatusChange, add_status_listener
+
+logger = logging.getLogger(__name__)
+
+
+def readable(value: str) -> str:
+    return value.replace("_", " ").lower()
+
+
+class NotificationDispatcher:
+    """
+    Turns committed status changes into inbox entries, off the request path.
+
+    The state machine hands changes over through a bounded per-worker queue
+    (a non-blocking put); a background task moves them to the job queue in
+    batches. Job workers then run `fan_out`, which resolves the recipients
+    (author, confirming citizens, voters, technicians) and streams them in
+    batches of NOTIFICATIONS_BATCH_SIZE written with one insert_many each, so
+    a report with thousands of voters costs the API nothing.
+    """
+
+    def __init__(self):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=settings.NOTIFICATIONS_QUEUE_SIZE)
+        self._task: Optional[asyncio.Task] = None
+        self._listening = False
+
+    def publish(self, change: StatusChange) -> None:
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            logger.warning(f"Notification queue full, dropping {change.entity} {change.entity_id} change")
+
+    async def _recipients(self, change: StatusChange, report: Report) -> AsyncIterator[str]:
+        if change.entity == "intervention":
+            for technician_id in change.technician_ids:
+                yield technician_id
+            if change.previous_status is not None:
+                yield str(report.citizen_id)
+            return
+        yield str(report.citizen_id)
+        for citizen_id in report.engagement.get("confirmed_by", []):
+            yield citizen_id
+        for intervention in await get_intervention_manager().get_report_interventions(change.report_id):
+            for technician_id in intervention.technician_ids:
+                yield str(technician_id)
+        async for user_id in get_vote_manager().iter_voter_ids(change.report_id):
+            yield user_id
+
+    @staticmethod
+    def _content(change: StatusChange, report: Report) -> dict:
+        if change.entity == "report":
+            return {
+                "type": NotificationType.REPORT_STATUS,
+                "title": f"Report {readable(change.status)}",
+                "body": f"\"{report.title}\" is now {readable(change.status)}",
+                "intervention_id": None,
+            }
+        if change.previous_status is None:
+            return {
+                "type": NotificationType.INTERVENTION_ASSIGNED,
+                "title": "New intervention",
+                "body": f"You are assigned to an intervention on \"{report.title}\"",
+                "intervention_id": change.entity_id,
+            }
+        return {
+            "type": NotificationType.INTERVENTION_STATUS,
+            "title": f"Intervention {readable(change.status)}",
+            "body": f"The intervention on \"{report.title}\" is now {readable(change.status)}",
+            "intervention_id": change.entity_id,
+        }
+
+    async def fan_out(self, change: StatusChange) -> int:
+        report = await get_report_manager().get(change.report_id)
+        if report is None:
+            return 0
+        notification = {
+            **self._content(change, report),
+            "report_id": change.report_id,
+            "status": change.status,
+            "zone": report.location.zone,
+            "created_at": datetime.utcnow(),
+            # Same key on every run of the job: a retried fan-out skips users already notified
+            "change_key": f"{change.entity_id}:{change.status}:{change.at.isoformat()}",
+        }
+        notification_manager = get_notification_manager()
+        seen = {change.user_id}
+        batch: List[str] = []
+        delivered = 0
+        async for user_id in self._recipients(change, report):
+            if user_id in seen:
+                continue
+            seen.add(user_id)
+            batch.append(user_id)
+            if len(batch) >= settings.NOTIFICATIONS_BATCH_SIZE:
+                delivered += await notification_manager.deliver(batch, notification)
+                batch = []
+        delivered += await notification_manager.deliver(batch, notification)
+        return delivered
+
+    async def _run(self) -> None:
+        while True:
+            changes = [await self.queue.get()]
+            while not self.queue.empty() and len(changes) < settings.NOTIFICATIONS_BATCH_SIZE:
+                changes.append(self.queue.get_nowait())
+            try:
+                await get_job_manager().enqueue_many(
+                    JobType.NOTIFICATION_FAN_OUT,
+                    [change.dict() for change in changes]
+                )
+            except Exception as e:
+                logger.error(f"Failed to queue {len(changes)} notification fan-outs: {e}")
+            finally:
+                for _ in changes:
+                    self.queue.task_done()
+
+    def start(self) -> None:
+        if not self._listening:
+            add_status_listener(self.publish)
+            self._listening = True
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Queue what is already buffered, then stop"""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=10)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping with {self.queue.qsize()} unqueued status changes")
+        self._task.cancel()
+        self._task = None
+
+
+notification_dispatcher = NotificationDispatcher()
+
+
+class NotificationService:
+    def __init__(self):
+        self.notification_manager = get_notification_manager()
+
+    async def get_inbox(self, user_id: str, cursor: Optional[str] = None, limit: int = 20) -> NotificationPage:
+        if cursor is not None and not ObjectId.is_valid(cursor):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        notifications, next_cursor = await self.notification_manager.get_inbox(user_id, cursor, limit)
+        return NotificationPage(
+            notifications=notifications,
+            next_cursor=next_cursor,
+            unread=await self.notification_manager.get_unread_count(user_id)
+        )
+
+    async def mark_read(self, user_id: str, notification_ids: Optional[List[str]] = None) -> int:
+        await self.notification_manager.mark_read(user_id, notification_ids)
+        return await self.notification_manager.get_unread_count(user_id)
+
+    async def set_digest_frequency(self, user_id: str, frequency: DigestFrequency) -> None:
+        await self.notification_manager.set_digest_frequency(user_id, frequency)
+
+
+def get_notification_service() -> NotificationService:
+    return NotificationService()
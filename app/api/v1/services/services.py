@@ -1,14 +1,21 @@
 from datetime import datetime
 from typing import List, Optional
 
-from fastapi import UploadFile, HTTPException
+from fastapi import UploadFile, HTTPException, status
 
 from app.api.v1.services.file import get_file_service
+from app.api.v1.services.media import get_media_processor
 from app.db.managers.interventions import get_intervention_manager
 from app.db.managers.reports import get_report_manager
 from app.db.models.base import PyObjectId
-from app.db.models.reports import Report, ReportPublic, ReportCreate, ReportUpdate
+from app.db.models.reports import DuplicateCandidate, Report, ReportPublic, ReportCreate, ReportUpdate
 from app.db.models.reports import ReportSearch
+from app.db.state_machine import TransitionError, get_state_machine
+
+
+def media_type(content_type: Optional[str]) -> str:
+    """MediaItem.type of an upload"""
+    return "video" if (content_type or "").startswith("video/") else "image"
 
 
 class ReportService:
@@ -16,14 +23,18 @@ class ReportService:
         self.report_manager = get_report_manager()
         self.intervention_manager = get_intervention_manager()
         self.file_service = get_file_service()
+        self.media_processor = get_media_processor()
+        self.state_machine = get_state_machine()
 
     async def create_report(
             self,
             report_data: ReportCreate,
             citizen_id: str,
-            media_files: Optional[List[UploadFile]] = None
-    ) -> Report:
-        report = await self.report_manager.create_report(report_data, citizen_id)
+            media_files: Optional[List[UploadFile]] = None,
+            link_duplicates: bool = True
+    ) -> tuple[Report, bool]:
+        """Create a report; returns (report, created), see ReportManager.create_report"""
+        report, created = await self.report_manager.create_report(report_data, citizen_id, link_duplicates)
 
         if media_files:
             for media_file in media_files:
@@ -34,13 +45,17 @@ class ReportService:
                 await self.report_manager.add_media_to_report(
                     str(report.id),
                     {
-                        "type": "image",
+                        "type": media_type(media_file.content_type),
                         "url": media_url,
                         "uploaded_at": datetime.utcnow()
                     }
                 )
+                await self.media_processor.queue_variants("report", report.id, media_url, media_file.content_type)
 
-        return report
+        return report, created
+
+    async def find_duplicates(self, report_data: ReportCreate) -> List[DuplicateCandidate]:
+        return await self.report_manager.find_duplicates(report_data)
 
     async def get_report(self, report_id: str) -> Optional[ReportPublic]:
         return await self.report_manager.get(report_id)
@@ -52,12 +67,15 @@ class ReportService:
             user_id: str
     ) -> Optional[Report]:
         if update_data.status:
-            return await self.report_manager.update_report_status(
-                report_id,
-                update_data.status,
-                user_id
-            )
-        return await self.report_manager.update(report_id, update_data.dict(exclude_unset=True))
+            try:
+                return await self.state_machine.transition_report(
+                    report_id,
+                    update_data.status,
+                    user_id
+                )
+            except TransitionError as e:
+                raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        return await self.report_manager.update_report(report_id, update_data.dict(exclude_unset=True))
 
     async def search_reports(self, search: ReportSearch) -> List[Report]:
         return await self.report_manager.search_reports(search)
@@ -68,14 +86,16 @@ class ReportService:
             media_file: UploadFile
     ) -> Optional[Report]:
         media_url = await self.file_service.upload_report_attachment(media_file, PyObjectId(report_id))
-        return await self.report_manager.add_media_to_report(
+        report = await self.report_manager.add_media_to_report(
             report_id,
             {
-                "type": "image",
+                "type": media_type(media_file.content_type),
                 "url": media_url,
                 "uploaded_at": datetime.utcnow()
             }
         )
+        await self.media_processor.queue_variants("report", report_id, media_url, media_file.content_type)
+        return report
 
     async def get_report_with_interventions(self, report_id: str) -> dict:
         """Get report with all its interventions"""
@@ -92,6 +112,17 @@ class ReportService:
     async def increment_views(self, report_id: str) -> Optional[Report]:
         return await self.report_manager.increment_engagement(report_id, "views")
 
+    async def confirm_report(self, report_id: str, user_id: str) -> Optional[Report]:
+        return await self.report_manager.confirm_report(report_id, user_id)
+
+    async def get_trending(
+            self,
+            zone: Optional[str] = None,
+            category: Optional[str] = None,
+            limit: int = 20
+    ) -> List[Report]:
+        return await self.report_manager.get_trending(zone, category, limit)
+
 
 def get_report_service() -> ReportService:
     return ReportService()
@@ -0,0 +1,124 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from app.api.v1.services.dispatch import technician_index
+from app.core.configs import settings
+from app.db.managers.positions import get_position_manager
+from app.db.managers.users import get_user_manager
+from app.db.models.base import PyObjectId
+from app.db.models.positions import LastKnownPosition, PositionPing
+from app.utils.geospatial import point_lat_lng
+
+logger = logging.getLogger(__name__)
+
+
+class PositionTracker:
+    """
+    Per-worker buffer of technician GPS pings.
+
+    Pings are accepted in memory and written in bulk when the buffer reaches
+    TRACKING_FLUSH_SIZE or every TRACKING_FLUSH_SECONDS, whichever comes first.
+    A compact technician -> (lat, lng, recorded_at) map keeps the last known
+    positions readable without touching the time-series collection.
+    """
+
+    def __init__(self):
+        self.buffer: deque = deque(maxlen=settings.TRACKING_MAX_BUFFER)
+        self.pending_last: Dict[str, Tuple[float, float, datetime]] = {}
+        self.last_positions: Dict[str, Tuple[float, float, datetime]] = {}
+        self._loaded_at = 0.0
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._flush_task: Optional[asyncio.Task] = None
+        self.position_manager = get_position_manager()
+
+    def _remember(self, target: dict, technician_id: str, position: Tuple[float, float, datetime]) -> None:
+        current = target.get(technician_id)
+        if current is None or current[2] < position[2]:
+            target[technician_id] = position
+
+    def add(self, technician_id: str, pings: List[PositionPing]) -> None:
+        oid = self.position_manager.object_id(technician_id)
+        latest = max(pings, key=lambda ping: ping.recorded_at)
+        for ping in pings:
+            self.buffer.append({
+                "technician_id": oid,
+                "recorded_at": ping.recorded_at,
+                "location": {"type": "Point", "coordinates": [ping.lng, ping.lat]},
+                "accuracy": ping.accuracy,
+                "speed": ping.speed,
+                "heading": ping.heading,
+            })
+        position = (latest.lat, latest.lng, latest.recorded_at)
+        self._remember(self.pending_last, technician_id, position)
+        self._remember(self.last_positions, technician_id, position)
+        if technician_id in technician_index.technicians:
+            technician_index.grid.upsert(technician_id, latest.lat, latest.lng)
+
+        if len(self.buffer) >= settings.TRACKING_FLUSH_SIZE and not self._flush_lock.locked():
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def flush(self) -> int:
+        async with self._flush_lock:
+            if not self.buffer and not self.pending_last:
+                return 0
+            docs = list(self.buffer)
+            self.buffer.clear()
+            last, self.pending_last = self.pending_last, {}
+            try:
+                inserted = await self.position_manager.insert_pings(docs)
+                await self.position_manager.save_last_positions(last)
+            except Exception as e:
+                # Put the batch back in front of the pings received meanwhile and retry on
+                # the next flush; past TRACKING_MAX_BUFFER the deque drops the oldest ones
+                logger.error(f"Failed to flush {len(docs)} technician positions: {e}")
+                newer = list(self.buffer)
+                self.buffer.clear()
+                self.buffer.extend(docs)
+                self.buffer.extend(newer)
+                for technician_id, position in last.items():
+                    self._remember(self.pending_last, technician_id, position)
+                return 0
+            return inserted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.TRACKING_FLUSH_SECONDS)
+            await self.flush()
+
+    async def start(self) -> None:
+        await self.position_manager.ensure_collection()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+    async def get_last_positions(self) -> List[LastKnownPosition]:
+        """Last known positions, merging other workers' writes at most every flush interval"""
+        now = time.monotonic()
+        if now - self._loaded_at >= settings.TRACKING_FLUSH_SECONDS:
+            async for doc in get_user_manager().get_last_positions():
+                technician = doc.get("technician", {})
+                position = point_lat_lng(technician.get("position"))
+                if position and technician.get("position_at"):
+                    self._remember(self.last_positions, str(doc["_id"]), (*position, technician["position_at"]))
+            self._loaded_at = now
+        return [
+            LastKnownPosition(technician_id=PyObjectId(technician_id), lat=lat, lng=lng, recorded_at=recorded_at)
+            for technician_id, (lat, lng, recorded_at) in self.last_positions.items()
+        ]
+
+
+position_tracker = PositionTracker()
+
+
+def get_position_tracker() -> PositionTracker:
+    return position_tracker
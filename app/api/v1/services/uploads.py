@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+from tempfile import SpooledTemporaryFile
+from typing import AsyncIterator, Collection, List, Optional, Tuple
+
+from fastapi import HTTPException, Request, UploadFile, status
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.datastructures import Headers
+
+from app.core.configs import settings
+from app.utils.filetypes import DOCUMENT_TYPES, IMAGE_TYPES, SNIFF_BYTES, VIDEO_TYPES, sniff_content_type
+
+MULTIPART_OVERHEAD = 64 * 1024  # boundaries, part headers and small form fields around the file
+SPOOL_MAX_SIZE = 1024 * 1024  # bytes kept in memory before spooling to disk
+
+
+class StreamedUploadFile(UploadFile):
+    """An upload whose content type was sniffed and SHA-256 computed while it was received"""
+
+    def __init__(self, *args, sha256: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sha256 = sha256
+
+
+class _FilePart:
+    def __init__(self, filename: Optional[str]):
+        self.filename = filename
+        self.file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.head = b""
+        self.content_type: Optional[str] = None
+
+
+class UploadReader:
+    """
+    Dependency reading one file field of a multipart body as it streams in,
+    instead of letting the whole body be spooled to disk before any check.
+
+    The declared Content-Length is checked before reading; the file is then
+    counted, sniffed from its first bytes and hashed chunk by chunk, and the
+    request fails with 413 / 415 as soon as it goes over `max_bytes` or
+    turns out not to be one of `allowed_types`, without reading the rest.
+    The content type of the returned file is the sniffed one.
+    """
+
+    def __init__(self, field: str, max_bytes: int, allowed_types: Collection[str]):
+        self.field = field
+        self.max_bytes = max_bytes
+        self.allowed_types = tuple(allowed_types)
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large (max {self.max_bytes // (1024 * 1024)}MB)"
+        )
+
+    def _check_type(self, part: _FilePart) -> None:
+        part.content_type = sniff_content_type(part.head)
+        if part.content_type not in self.allowed_types:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail=f"Unsupported file type, expected one of: {', '.join(self.allowed_types)}"
+            )
+
+    async def _write(self, part: _FilePart, data: bytes) -> None:
+        part.size += len(data)
+        if part.size > self.max_bytes:
+            raise self._too_large()
+        if part.content_type is None:
+            part.head += data[:SNIFF_BYTES - len(part.head)]
+            if len(part.head) >= SNIFF_BYTES:
+                self._check_type(part)
+        part.digest.update(data)
+        # Past SPOOL_MAX_SIZE the spooled file is on disk (this write rolls it over)
+        if part.size > SPOOL_MAX_SIZE:
+            await asyncio.to_thread(part.file.write, data)
+        else:
+            part.file.write(data)
+
+    def _parser(self, request: Request) -> Tuple[MultipartParser, List[Tuple[str, bytes]]]:
+        content_type, params = parse_options_header(request.headers.get("content-type", ""))
+        if content_type != b"multipart/form-data" or b"boundary" not in params:
+            raise HTTPException(
+                status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                detail="Expected a multipart/form-data body"
+            )
+        # The parser calls back synchronously; events are queued and handled between chunks
+        events: List[Tuple[str, bytes]] = []
+
+        def on(name: str):
+            return lambda data=b"", start=0, end=0: events.append((name, data[start:end]))
+
+        parser = MultipartParser(params[b"boundary"], {
+            "on_part_begin": on("part_begin"),
+            "on_part_data": on("part_data"),
+            "on_part_end": on("part_end"),
+            "on_header_field": on("header_field"),
+            "on_header_value": on("header_value"),
+            "on_header_end": on("header_end"),
+            "on_headers_finished": on("headers_finished"),
+        })
+        return parser, events
+
+    async def read(self, request: Request) -> StreamedUploadFile:
+        declared = request.headers.get("content-length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes + MULTIPART_OVERHEAD:
+            raise self._too_large()
+
+        parser, events = self._parser(request)
+        received = 0
+        field, value, headers = b"", b"", {}
+        part: Optional[_FilePart] = None
+        found: Optional[_FilePart] = None
+        try:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > self.max_bytes + MULTIPART_OVERHEAD:
+                    raise self._too_large()
+                parser.write(chunk)
+                for event, data in events:
+                    if event == "part_begin":
+                        field, value, headers = b"", b"", {}
+                    elif event == "header_field":
+                        field += data
+                    elif event == "header_value":
+                        value += data
+                    elif event == "header_end":
+                        headers[field.lower()] = value
+                        field, value = b"", b""
+                    elif event == "headers_finished":
+                        _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                        name = options.get(b"name", b"").decode("latin-1")
+                        if name == self.field and b"filename" in options and found is None:
+                            part = _FilePart(options[b"filename"].decode("utf-8", "replace"))
+                    elif event == "part_data" and part is not None:
+                        await self._write(part, data)
+                    elif event == "part_end" and part is not None:
+                        if part.content_type is None and part.size:
+                            self._check_type(part)
+                        found, part = part, None
+                events.clear()
+        except Exception:
+            for leftover in (part, found):
+                if leftover is not None:
+                    leftover.file.close()
+            raise
+
+        if found is None:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Missing file field {self.field}")
+        if found.size == 0:
+            found.file.close()
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is empty")
+        found.file.seek(0)
+        return StreamedUploadFile(
+            found.file,
+            size=found.size,
+            filename=found.filename,
+            headers=Headers({"content-type": found.content_type}),
+            sha256=found.digest.hexdigest()
+        )
+
+    async def __call__(self, request: Request) -> AsyncIterator[StreamedUploadFile]:
+        upload = await self.read(request)
+        try:
+            yield upload
+        finally:
+            upload.file.close()
+
+    def openapi(self) -> dict:
+        """Request body documentation, since the body is not declared as a FastAPI parameter"""
+        return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "required": [self.field],
+            "properties": {self.field: {"type": "string", "format": "binary"}},
+        }}}}}
+
+
+ATTACHMENT_TYPES = IMAGE_TYPES + VIDEO_TYPES + DOCUMENT_TYPES
+AVATAR_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+
+report_media_upload = UploadReader("media_file", settings.MAX_UPLOAD_SIZE, ATTACHMENT_TYPES)
+intervention_photo_upload = UploadReader("photo", settings.MAX_UPLOAD_SIZE, IMAGE_TYPES)
+avatar_upload = UploadReader("avatar", settings.MAX_AVATAR_SIZE, AVATAR_TYPES)
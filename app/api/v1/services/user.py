@@ -1,8 +1,9 @@
+from datetime import datetime
 from typing import List, Optional
 
 from app.db.managers.users import get_user_manager
 from app.db.models.base import PyObjectId
-from app.db.models.users import UserPublic, UserSearch, UserUpdate
+from app.db.models.users import UserPublic, UserSearch, UserUpdate, TechnicianAvailability
 
 
 class UserService:
@@ -58,12 +59,15 @@ class UserService:
     async def update_technician_availability(
             self,
             user_id: PyObjectId,
-            availability: str
+            availability: TechnicianAvailability
     ) -> UserPublic:
         """Update technician availability status"""
         return await self.user_manager.update(
             user_id,
-            {"technician.availability": availability}
+            {
+                "technician.availability": availability,
+                "technician.updated_at": datetime.utcnow()
+            }
         )
 
     async def get_active_reporting_users(self, skip: int = 0, limit: int = 100) -> List[UserPublic]:
@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+
+from app.core.configs import settings
+from app.db.managers.jobs import get_job_manager
+from app.db.managers.reports import get_report_manager
+from app.db.managers.votes import get_vote_manager
+from app.db.models.jobs import JobType
+from app.db.models.votes import VoteStatus
+
+logger = logging.getLogger(__name__)
+
+
+class VoteCounter:
+    """
+    Per-worker buffer of report vote count deltas.
+
+    Votes themselves are written immediately (the unique index makes them
+    idempotent); only the `engagement.votes` counters are buffered in memory and
+    written every VOTES_FLUSH_SECONDS with one bulk write, so a viral report
+    takes one counter update per worker and interval instead of one per vote.
+    Deltas keep the time of their vote, so a flush skips the ones a counter
+    rebuild (see VoteManager.rebuild_report_vote_counts) already counted.
+    """
+
+    def __init__(self):
+        self.pending: Dict[str, List[Tuple[datetime, int]]] = defaultdict(list)
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, report_id: str, delta: int, at: datetime) -> None:
+        self.pending[report_id].append((at, delta))
+
+    def pending_votes(self, report_id: str) -> int:
+        return sum(delta for _, delta in self.pending.get(report_id, ()))
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if not self.pending:
+                return
+            deltas, self.pending = self.pending, defaultdict(list)
+            try:
+                await get_report_manager().apply_vote_deltas(deltas)
+            except Exception as e:
+                # Keep the deltas for the next flush
+                logger.error(f"Failed to flush vote counters of {len(deltas)} reports: {e}")
+                for report_id, entries in deltas.items():
+                    self.pending[report_id].extend(entries)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(settings.VOTES_FLUSH_SECONDS)
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.flush()
+
+
+vote_counter = VoteCounter()
+
+
+class VoteService:
+    def __init__(self):
+        self.vote_manager = get_vote_manager()
+        self.report_manager = get_report_manager()
+        self.counter = vote_counter
+
+    async def _engagement(self, report_id: str) -> dict:
+        engagement = await self.report_manager.get_engagement(report_id)
+        if engagement is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+        return engagement
+
+    def _status(self, report_id: str, voted: bool, engagement: dict) -> VoteStatus:
+        # Include this worker's unflushed votes so users see their own vote counted
+        votes = engagement.get("votes", 0) + self.counter.pending_votes(report_id)
+        return VoteStatus(report_id=report_id, voted=voted, votes=max(votes, 0))
+
+    async def vote(self, report_id: str, user_id: str) -> VoteStatus:
+        engagement = await self._engagement(report_id)
+        at = datetime.utcnow()
+        if await self.vote_manager.add_vote(report_id, user_id, at):
+            self.counter.add(report_id, 1, at)
+        return self._status(report_id, True, engagement)
+
+    async def unvote(self, report_id: str, user_id: str) -> VoteStatus:
+        engagement = await self._engagement(report_id)
+        at = datetime.utcnow()
+        if await self.vote_manager.remove_vote(report_id, user_id):
+            self.counter.add(report_id, -1, at)
+        return self._status(report_id, False, engagement)
+
+    async def lookup(self, user_id: str, report_ids: List[str]) -> Dict[str, bool]:
+        voted = await self.vote_manager.voted_report_ids(user_id, report_ids)
+        return {report_id: report_id in voted for report_id in report_ids}
+
+    async def rebuild_counts(self) -> str:
+        """Queue the rebuild; returns the job id"""
+        return await get_job_manager().enqueue(JobType.VOTES_REBUILD)
+
+
+def get_vote_service() -> VoteService:
+    return VoteService()
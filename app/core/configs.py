@@ -1,6 +1,6 @@
 import secrets
 import warnings
-from typing import Annotated, Any, Literal, Optional
+from typing import Annotated, Any, Dict, List, Literal, Optional
 
 from dotenv import load_dotenv
 from pydantic import (
@@ -73,8 +73,79 @@ class Settings(BaseSettings):
     # File upload settings
 
     # FILE UPLOAD
-    MAX_UPLOAD_SIZE: int = 10  # in MB
-    MAX_AVATAR_SIZE: int = 5  # 5MB
+    MAX_UPLOAD_SIZE: int = 10  # set in MB, converted to bytes
+    MAX_AVATAR_SIZE: int = 5  # set in MB, converted to bytes
+    MEDIA_WORKERS: int = 2  # image processes per job worker
+    MEDIA_VARIANT_SIZES: Dict[str, int] = {"thumbnail": 320, "medium": 1280}  # name -> longest side in pixels
+    MEDIA_VARIANT_FORMATS: List[str] = ["webp", "jpeg"]
+    MEDIA_VARIANT_QUALITY: int = 80
+    MEDIA_PRIVATE: bool = True  # objects are uploaded without public-read and served through presigned URLs
+    MEDIA_URL_EXPIRE_SECONDS: int = 6 * 3600
+    MEDIA_URL_CACHE_SIZE: int = 50_000  # signed URLs kept per worker
+
+    # DISPATCH
+    DISPATCH_MAX_DISTANCE_KM: float = 30
+    DISPATCH_REFRESH_SECONDS: int = 15  # delta refresh of the technician index
+    DISPATCH_FULL_REFRESH_SECONDS: int = 600
+    DISPATCH_LOAD_PENALTY_KM: float = 2  # one open intervention weighs as much as 2 km
+    DISPATCH_BUSY_PENALTY_KM: float = 5
+    ROUTE_AVERAGE_SPEED_KMH: float = 25
+
+    # DUPLICATE REPORTS
+    DUPLICATE_RADIUS_M: float = 75
+    DUPLICATE_WINDOW_DAYS: int = 14
+    DUPLICATE_MAX_CANDIDATES: int = 20  # nearest reports compared by title
+    DUPLICATE_MIN_SIMILARITY: float = 0.35  # title similarity to be listed as a candidate
+    DUPLICATE_LINK_SIMILARITY: float = 0.6  # title similarity to link a new report to an existing one
+
+    # TRENDING
+    HOT_SCORE_HALF_LIFE_HOURS: float = 24  # engagement must double per half-life of age to keep the same rank
+
+    # VOTES
+    VOTES_FLUSH_SECONDS: float = 2  # buffered vote counters are written to reports this often
+
+    # COMMENTS
+    COMMENTS_PER_BUCKET: int = 50  # comments per stored page, also the page size of reads
+
+    # JOBS
+    JOBS_CONCURRENCY: int = 8  # jobs run at once per worker process
+    JOBS_POLL_SECONDS: float = 1  # wait between claims when the queue is empty
+    JOBS_LEASE_SECONDS: int = 60  # a job whose worker stops renewing this is handed out again
+    JOBS_MAX_ATTEMPTS: int = 5
+    JOBS_RETRY_BASE_SECONDS: float = 10  # doubled on every failed attempt
+    JOBS_RETRY_MAX_SECONDS: float = 3600
+    JOBS_RETENTION_DAYS: int = 7  # finished jobs are deleted after this, dead ones are kept
+
+    # NOTIFICATIONS
+    NOTIFICATIONS_BATCH_SIZE: int = 1000  # inbox entries per insert_many
+    NOTIFICATIONS_QUEUE_SIZE: int = 10000  # pending status changes per worker before new ones are dropped
+    DIGEST_HOUR_UTC: int = 7  # daily digests cover the 24 hours up to this hour, weekly ones end on Mondays
+    DIGEST_ITEMS_PER_ZONE: int = 10  # notifications listed per zone, the rest are only counted
+
+    # EVENTS
+    EVENTS_HEARTBEAT_SECONDS: float = 15  # keeps idle streams open through proxies
+    EVENTS_SUBSCRIBER_BUFFER: int = 100  # unsent events per stream, the oldest are dropped past this
+    EVENTS_QUEUE_SIZE: int = 10000  # status changes waiting to be routed per worker
+    EVENTS_MAX_FILTERS: int = 50  # report ids / zones per stream
+
+    # ZONES
+    ZONES_REFRESH_SECONDS: int = 30
+
+    # ANALYTICS
+    ANALYTICS_SKETCH_ACCURACY: float = 0.02  # relative error of duration percentiles
+    SNAPSHOT_REFRESH_SECONDS: int = 10  # delta refresh of the in-memory report snapshot
+    SNAPSHOT_FULL_REFRESH_SECONDS: int = 3600
+    HEATMAP_CACHE_SIZE: int = 512  # tiles kept per worker
+
+    # TECHNICIAN TRACKING
+    TRACKING_FLUSH_SIZE: int = 2000  # pings buffered before a write
+    TRACKING_FLUSH_SECONDS: float = 5
+    TRACKING_MAX_BUFFER: int = 50000  # oldest pings are dropped past this if Mongo is down
+    TRACKING_RETENTION_DAYS: int = 30
+
+    # EXPORTS
+    EXPORT_CURSOR_BATCH_SIZE: int = 1000  # documents per getMore
+    EXPORT_CHUNK_BYTES: int = 64 * 1024  # response body is written in chunks of about this size
 
     # SENTRY
     SENTRY_DSN: HttpUrl | None = None
@@ -86,6 +157,13 @@ class Settings(BaseSettings):
     EMAIL_FROM_NAME: str = "Your App Name"
     EMAIL_PORT: int = 587
     EMAIL_SERVER: str
+    EMAIL_USE_TLS: bool = True  # implicit TLS; set False with EMAIL_STARTTLS or for a local MailDev
+    EMAIL_STARTTLS: bool = False
+    EMAIL_POOL_SIZE: int = 10  # persistent SMTP connections per worker process
+    EMAIL_TIMEOUT_SECONDS: float = 30
+    EMAIL_IDLE_SECONDS: float = 60  # pooled connections idle longer than this are reopened before use
+    EMAIL_MAX_RETRIES: int = 3  # per message, on transient SMTP errors
+    EMAIL_BATCH_SIZE: int = 200  # messages per email job
 
     @model_validator(mode="after")
     def _enforce_non_default_secrets(self) -> Self:
@@ -116,7 +194,7 @@ class Settings(BaseSettings):
             return "INFO"
         return v
 
-    @field_validator('MAX_UPLOAD_SIZE')
+    @field_validator('MAX_UPLOAD_SIZE', 'MAX_AVATAR_SIZE')
     def convert_to_bytes(cls, v: int) -> int:
         """Convert MB to bytes"""
         return v * 1024 * 1024
@@ -0,0 +1,77 @@
+import hashlib
+import json
+import math
+from datetime import datetime, timezone
+
+from app.core.configs import settings
+from app.db.models.reports import ReportPriority
+
+# Hot score: log10(priority weight * (1 + weighted engagement)) + creation time in
+# half-lives * log10(2). A report must double its weighted engagement to keep up with
+# one created a half-life later, i.e. engagement decays exponentially with age, yet the
+# score of a report only changes when its engagement or priority does.
+ENGAGEMENT_WEIGHTS = {"views": 0.1, "confirmations": 3, "votes": 2, "comments": 1}
+PRIORITY_WEIGHTS = {
+    ReportPriority.LOW: 1,
+    ReportPriority.MEDIUM: 1.5,
+    ReportPriority.HIGH: 2.5,
+    ReportPriority.URGENT: 4,
+}
+
+
+def hot_score(report: dict) -> float:
+    engagement = report.get("engagement") or {}
+    weighted = sum(weight * engagement.get(field, 0) for field, weight in ENGAGEMENT_WEIGHTS.items())
+    priority = PRIORITY_WEIGHTS.get(report.get("priority"), 1)
+    created_at = (report.get("created_at") or datetime.utcnow()).replace(tzinfo=timezone.utc)
+    half_lives = created_at.timestamp() / (settings.HOT_SCORE_HALF_LIFE_HOURS * 3600)
+    return math.log10(priority * (1 + weighted)) + half_lives * math.log10(2)
+
+
+def hot_score_version() -> str:
+    """Fingerprint of the scoring parameters: scores computed with other ones are stale"""
+    parameters = [
+        sorted(ENGAGEMENT_WEIGHTS.items()),
+        sorted((priority.value, weight) for priority, weight in PRIORITY_WEIGHTS.items()),
+        settings.HOT_SCORE_HALF_LIFE_HOURS,
+    ]
+    return hashlib.sha1(json.dumps(parameters).encode()).hexdigest()[:12]
+
+
+def hot_score_expression() -> dict:
+    """Aggregation expression of a report's hot score, the server-side twin of `hot_score`"""
+    weighted = {
+        "$add": [
+            1,
+            *[
+                {"$multiply": [weight, {"$ifNull": [f"$engagement.{field}", 0]}]}
+                for field, weight in ENGAGEMENT_WEIGHTS.items()
+            ]
+        ]
+    }
+    priority = {
+        "$switch": {
+            "branches": [
+                {"case": {"$eq": ["$priority", priority.value]}, "then": weight}
+                for priority, weight in PRIORITY_WEIGHTS.items()
+            ],
+            "default": 1
+        }
+    }
+    half_lives = {
+        "$divide": [
+            {"$toLong": {"$ifNull": ["$created_at", "$$NOW"]}},
+            settings.HOT_SCORE_HALF_LIFE_HOURS * 3600 * 1000
+        ]
+    }
+    return {
+        "$add": [
+            {"$log10": {"$multiply": [priority, weighted]}},
+            {"$multiply": [half_lives, math.log10(2)]}
+        ]
+    }
+
+
+def hot_score_stage() -> dict:
+    """Pipeline update stage setting `hot_score`"""
+    return {"$set": {"hot_score": hot_score_expression()}}
@@ -0,0 +1,18 @@
+from app.db.managers.analytics import get_analytics_manager
+from app.db.managers.comments import get_comment_manager
+from app.db.managers.files import get_stored_file_manager
+from app.db.managers.jobs import get_job_manager
+from app.db.managers.notifications import get_notification_manager
+from app.db.managers.reports import get_report_manager
+from app.db.managers.votes import get_vote_manager
+
+
+async def ensure_indexes():
+    """Create the indexes the managers rely on (no-op when they already exist)"""
+    await get_analytics_manager().ensure_indexes()
+    await get_report_manager().ensure_indexes()
+    await get_vote_manager().ensure_indexes()
+    await get_comment_manager().ensure_indexes()
+    await get_notification_manager().ensure_indexes()
+    await get_job_manager().ensure_indexes()
+    await get_stored_file_manager().ensure_indexes()
@@ -0,0 +1,424 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.core.configs import settings
+from app.db.managers.base import DBManager
+from app.db.models.analytics import DurationMetric, ReportRollup, RollupGranularity
+from app.db.mongodb import get_db
+from app.utils.sketches import LogSketch
+
+ROLLUP_DIMENSIONS = ("zone", "category", "priority", "status")
+
+BUCKET_FORMATS = {
+    RollupGranularity.HOUR: "%Y-%m-%dT%H",
+    RollupGranularity.DAY: "%Y-%m-%d",
+}
+
+# Rollup status whose documents carry each duration sketch, and the
+# status_history comment identifying the event for first interventions
+DURATION_STATUSES = {
+    DurationMetric.RESOLUTION: "RESOLVED",
+    DurationMetric.FIRST_INTERVENTION: "ASSIGNED",
+}
+FIRST_INTERVENTION_COMMENT = "Initial intervention created"
+
+# Fields read from a report to file it under its rollup keys
+ROLLUP_PROJECTION = {"status": 1, "category": 1, "priority": 1, "location.zone": 1, "created_at": 1}
+
+
+def truncate(date: datetime, granularity: RollupGranularity) -> datetime:
+    if granularity == RollupGranularity.HOUR:
+        return date.replace(minute=0, second=0, microsecond=0)
+    return date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_dimensions(report: dict, status: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """Rollup dimensions of a raw report document, optionally for another status"""
+    dimensions = {
+        "zone": (report.get("location") or {}).get("zone"),
+        "category": report.get("category"),
+        "priority": report.get("priority"),
+        "status": status or report.get("status"),
+    }
+    # Enum members (fresh models) and plain strings (raw documents) must give the same keys
+    return {key: getattr(value, "value", value) for key, value in dimensions.items()}
+
+
+class AnalyticsManager(DBManager):
+    """
+    Pre-aggregated report counters, one document per
+    (granularity, bucket, zone, category, priority, status):
+
+    - `hour` / `day` buckets count the reports that *entered* the status in
+      that period (creation counts as entering its initial status);
+    - the `current` granularity holds the number of reports sitting in each
+      status right now.
+
+    Documents are upserted with `$inc` on every report write, so dashboards
+    only read rollups and never scan reports. Hour / day documents of RESOLVED
+    (and ASSIGNED) also carry a `LogSketch` of the time since creation under
+    `sketches.<metric>.<bin>`; sketches of any set of buckets merge by summing
+    bins, giving percentiles over arbitrary ranges from constant-size state.
+    """
+
+    def __init__(self):
+        super().__init__("report_rollups", ReportRollup)
+        self.sketch = LogSketch(settings.ANALYTICS_SKETCH_ACCURACY)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        await collection.create_index([("granularity", ASCENDING), ("bucket", ASCENDING)])
+
+    @staticmethod
+    def rollup_key(granularity: RollupGranularity, bucket: Optional[datetime], dimensions: dict) -> str:
+        bucket_key = bucket.strftime(BUCKET_FORMATS[granularity]) if bucket else "-"
+        values = [dimensions.get(d) or "-" for d in ROLLUP_DIMENSIONS]
+        return "|".join([granularity.value, bucket_key, *values])
+
+    def _increment(
+            self,
+            granularity: RollupGranularity,
+            bucket: Optional[datetime],
+            dimensions: dict,
+            amount: int,
+            durations: Optional[Dict[DurationMetric, float]] = None
+    ) -> UpdateOne:
+        increments = {"count": amount}
+        for metric, seconds in (durations or {}).items():
+            increments[f"sketches.{metric.value}.{self.sketch.key(seconds)}"] = 1
+        return UpdateOne(
+            {"_id": self.rollup_key(granularity, bucket, dimensions)},
+            {
+                "$inc": increments,
+                "$setOnInsert": {"granularity": granularity, "bucket": bucket, **dimensions}
+            },
+            upsert=True
+        )
+
+    def _entered(
+            self,
+            dimensions: dict,
+            at: datetime,
+            amount: int = 1,
+            durations: Optional[Dict[DurationMetric, float]] = None
+    ) -> List[UpdateOne]:
+        return [
+            self._increment(granularity, truncate(at, granularity), dimensions, amount, durations)
+            for granularity in (RollupGranularity.HOUR, RollupGranularity.DAY)
+        ]
+
+    async def record_report_created(self, report: dict, session=None) -> None:
+        dimensions = rollup_dimensions(report)
+        await self._write([
+            *self._entered(dimensions, report.get("created_at") or datetime.utcnow()),
+            self._increment(RollupGranularity.CURRENT, None, dimensions, 1),
+        ], session=session)
+
+    def status_change_operations(self, report: dict, new_status: str, at: datetime) -> List[UpdateOne]:
+        """`report` is the document as it was before the change"""
+        before = rollup_dimensions(report)
+        after = rollup_dimensions(report, new_status)
+        durations = {}
+        if after["status"] == DURATION_STATUSES[DurationMetric.RESOLUTION] and report.get("created_at"):
+            durations[DurationMetric.RESOLUTION] = (at - report["created_at"]).total_seconds()
+        return [
+            *self._entered(after, at, durations=durations),
+            self._increment(RollupGranularity.CURRENT, None, before, -1),
+            self._increment(RollupGranularity.CURRENT, None, after, 1),
+        ]
+
+    async def record_status_change(
+            self,
+            report: dict,
+            new_status: str,
+            at: Optional[datetime] = None,
+            session=None
+    ) -> None:
+        """`report` is the document as it was before the change"""
+        await self._write(self.status_change_operations(report, new_status, at or datetime.utcnow()), session=session)
+
+    async def record_status_changes(self, reports: List[dict], new_status: str, at: datetime) -> None:
+        """Same as `record_status_change` for many reports, in a single bulk write"""
+        operations = [op for report in reports for op in self.status_change_operations(report, new_status, at)]
+        if operations:
+            await self._write(operations)
+
+    async def record_first_intervention(self, report: dict, at: datetime, session=None) -> None:
+        """Add the report's time to first intervention to its ASSIGNED buckets (`report` as before the change)"""
+        if not report.get("created_at"):
+            return
+        dimensions = rollup_dimensions(report, DURATION_STATUSES[DurationMetric.FIRST_INTERVENTION])
+        durations = {DurationMetric.FIRST_INTERVENTION: (at - report["created_at"]).total_seconds()}
+        await self._write(self._entered(dimensions, at, amount=0, durations=durations), session=session)
+
+    async def record_dimensions_change(self, report: dict, changes: dict) -> None:
+        """Move a report between `current` rollups after its category or priority changed"""
+        before = rollup_dimensions(report)
+        after = rollup_dimensions({**report, **{k: v for k, v in changes.items() if k in ROLLUP_DIMENSIONS}})
+        if before == after:
+            return
+        await self._write([
+            self._increment(RollupGranularity.CURRENT, None, before, -1),
+            self._increment(RollupGranularity.CURRENT, None, after, 1),
+        ])
+
+    async def _write(self, operations: List[UpdateOne], session=None) -> None:
+        collection = await self.get_collection()
+        await collection.bulk_write(operations, ordered=False, session=session)
+
+    async def query(
+            self,
+            granularity: RollupGranularity,
+            filters: Dict[str, str],
+            group_by: List[str],
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ) -> List[dict]:
+        """Sum rollup counts over a period, grouped by `group_by` (dimensions and/or `bucket`)"""
+        match = {"granularity": granularity, **{k: v for k, v in filters.items() if v}}
+        if granularity != RollupGranularity.CURRENT and (start or end):
+            match["bucket"] = {}
+            if start:
+                match["bucket"]["$gte"] = truncate(start, granularity)
+            if end:
+                match["bucket"]["$lt"] = end
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": {key: f"${key}" for key in group_by}, "count": {"$sum": "$count"}}},
+            {"$match": {"count": {"$ne": 0}}},
+            {"$sort": {f"_id.{key}": 1 for key in group_by} or {"count": -1}},
+        ]
+        collection = await self.get_collection()
+        return [
+            {**doc["_id"], "count": doc["count"]}
+            async for doc in collection.aggregate(pipeline)
+        ]
+
+    async def durations(
+            self,
+            metric: DurationMetric,
+            granularity: RollupGranularity,
+            filters: Dict[str, str],
+            group_by: List[str],
+            quantiles: List[float],
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Percentiles of a duration metric over a period: the sketches of the
+        matching buckets are summed bin by bin server side, then read here.
+        """
+        match = {
+            "granularity": granularity,
+            "status": DURATION_STATUSES[metric],
+            f"sketches.{metric.value}": {"$exists": True},
+            **{k: v for k, v in filters.items() if v},
+        }
+        if start or end:
+            match["bucket"] = {}
+            if start:
+                match["bucket"]["$gte"] = truncate(start, granularity)
+            if end:
+                match["bucket"]["$lt"] = end
+        pipeline = [
+            {"$match": match},
+            {"$project": {**{key: 1 for key in group_by}, "bins": {"$objectToArray": f"$sketches.{metric.value}"}}},
+            {"$unwind": "$bins"},
+            {
+                "$group": {
+                    "_id": {**{key: f"${key}" for key in group_by}, "bin": "$bins.k"},
+                    "count": {"$sum": "$bins.v"}
+                }
+            },
+        ]
+        collection = await self.get_collection()
+        groups: Dict[tuple, tuple] = {}
+        async for doc in collection.aggregate(pipeline):
+            keys = {key: doc["_id"].get(key) for key in group_by}
+            group_key = tuple(keys.get(key) for key in group_by)
+            if group_key not in groups:
+                groups[group_key] = (keys, LogSketch(settings.ANALYTICS_SKETCH_ACCURACY))
+            groups[group_key][1].merge({doc["_id"]["bin"]: doc["count"]})
+
+        rows = [
+            {**keys, "count": sketch.count, **sketch.quantiles(quantiles)}
+            for keys, sketch in groups.values()
+            if sketch.count
+        ]
+        return sorted(rows, key=lambda row: tuple(str(row.get(key)) for key in group_by))
+
+    async def backfill(self) -> None:
+        """
+        Rebuild every rollup from the reports collection server side
+        ($group + $merge). Meant for first deployment or after a repair.
+
+        Rollups are built into a separate collection renamed over the live
+        one, so documents of keys without reports anymore go away too.
+        Increments made while the rebuild runs are lost with the old
+        collection.
+        """
+        async with get_db() as db:
+            reports = db["reports"]
+            rebuild = db[f"{self.collection_name}_rebuild"]
+            await rebuild.drop()
+            # Also creates the collection, so there is something to rename without any report
+            await rebuild.create_index([("granularity", ASCENDING), ("bucket", ASCENDING)])
+            for granularity in (RollupGranularity.HOUR, RollupGranularity.DAY):
+                await reports.aggregate(self._history_pipeline(granularity, rebuild.name)).to_list(length=None)
+            await reports.aggregate(self._current_pipeline(rebuild.name)).to_list(length=None)
+            await rebuild.rename(self.collection_name, dropTarget=True)
+
+    def _key_expression(self, granularity: RollupGranularity, bucket) -> dict:
+        bucket_key = {"$dateToString": {"date": bucket, "format": BUCKET_FORMATS[granularity]}} if bucket else "-"
+        parts = [granularity.value, bucket_key] + [
+            {"$ifNull": [f"$_id.{d}", "-"]} for d in ROLLUP_DIMENSIONS
+        ]
+        joined = []
+        for i, part in enumerate(parts):
+            if i:
+                joined.append("|")
+            joined.append(part)
+        return {"$concat": joined}
+
+    def _merge_stages(self, granularity: RollupGranularity, bucket, into: str) -> List[dict]:
+        return [
+            {
+                "$project": {
+                    "_id": self._key_expression(granularity, bucket),
+                    "granularity": {"$literal": granularity.value},
+                    "bucket": bucket if bucket else {"$literal": None},
+                    **{d: f"$_id.{d}" for d in ROLLUP_DIMENSIONS},
+                    "count": 1,
+                    "sketches": 1,
+                }
+            },
+            {"$merge": {"into": into, "on": "_id", "whenMatched": "replace"}},
+        ]
+
+    def _history_pipeline(self, granularity: RollupGranularity, into: str) -> List[dict]:
+        unit = "hour" if granularity == RollupGranularity.HOUR else "day"
+        return [
+            {
+                "$project": {
+                    "category": 1,
+                    "priority": 1,
+                    "created_at": 1,
+                    "zone": "$location.zone",
+                    # Creation is the first event, then every recorded status change
+                    "events": {
+                        "$concatArrays": [
+                            [{"status": "REPORTED", "date": "$created_at"}],
+                            {
+                                "$map": {
+                                    "input": {"$ifNull": ["$status_history", []]},
+                                    "in": {"status": "$$this.status", "date": "$$this.date", "comment": "$$this.comment"}
+                                }
+                            }
+                        ]
+                    }
+                }
+            },
+            {"$unwind": "$events"},
+            {"$match": {"events.date": {"$type": "date"}}},
+            {
+                "$addFields": {
+                    "sketch_bin": {
+                        "$cond": [
+                            {
+                                "$and": [
+                                    {"$eq": [{"$type": "$created_at"}, "date"]},
+                                    {
+                                        "$or": [
+                                            {"$eq": ["$events.status", DURATION_STATUSES[DurationMetric.RESOLUTION]]},
+                                            {"$eq": ["$events.comment", FIRST_INTERVENTION_COMMENT]}
+                                        ]
+                                    }
+                                ]
+                            },
+                            self._sketch_bin_expression({"$subtract": ["$events.date", "$created_at"]}),
+                            None
+                        ]
+                    }
+                }
+            },
+            {
+                "$group": {
+                    "_id": {
+                        "bucket": {"$dateTrunc": {"date": "$events.date", "unit": unit}},
+                        "zone": "$zone",
+                        "category": "$category",
+                        "priority": "$priority",
+                        "status": "$events.status",
+                        "bin": "$sketch_bin"
+                    },
+                    "count": {"$sum": 1}
+                }
+            },
+            {
+                "$group": {
+                    "_id": {d: f"$_id.{d}" for d in ("bucket", *ROLLUP_DIMENSIONS)},
+                    "count": {"$sum": "$count"},
+                    "bins": {"$push": {"k": {"$toString": "$_id.bin"}, "v": "$count", "binned": {"$ne": ["$_id.bin", None]}}}
+                }
+            },
+            {
+                "$addFields": {
+                    "bins": {
+                        "$map": {
+                            "input": {"$filter": {"input": "$bins", "cond": "$$this.binned"}},
+                            "in": {"k": "$$this.k", "v": "$$this.v"}
+                        }
+                    }
+                }
+            },
+            {
+                "$addFields": {
+                    "sketches": {
+                        "$cond": [
+                            {"$gt": [{"$size": "$bins"}, 0]},
+                            {
+                                "$arrayToObject": [[{
+                                    "k": {
+                                        "$cond": [
+                                            {"$eq": ["$_id.status", DURATION_STATUSES[DurationMetric.RESOLUTION]]},
+                                            DurationMetric.RESOLUTION.value,
+                                            DurationMetric.FIRST_INTERVENTION.value
+                                        ]
+                                    },
+                                    "v": {"$arrayToObject": "$bins"}
+                                }]]
+                            },
+                            "$$REMOVE"
+                        ]
+                    }
+                }
+            },
+            *self._merge_stages(granularity, "$_id.bucket", into),
+        ]
+
+    def _sketch_bin_expression(self, milliseconds) -> dict:
+        """Server-side equivalent of `LogSketch.key` for a duration in milliseconds"""
+        seconds = {"$max": [1, {"$divide": [milliseconds, 1000]}]}
+        return {"$max": [0, {"$toInt": {"$ceil": {"$divide": [{"$ln": seconds}, self.sketch.log_gamma]}}}]}
+
+    def _current_pipeline(self, into: str) -> List[dict]:
+        return [
+            {
+                "$group": {
+                    "_id": {
+                        "zone": "$location.zone",
+                        "category": "$category",
+                        "priority": "$priority",
+                        "status": "$status"
+                    },
+                    "count": {"$sum": 1}
+                }
+            },
+            *self._merge_stages(RollupGranularity.CURRENT, None, into),
+        ]
+
+
+def get_analytics_manager() -> AnalyticsManager:
+    return AnalyticsManager()
@@ -21,19 +21,26 @@ class DBManager:
         kwargs["_id"] = str(kwargs["_id"])
         return self._model(**kwargs)
 
+    @staticmethod
+    def object_id(_id: Union[str, ObjectId]) -> Union[str, ObjectId]:
+        """Coerce a hex string id into the ObjectId stored in `_id`"""
+        if isinstance(_id, str) and ObjectId.is_valid(_id):
+            return ObjectId(_id)
+        return _id
+
     async def get_collection(self) -> AsyncIOMotorCollection:
         async with get_db() as db:
             return db[self.collection_name]
 
-    async def create(self, obj_in: CreateSchemaType) -> ModelType:
+    async def create(self, obj_in: CreateSchemaType, session=None) -> ModelType:
         collection = await self.get_collection()
         obj_dict = obj_in.copy()
         if not isinstance(obj_in, dict):
             obj_dict = obj_in.dict()
         # if '_id' in obj_dict:
         #     obj_dict['_id'] = PyObjectId(obj_dict.pop('id'))
-        result = await collection.insert_one(obj_dict)
-        return await self.get(result.inserted_id)
+        result = await collection.insert_one(obj_dict, session=session)
+        return await self.get(result.inserted_id, session=session)
 
     async def create_if_not_exists(
             self,
@@ -67,11 +74,9 @@ class DBManager:
         result = await collection.insert_many(obj_dicts)
         return [await self.get(id) for id in result.inserted_ids]
 
-    async def get(self, _id: Union[str, ObjectId]) -> Optional[ModelType]:
+    async def get(self, _id: Union[str, ObjectId], session=None) -> Optional[ModelType]:
         collection = await self.get_collection()
-        if isinstance(id, str):
-            _id = PyObjectId(id)
-        obj = await collection.find_one({"_id": _id})
+        obj = await collection.find_one({"_id": self.object_id(_id)}, session=session)
         return self.model(**obj) if obj else None
 
     async def get_many(
@@ -107,8 +112,7 @@ class DBManager:
             obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> Optional[ModelType]:
         collection = await self.get_collection()
-        if isinstance(_id, str):
-            _id = PyObjectId(_id)
+        _id = self.object_id(_id)
 
         if isinstance(obj_in, BaseModel):
             update_data = obj_in.dict(exclude_unset=True)
@@ -118,9 +122,13 @@ class DBManager:
         if 'id' in update_data:
             del update_data['id']
 
+        # Callers may pass raw update operators ($inc, $push, ...)
+        if not any(key.startswith("$") for key in update_data):
+            update_data = {"$set": update_data}
+
         result = await collection.update_one(
             {"_id": _id},
-            {"$set": update_data}
+            update_data
         )
         if result.modified_count:
             return await self.get(_id)
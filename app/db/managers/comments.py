@@ -0,0 +1,80 @@
+from typing import Optional
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.core.configs import settings
+from app.db.managers.base import DBManager
+from app.db.models.comments import CommentBucket, CommentTarget
+
+
+class CommentManager(DBManager):
+    """
+    Comment threads stored with the bucket pattern: one document per page of
+    COMMENTS_PER_BUCKET comments of a report or intervention. Each comment gets
+    its sequence number from the counter on its target, which also picks its
+    page, so concurrent writers never race to open the next bucket and reading
+    a page is a single document fetch.
+    """
+
+    def __init__(self):
+        super().__init__("comment_buckets", CommentBucket)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        await collection.create_index(
+            [("target_type", ASCENDING), ("target_id", ASCENDING), ("page", DESCENDING)],
+            unique=True
+        )
+
+    @staticmethod
+    def page_of(seq: int) -> int:
+        return (seq - 1) // settings.COMMENTS_PER_BUCKET
+
+    async def add_comment(self, target_type: CommentTarget, target_id: str, comment: dict) -> None:
+        collection = await self.get_collection()
+        await collection.update_one(
+            {"target_type": target_type, "target_id": target_id, "page": self.page_of(comment["seq"])},
+            {"$push": {"comments": {"$each": [comment], "$sort": {"seq": 1}}}},
+            upsert=True
+        )
+
+    async def get_page(
+            self,
+            target_type: CommentTarget,
+            target_id: str,
+            page: Optional[int] = None
+    ) -> Optional[CommentBucket]:
+        """A page of a thread, the latest one when `page` is None"""
+        filters = {"target_type": target_type, "target_id": target_id}
+        if page is not None:
+            filters["page"] = page
+        collection = await self.get_collection()
+        bucket = await collection.find_one(filters, sort=[("page", DESCENDING)])
+        return self.model(**bucket) if bucket else None
+
+    async def delete_comment(
+            self,
+            target_type: CommentTarget,
+            target_id: str,
+            seq: int,
+            author_id: Optional[str] = None
+    ) -> bool:
+        """Blank a comment, keeping its place in the thread (only the author's when `author_id` is given)"""
+        match = {"seq": seq, "deleted": False}
+        if author_id:
+            match["author_id"] = author_id
+        collection = await self.get_collection()
+        result = await collection.update_one(
+            {
+                "target_type": target_type,
+                "target_id": target_id,
+                "page": self.page_of(seq),
+                "comments": {"$elemMatch": match},
+            },
+            {"$set": {"comments.$.body": "", "comments.$.deleted": True}}
+        )
+        return result.modified_count > 0
+
+
+def get_comment_manager() -> CommentManager:
+    return CommentManager()
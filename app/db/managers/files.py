@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.db.managers.base import DBManager
+from app.db.models.files import StoredFile
+
+
+class StoredFileManager(DBManager):
+    """
+    Hash index of uploaded objects: SHA-256 of the content -> content-addressed
+    key. An upload whose hash is already indexed reuses the stored object
+    instead of being written again.
+
+    An entry whose last reference is released stays as a tombstone (refs 0)
+    that refuses new references until its objects are deleted from S3 and
+    `purge` removes it, so an upload of the same content can never be
+    pointed at an object that is about to disappear. Tombstones left behind
+    by a deletion that never finished are purged once stale.
+    """
+
+    def __init__(self):
+        super().__init__("stored_files", StoredFile)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        await collection.create_index("key", unique=True)
+
+    async def find(self, sha256: str) -> Optional[StoredFile]:
+        """Entry of a hash, tombstones included"""
+        collection = await self.get_collection()
+        doc = await collection.find_one({"_id": sha256})
+        return self.model(**doc) if doc else None
+
+    async def get_by_key(self, key: str) -> Optional[StoredFile]:
+        collection = await self.get_collection()
+        doc = await collection.find_one({"key": key})
+        return self.model(**doc) if doc else None
+
+    async def add_reference(
+            self,
+            sha256: str,
+            key: str,
+            size: int,
+            content_type: str
+    ) -> Optional[Tuple[StoredFile, bool]]:
+        """
+        Count one more upload of the object, indexing it on first use.
+        Returns (entry, inserted), or None while the entry is a tombstone.
+        """
+        collection = await self.get_collection()
+        now = datetime.utcnow()
+        try:
+            before = await collection.find_one_and_update(
+                {"_id": sha256, "refs": {"$gt": 0}},
+                {
+                    "$setOnInsert": {
+                        "key": key,
+                        "size": size,
+                        "content_type": content_type,
+                        "variants": {},
+                        "created_at": now,
+                    },
+                    "$inc": {"refs": 1},
+                },
+                upsert=True,
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            # The filter missed an existing entry: a tombstone
+            return None
+        if before is None:
+            return self.model(
+                _id=sha256, key=key, size=size, content_type=content_type, refs=1, created_at=now
+            ), True
+        before["refs"] += 1
+        return self.model(**before), False
+
+    async def release(self, key: str) -> Optional[StoredFile]:
+        """
+        Drop one reference to the object at `key`. Returns the entry when
+        that was the last one: it is then a tombstone, the caller deletes the
+        objects and `purge`s it. Returns None otherwise.
+        """
+        collection = await self.get_collection()
+        doc = await collection.find_one_and_update(
+            {"key": key, "refs": {"$gt": 0}},
+            {"$inc": {"refs": -1}, "$set": {"released_at": datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        if doc is None or doc["refs"] > 0:
+            return None
+        return self.model(**doc)
+
+    async def purge(self, sha256: str, stale_after: Optional[timedelta] = None) -> bool:
+        """Remove a tombstone; with `stale_after`, only one released longer ago than that"""
+        query = {"_id": sha256, "refs": {"$lte": 0}}
+        if stale_after is not None:
+            query["released_at"] = {"$lt": datetime.utcnow() - stale_after}
+        collection = await self.get_collection()
+        result = await collection.delete_one(query)
+        return result.deleted_count == 1
+
+    async def set_variants(self, key: str, variants: Dict[str, str]) -> None:
+        collection = await self.get_collection()
+        await collection.update_one({"key": key}, {"$set": {"variants": variants}})
+
+
+def get_stored_file_manager() -> StoredFileManager:
+    return StoredFileManager()
@@ -1,16 +1,24 @@
 from datetime import datetime
-from typing import Optional, List
+from typing import Dict, Optional, List
+
+from pymongo import ReturnDocument
 
 from app.db.managers.base import DBManager
 from app.db.models.base import PyObjectId
-from app.db.models.interventions import Intervention, InterventionCreate
+from app.db.models.interventions import (
+    COMPLETED_INTERVENTION_STATUSES,
+    Intervention,
+    InterventionCreate,
+    InterventionStatus,
+    OPEN_INTERVENTION_STATUSES
+)
 
 
 class InterventionManager(DBManager):
     def __init__(self):
         super().__init__("interventions", Intervention)
 
-    async def create_intervention(self, intervention: InterventionCreate) -> Intervention:
+    async def create_intervention(self, intervention: InterventionCreate, session=None) -> Intervention:
         intervention.progress = {
             "percentage": 0,
             "current_step": "",
@@ -22,7 +30,7 @@ class InterventionManager(DBManager):
             "transport": 0,
             "total": sum(item.cost for item in intervention.materials)
         }
-        return await self.create(intervention)
+        return await self.create(intervention, session=session)
 
     async def update_progress(
             self,
@@ -61,6 +69,26 @@ class InterventionManager(DBManager):
             }
         )
 
+    async def set_photo_variants(self, intervention_id: str, url: str, variants: Dict[str, str]) -> bool:
+        """Record the resized copies of the photo stored at `url`"""
+        collection = await self.get_collection()
+        result = await collection.update_one(
+            {"_id": self.object_id(intervention_id), "photos.url": url},
+            {"$set": {"photos.$.variants": variants, "photos.$.thumbnail": variants.get("thumbnail.webp")}}
+        )
+        return result.modified_count == 1
+
+    async def increment_comment_count(self, intervention_id: str) -> Optional[int]:
+        """Allocate the next comment sequence number of an intervention's thread"""
+        collection = await self.get_collection()
+        intervention = await collection.find_one_and_update(
+            {"_id": self.object_id(intervention_id)},
+            {"$inc": {"comment_count": 1}},
+            projection={"comment_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        return intervention["comment_count"] if intervention else None
+
     async def complete_step(
             self,
             intervention_id: str,
@@ -83,16 +111,22 @@ class InterventionManager(DBManager):
             self,
             intervention_id: str,
             technician_ids: List[str],
-            is_primary: bool = False
-    ) -> Optional[Intervention]:
-        return await self.update(
-            intervention_id,
+            is_primary: bool = False,
+            session=None
+    ) -> Optional[dict]:
+        """Replace the assigned technicians, returning the document as it was before"""
+        collection = await self.get_collection()
+        return await collection.find_one_and_update(
+            {"_id": self.object_id(intervention_id)},
             {
                 "$set": {
                     "technician_ids": [PyObjectId(tid) for tid in technician_ids],
                     "is_primary": is_primary
                 }
-            }
+            },
+            projection={"status": 1, "technician_ids": 1},
+            return_document=ReturnDocument.BEFORE,
+            session=session
         )
 
     async def get_report_interventions(
@@ -115,6 +149,103 @@ class InterventionManager(DBManager):
             filters["status"] = status
         return await self.get_many(filters)
 
+    async def get_technician_open_interventions(
+            self,
+            technician_id: str,
+            day_start: datetime,
+            day_end: datetime
+    ) -> List[dict]:
+        """Open interventions of a technician scheduled for a day (or not scheduled at all)"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {
+                "technician_ids": PyObjectId(technician_id),
+                "status": {"$in": list(OPEN_INTERVENTION_STATUSES)},
+                "$or": [
+                    {"scheduling.scheduled_at": {"$gte": day_start, "$lt": day_end}},
+                    {"scheduling.scheduled_at": {"$exists": False}}
+                ]
+            },
+            {"report_id": 1, "title": 1, "estimated_duration": 1}
+        )
+        return await cursor.to_list(length=None)
+
+    async def set_status(
+            self,
+            intervention_id: str,
+            new_status: InterventionStatus,
+            allowed_from: Optional[List[str]] = None,
+            session=None
+    ) -> Optional[dict]:
+        """
+        Compare-and-set the intervention status and return the document as it
+        was *before* the write, or None when it was missing or its current
+        status is not one of `allowed_from` (or already `new_status`).
+        """
+        status_filter = {"$ne": new_status}
+        if allowed_from is not None:
+            status_filter["$in"] = list(allowed_from)
+        collection = await self.get_collection()
+        return await collection.find_one_and_update(
+            {"_id": self.object_id(intervention_id), "status": status_filter},
+            {"$set": {"status": new_status, "updated_at": datetime.utcnow()}},
+            projection={"status": 1, "report_id": 1, "technician_ids": 1},
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+
+    @staticmethod
+    def counter_deltas(old_status: Optional[str], new_status: Optional[str]) -> Dict[str, int]:
+        """
+        Translate a status change into deltas for `Report.intervention_stats`.
+        Cancelled interventions are not counted in the report total.
+        """
+
+        def counts(status: Optional[str]) -> Dict[str, int]:
+            if status is None:
+                return {"total": 0, "completed": 0, "in_progress": 0}
+            return {
+                "total": int(status != InterventionStatus.CANCELLED),
+                "completed": int(status in COMPLETED_INTERVENTION_STATUSES),
+                "in_progress": int(status == InterventionStatus.IN_PROGRESS),
+            }
+
+        before, after = counts(old_status), counts(new_status)
+        return {counter: after[counter] - before[counter] for counter in after}
+
+    async def rebuild_report_intervention_stats(self) -> None:
+        """
+        Recompute `Report.intervention_stats` server side for every report
+        (backfill for reports created before the counters existed).
+        """
+        collection = await self.get_collection()
+        pipeline = [
+            {"$match": {"status": {"$ne": InterventionStatus.CANCELLED}}},
+            {
+                "$group": {
+                    "_id": {"$toObjectId": "$report_id"},
+                    "total": {"$sum": 1},
+                    "completed": {
+                        "$sum": {"$cond": [{"$in": ["$status", list(COMPLETED_INTERVENTION_STATUSES)]}, 1, 0]}
+                    },
+                    "in_progress": {
+                        "$sum": {"$cond": [{"$eq": ["$status", InterventionStatus.IN_PROGRESS]}, 1, 0]}
+                    },
+                }
+            },
+            {
+                "$project": {
+                    "intervention_stats": {
+                        "total": "$total",
+                        "completed": "$completed",
+                        "in_progress": "$in_progress"
+                    }
+                }
+            },
+            {"$merge": {"into": "reports", "on": "_id", "whenMatched": "merge", "whenNotMatched": "discard"}},
+        ]
+        await collection.aggregate(pipeline).to_list(length=None)
+
 
 def get_intervention_manager() -> InterventionManager:
     return InterventionManager()
@@ -0,0 +1,203 @@
+import random
+from datetime import datetime, timedelta
+from typing import Iterable, List, Optional, Sequence
+
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.core.configs import settings
+from app.db.managers.base import DBManager
+from app.db.models.jobs import Job, JobStats, JobStatus, JobType
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with jitter, in seconds, after the given number of failed attempts"""
+    delay = min(settings.JOBS_RETRY_BASE_SECONDS * 2 ** (attempts - 1), settings.JOBS_RETRY_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class JobManager(DBManager):
+    """
+    Durable job queue. A job is claimed by one worker with a single
+    find_one_and_update, which leases it for JOBS_LEASE_SECONDS; a worker that
+    dies loses its lease and the job is handed out again. Failures are retried
+    with exponential backoff until max_attempts, then the job is left DEAD.
+    """
+
+    def __init__(self):
+        super().__init__("jobs", Job)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        await collection.create_index(
+            [("status", ASCENDING), ("priority", DESCENDING), ("run_at", ASCENDING)],
+            name="claim"
+        )
+        await collection.create_index([("status", ASCENDING), ("lease_until", ASCENDING)], name="lease")
+        await collection.create_index(
+            "key",
+            name="key",
+            unique=True,
+            partialFilterExpression={"key": {"$type": "string"}}
+        )
+        await collection.create_index(
+            "finished_at",
+            name="done_ttl",
+            expireAfterSeconds=settings.JOBS_RETENTION_DAYS * 86400,
+            partialFilterExpression={"status": JobStatus.DONE.value}
+        )
+
+    def _document(
+            self,
+            job_type: JobType,
+            payload: dict,
+            priority: int,
+            run_at: Optional[datetime],
+            max_attempts: Optional[int],
+            key: Optional[str] = None
+    ) -> dict:
+        return Job(
+            type=job_type,
+            payload=payload,
+            key=key,
+            priority=priority,
+            run_at=run_at or datetime.utcnow(),
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS
+        ).dict(by_alias=True, exclude={"id"})
+
+    async def enqueue(
+            self,
+            job_type: JobType,
+            payload: Optional[dict] = None,
+            priority: int = 0,
+            run_at: Optional[datetime] = None,
+            max_attempts: Optional[int] = None,
+            key: Optional[str] = None
+    ) -> Optional[str]:
+        """The id of the new job; None if a job with the same `key` already exists"""
+        collection = await self.get_collection()
+        try:
+            result = await collection.insert_one(
+                self._document(job_type, payload or {}, priority, run_at, max_attempts, key)
+            )
+        except DuplicateKeyError:
+            return None
+        return str(result.inserted_id)
+
+    async def enqueue_many(self, job_type: JobType, payloads: Sequence[dict], priority: int = 0) -> int:
+        if not payloads:
+            return 0
+        collection = await self.get_collection()
+        result = await collection.insert_many(
+            [self._document(job_type, payload, priority, None, None) for payload in payloads],
+            ordered=False
+        )
+        return len(result.inserted_ids)
+
+    async def claim(self, worker_id: str, job_types: Optional[Iterable[JobType]] = None) -> Optional[Job]:
+        """Lease the most urgent due job, None if there is none"""
+        now = datetime.utcnow()
+        query = {"status": JobStatus.PENDING, "run_at": {"$lte": now}}
+        if job_types:
+            query["type"] = {"$in": list(job_types)}
+        collection = await self.get_collection()
+        doc = await collection.find_one_and_update(
+            query,
+            {
+                "$set": {
+                    "status": JobStatus.RUNNING,
+                    "worker_id": worker_id,
+                    "lease_until": now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("priority", DESCENDING), ("run_at", ASCENDING)],
+            return_document=ReturnDocument.AFTER
+        )
+        return self.model(**doc) if doc else None
+
+    async def _update_owned(self, job: Job, worker_id: str, update: dict) -> bool:
+        collection = await self.get_collection()
+        result = await collection.update_one(
+            {"_id": self.object_id(job.id), "status": JobStatus.RUNNING, "worker_id": worker_id},
+            update
+        )
+        return result.modified_count == 1
+
+    async def extend_lease(self, job: Job, worker_id: str) -> bool:
+        """False if the lease was lost (expired and requeued)"""
+        return await self._update_owned(job, worker_id, {
+            "$set": {"lease_until": datetime.utcnow() + timedelta(seconds=settings.JOBS_LEASE_SECONDS)}
+        })
+
+    async def complete(self, job: Job, worker_id: str) -> bool:
+        return await self._update_owned(job, worker_id, {
+            "$set": {"status": JobStatus.DONE, "finished_at": datetime.utcnow(), "lease_until": None}
+        })
+
+    async def fail(self, job: Job, worker_id: str, error: str) -> bool:
+        """Schedule a retry, or leave the job DEAD when it is out of attempts"""
+        now = datetime.utcnow()
+        if job.attempts >= job.max_attempts:
+            update = {"status": JobStatus.DEAD, "finished_at": now}
+        else:
+            update = {"status": JobStatus.PENDING, "run_at": now + timedelta(seconds=retry_delay(job.attempts))}
+        return await self._update_owned(job, worker_id, {
+            "$set": {**update, "last_error": error[:2000], "lease_until": None, "worker_id": None}
+        })
+
+    async def requeue_expired(self) -> int:
+        """Hand out again the jobs of workers that stopped renewing their lease"""
+        now = datetime.utcnow()
+        expired = {"status": JobStatus.RUNNING, "lease_until": {"$lt": now}}
+        collection = await self.get_collection()
+        retried = await collection.update_many(
+            {**expired, "$expr": {"$lt": ["$attempts", "$max_attempts"]}},
+            {"$set": {
+                "status": JobStatus.PENDING,
+                "run_at": now,
+                "lease_until": None,
+                "worker_id": None,
+                "last_error": "Lease expired",
+            }}
+        )
+        # Whatever is still expired is out of attempts
+        dead = await collection.update_many(
+            expired,
+            {"$set": {"status": JobStatus.DEAD, "finished_at": now, "last_error": "Lease expired"}}
+        )
+        return retried.modified_count + dead.modified_count
+
+    async def retry(self, job_ids: List[str]) -> int:
+        """Put DEAD jobs back in the queue with a fresh set of attempts"""
+        collection = await self.get_collection()
+        result = await collection.update_many(
+            {"_id": {"$in": [self.object_id(job_id) for job_id in job_ids]}, "status": JobStatus.DEAD},
+            {"$set": {"status": JobStatus.PENDING, "attempts": 0, "run_at": datetime.utcnow(), "finished_at": None}}
+        )
+        return result.modified_count
+
+    async def get_dead(self, limit: int = 50) -> List[Job]:
+        collection = await self.get_collection()
+        cursor = collection.find({"status": JobStatus.DEAD}).sort("finished_at", DESCENDING).limit(limit)
+        return [self.model(**doc) async for doc in cursor]
+
+    async def get_stats(self) -> List[JobStats]:
+        collection = await self.get_collection()
+        cursor = collection.aggregate([
+            {"$group": {
+                "_id": {"type": "$type", "status": "$status"},
+                "count": {"$sum": 1},
+                "oldest_run_at": {"$min": "$run_at"},
+            }},
+            {"$sort": {"_id.type": 1, "_id.status": 1}},
+        ])
+        return [
+            JobStats(type=doc["_id"]["type"], status=doc["_id"]["status"], count=doc["count"],
+                     oldest_run_at=doc["oldest_run_at"])
+            async for doc in cursor
+        ]
+
+
+def get_job_manager() -> JobManager:
+    return JobManager()
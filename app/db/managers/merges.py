@@ -0,0 +1,31 @@
+from typing import List
+
+from pymongo import ReplaceOne
+
+from app.db.managers.base import DBManager
+from app.db.models.reports import MergeProposal
+
+
+class MergeProposalManager(DBManager):
+    """Duplicate report groups found by the merge job, one document per target report"""
+
+    def __init__(self):
+        super().__init__("report_merge_proposals", MergeProposal)
+
+    async def save_proposals(self, proposals: List[MergeProposal]) -> int:
+        """Upsert proposals, replacing the previous proposal for the same target report"""
+        if not proposals:
+            return 0
+        collection = await self.get_collection()
+        result = await collection.bulk_write(
+            [
+                ReplaceOne({"_id": proposal.id}, proposal.dict(by_alias=True), upsert=True)
+                for proposal in proposals
+            ],
+            ordered=False
+        )
+        return result.upserted_count + result.modified_count
+
+
+def get_merge_proposal_manager() -> MergeProposalManager:
+    return MergeProposalManager()
@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+from app.db.managers.base import DBManager
+from app.core.configs import settings
+from app.db.models.notifications import DIGEST_PREFERENCE, DigestFrequency, Notification
+from app.db.models.users import UserStatus
+from app.db.mongodb import get_db
+
+UNREAD_FIELD = "notifications_unread"
+DIGEST_FIELD = "notifications_digested_until"  # ObjectId bound of the last digest sent to the user
+
+
+class NotificationManager(DBManager):
+    """
+    Per-user inbox entries. The number of unread entries is denormalized on
+    the user document (`notifications_unread`) so badges never count.
+    """
+
+    def __init__(self):
+        super().__init__("notifications", Notification)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        # Inbox pages: newest first, cursor on _id
+        await collection.create_index([("user_id", ASCENDING), ("_id", DESCENDING)])
+        await collection.create_index([("user_id", ASCENDING), ("read", ASCENDING)])
+        # One entry per user and status change, so a re-run fan-out job skips delivered users
+        await collection.create_index(
+            [("user_id", ASCENDING), ("change_key", ASCENDING)],
+            unique=True,
+            partialFilterExpression={"change_key": {"$exists": True}}
+        )
+        async with get_db() as db:
+            await db["users"].create_index(f"preferences.{DIGEST_PREFERENCE}", sparse=True)
+
+    async def _shift_unread(self, user_ids: List[str], amount: int) -> None:
+        if not user_ids or not amount:
+            return
+        async with get_db() as db:
+            await db["users"].update_many(
+                {"_id": {"$in": [self.object_id(user_id) for user_id in user_ids]}},
+                {"$inc": {UNREAD_FIELD: amount}}
+            )
+
+    async def deliver(self, user_ids: List[str], notification: dict) -> int:
+        """
+        Write one inbox entry per user with a single unordered insert_many, then
+        bump their unread counters with a single update_many. Users who already
+        have the notification's `change_key` hit the unique index and are
+        skipped, counters included, which makes re-delivery a no-op.
+        """
+        if not user_ids:
+            return 0
+        docs = [{**notification, "user_id": user_id, "read": False} for user_id in user_ids]
+        collection = await self.get_collection()
+        try:
+            await collection.insert_many(docs, ordered=False)
+            delivered = user_ids
+        except BulkWriteError as e:
+            failed = {docs[error["index"]]["user_id"] for error in e.details.get("writeErrors", [])}
+            delivered = [user_id for user_id in user_ids if user_id not in failed]
+        await self._shift_unread(delivered, 1)
+        return len(delivered)
+
+    async def get_inbox(
+            self,
+            user_id: str,
+            before: Optional[str] = None,
+            limit: int = 20
+    ) -> Tuple[List[Notification], Optional[str]]:
+        """A page of the inbox, newest first, and the cursor of the next page"""
+        filters = {"user_id": user_id}
+        if before:
+            filters["_id"] = {"$lt": ObjectId(before)}
+        collection = await self.get_collection()
+        cursor = collection.find(filters).sort("_id", DESCENDING).limit(limit + 1)
+        docs = [doc async for doc in cursor]
+        next_cursor = str(docs[limit - 1]["_id"]) if len(docs) > limit else None
+        return [self.model(**doc) for doc in docs[:limit]], next_cursor
+
+    async def get_unread_count(self, user_id: str) -> int:
+        async with get_db() as db:
+            user = await db["users"].find_one({"_id": self.object_id(user_id)}, {UNREAD_FIELD: 1})
+        return max((user or {}).get(UNREAD_FIELD, 0), 0)
+
+    async def mark_read(self, user_id: str, notification_ids: Optional[List[str]] = None) -> None:
+        """Mark some (or all) of a user's notifications read and lower the unread counter to match"""
+        collection = await self.get_collection()
+        filters = {"user_id": user_id, "read": False}
+        if notification_ids is not None:
+            filters["_id"] = {"$in": [self.object_id(notification_id) for notification_id in notification_ids]}
+        result = await collection.update_many(filters, {"$set": {"read": True}})
+        if notification_ids is None:
+            async with get_db() as db:
+                await db["users"].update_one({"_id": self.object_id(user_id)}, {"$set": {UNREAD_FIELD: 0}})
+        else:
+            await self._shift_unread([user_id], -result.modified_count)
+
+    async def set_digest_frequency(self, user_id: str, frequency: DigestFrequency) -> None:
+        async with get_db() as db:
+            # Pipeline update: `preferences` may be null, which a dotted $set cannot extend
+            await db["users"].update_one(
+                {"_id": self.object_id(user_id)},
+                [{"$set": {"preferences": {"$mergeObjects": [
+                    {"$ifNull": ["$preferences", {}]},
+                    {DIGEST_PREFERENCE: frequency.value},
+                ]}}}]
+            )
+
+    async def iter_digests(self, frequency: DigestFrequency, start: datetime, end: datetime) -> AsyncIterator[dict]:
+        """
+        Users opted into `frequency` digests with their unread notifications
+        since their last digest (at most since `start`) up to `end`, grouped
+        by zone, busiest zone first. One aggregation over the users, each
+        lookup walking that user's (user_id, _id) index range.
+        """
+        start_id, end_id = ObjectId.from_datetime(start), ObjectId.from_datetime(end)
+        async with get_db() as db:
+            cursor = db["users"].aggregate([
+                {"$match": {f"preferences.{DIGEST_PREFERENCE}": frequency.value, "status": UserStatus.ACTIVE}},
+                {"$project": {
+                    "email": 1,
+                    "firstname": 1,
+                    "lastname": 1,
+                    "after": {"$max": [{"$ifNull": [f"${DIGEST_FIELD}", start_id]}, start_id]},
+                }},
+                {"$lookup": {
+                    "from": self.collection_name,
+                    "let": {"user_id": {"$toString": "$_id"}, "after": "$after"},
+                    "pipeline": [
+                        {"$match": {
+                            "$expr": {"$and": [
+                                {"$eq": ["$user_id", "$$user_id"]},
+                                {"$gt": ["$_id", "$$after"]},
+                                {"$lte": ["$_id", end_id]},
+                            ]},
+                            "read": False,
+                        }},
+                        {"$sort": {"_id": -1}},
+                        {"$group": {
+                            "_id": "$zone",
+                            "count": {"$sum": 1},
+                            "items": {"$push": {
+                                "title": "$title",
+                                "body": "$body",
+                                "report_id": "$report_id",
+                                "created_at": "$created_at",
+                            }},
+                        }},
+                        {"$sort": {"count": -1, "_id": 1}},
+                        {"$project": {
+                            "_id": 0,
+                            "zone": "$_id",
+                            "count": 1,
+                            "items": {"$slice": ["$items", settings.DIGEST_ITEMS_PER_ZONE]},
+                        }},
+                    ],
+                    "as": "zones",
+                }},
+                {"$match": {"zones.0": {"$exists": True}}},
+            ])
+            async for doc in cursor:
+                yield doc
+
+    async def mark_digested(self, user_ids: List[str], end: datetime) -> None:
+        if not user_ids:
+            return
+        async with get_db() as db:
+            await db["users"].update_many(
+                {"_id": {"$in": [self.object_id(user_id) for user_id in user_ids]}},
+                {"$set": {DIGEST_FIELD: ObjectId.from_datetime(end)}}
+            )
+
+
+def get_notification_manager() -> NotificationManager:
+    return NotificationManager()
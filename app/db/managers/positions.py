@@ -0,0 +1,82 @@
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid
+
+from app.core.configs import settings
+from app.db.managers.base import DBManager
+from app.db.models.positions import PositionPing
+from app.db.mongodb import get_db
+
+
+class PositionManager(DBManager):
+    """Technician GPS pings, stored in a time-series collection"""
+
+    def __init__(self):
+        super().__init__("technician_positions", PositionPing)
+
+    async def ensure_collection(self) -> None:
+        async with get_db() as db:
+            try:
+                await db.create_collection(
+                    self.collection_name,
+                    timeseries={
+                        "timeField": "recorded_at",
+                        "metaField": "technician_id",
+                        "granularity": "seconds"
+                    },
+                    expireAfterSeconds=settings.TRACKING_RETENTION_DAYS * 24 * 3600
+                )
+            except CollectionInvalid:
+                pass  # already created
+
+    async def insert_pings(self, docs: List[dict]) -> int:
+        """Unordered bulk insert: one bad ping does not stop the rest of the batch"""
+        if not docs:
+            return 0
+        collection = await self.get_collection()
+        try:
+            result = await collection.insert_many(docs, ordered=False)
+            return len(result.inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get("nInserted", 0)
+
+    async def save_last_positions(self, positions: Dict[str, Tuple[float, float, datetime]]) -> None:
+        """
+        Store the latest ping of each technician on its user document, skipping
+        positions older than the stored one (batches can arrive out of order).
+        Moves are stamped with `technician.position_saved_at`, not
+        `technician.updated_at`, so they don't count as dispatch profile changes.
+        """
+        if not positions:
+            return
+        async with get_db() as db:
+            users = db["users"]
+            now = datetime.utcnow()
+            await users.bulk_write(
+                [
+                    UpdateOne(
+                        {
+                            "_id": self.object_id(technician_id),
+                            "$or": [
+                                {"technician.position_at": {"$lt": recorded_at}},
+                                {"technician.position_at": {"$exists": False}}
+                            ]
+                        },
+                        {
+                            "$set": {
+                                "technician.position": {"type": "Point", "coordinates": [lng, lat]},
+                                "technician.position_at": recorded_at,
+                                "technician.position_saved_at": now
+                            }
+                        }
+                    )
+                    for technician_id, (lat, lng, recorded_at) in positions.items()
+                ],
+                ordered=False
+            )
+
+
+def get_position_manager() -> PositionManager:
+    return PositionManager()
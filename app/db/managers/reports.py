@@ -1,44 +1,208 @@
-from datetime import datetime
-from typing import List, Optional
+import logging
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
+from pymongo import ASCENDING, DESCENDING, GEOSPHERE, ReturnDocument, UpdateOne
+
+from app.core.configs import settings
+from app.db.managers.analytics import ROLLUP_PROJECTION, get_analytics_manager
 from app.db.managers.base import DBManager
+from app.db.hot_score import hot_score, hot_score_expression, hot_score_stage
+from app.db.managers.zones import zone_resolver
 from app.db.models.base import PyObjectId
-from app.db.models.reports import Report, ReportCreate, ReportSearch
+from app.db.models.reports import (
+    DuplicateCandidate,
+    Report,
+    ReportCreate,
+    ReportSearch,
+    ReportStatus
+)
+from app.utils.geospatial import EARTH_RADIUS_M, point_lat_lng
+from app.utils.text import similarity
+
+logger = logging.getLogger(__name__)
+
+INTERVENTION_COUNTERS = ("total", "completed", "in_progress")
+
+# Reports in these statuses no longer absorb duplicates: a new submission is a new problem
+CLOSED_REPORT_STATUSES = (ReportStatus.RESOLVED, ReportStatus.REJECTED)
+
+# Fields read by the duplicate merge job
+MERGE_PROJECTION = {
+    **ROLLUP_PROJECTION,
+    "location.coordinates": 1,
+    "citizen_id": 1,
+    "intervention_stats.total": 1,
+}
+
+# Fields kept by the in-memory report snapshot
+SNAPSHOT_PROJECTION = {
+    "location.coordinates": 1,
+    "category": 1,
+    "status": 1,
+    "priority": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
 
 
 class ReportManager(DBManager):
     def __init__(self):
         super().__init__("reports", Report)
+        self.analytics_manager = get_analytics_manager()
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        await collection.create_index([("updated_at", DESCENDING)])
+        # Trending feeds: sorted reads, overall or per zone
+        await collection.create_index([("hot_score", DESCENDING)])
+        await collection.create_index([("location.zone", ASCENDING), ("hot_score", DESCENDING)])
+        # Duplicate lookups: $geoNear filtered on category and recency
+        await collection.create_index(
+            [("location.coordinates", GEOSPHERE), ("category", ASCENDING), ("created_at", DESCENDING)]
+        )
 
-    async def create_report(self, report: ReportCreate, citizen_id: str) -> Report:
+    async def create_report(
+            self,
+            report: ReportCreate,
+            citizen_id: str,
+            link_duplicates: bool = True
+    ) -> tuple[Report, bool]:
+        """
+        Create a report, or, when `link_duplicates` is set and a close open report
+        of the same category has a very similar title, record the submission as a
+        confirmation of that report instead. Returns (report, created).
+        """
         if not report.citizen_id:
             report.citizen_id = PyObjectId(citizen_id)
-        return await self.create(report)
+        if link_duplicates:
+            candidates = await self.find_duplicates(report)
+            if candidates and candidates[0].similarity >= settings.DUPLICATE_LINK_SIMILARITY:
+                existing = await self.confirm_report(str(candidates[0].report_id), str(report.citizen_id))
+                if existing:
+                    return existing, False
 
-    async def update_report_status(
-            self,
-            report_id: str,
-            new_status: str,
-            user_id: str,
-            comment: Optional[str] = None
-    ) -> Optional[Report]:
-        update_data = {
-            "$set": {"status": new_status},
-            "$push": {
-                "status_history": {
-                    "status": new_status,
-                    "date": datetime.utcnow(),
-                    "userId": PyObjectId(user_id),
-                    "comment": comment or ""
+        position = point_lat_lng(report.location.coordinates)
+        if position:
+            await zone_resolver.refresh()
+            report.location.zone = zone_resolver.resolve(*position) or report.location.zone
+        report_dict = report.dict()
+        report_dict["created_at"] = report_dict["updated_at"] = datetime.utcnow()
+        report_dict["intervention_stats"] = {counter: 0 for counter in INTERVENTION_COUNTERS}
+        report_dict["hot_score"] = hot_score(report_dict)
+        created = await self.create(report_dict)
+        await self.analytics_manager.record_report_created(report_dict)
+        return created, True
+
+    async def find_duplicates(self, report: ReportCreate) -> List[DuplicateCandidate]:
+        """
+        Open reports of the same category filed within DUPLICATE_RADIUS_M and
+        DUPLICATE_WINDOW_DAYS whose title looks alike, most similar first.
+        A bounded $geoNear returns the nearest DUPLICATE_MAX_CANDIDATES, which
+        are then compared by title here.
+        """
+        position = point_lat_lng(report.location.coordinates)
+        if position is None:
+            return []
+        lat, lng = position
+        collection = await self.get_collection()
+        cursor = collection.aggregate([
+            {
+                "$geoNear": {
+                    "near": {"type": "Point", "coordinates": [lng, lat]},
+                    "key": "location.coordinates",
+                    "distanceField": "distance",
+                    "maxDistance": settings.DUPLICATE_RADIUS_M,
+                    "spherical": True,
+                    "query": {
+                        "category": report.category,
+                        "status": {"$nin": list(CLOSED_REPORT_STATUSES)},
+                        "created_at": {"$gte": datetime.utcnow() - timedelta(days=settings.DUPLICATE_WINDOW_DAYS)},
+                    }
                 }
-            }
-        }
-        return await self.update(report_id, update_data)
+            },
+            {"$limit": settings.DUPLICATE_MAX_CANDIDATES},
+            {"$project": {"title": 1, "status": 1, "distance": 1, "created_at": 1}},
+        ])
+        candidates = []
+        async for doc in cursor:
+            score = similarity(report.title, doc.get("title", ""))
+            if score >= settings.DUPLICATE_MIN_SIMILARITY:
+                candidates.append(DuplicateCandidate(
+                    report_id=str(doc["_id"]),
+                    title=doc.get("title", ""),
+                    status=doc["status"],
+                    distance=round(doc["distance"], 1),
+                    similarity=round(score, 3),
+                    created_at=doc.get("created_at")
+                ))
+        return sorted(candidates, key=lambda c: (-c.similarity, c.distance))
+
+    async def confirm_report(self, report_id: str, citizen_id: str) -> Optional[Report]:
+        """
+        Count a citizen's confirmation of an existing report, or duplicate
+        submission (`engagement.confirmations`, once per citizen; the author
+        does not count).
+        """
+        collection = await self.get_collection()
+        await collection.update_one(
+            {
+                "_id": self.object_id(report_id),
+                "citizen_id": {"$ne": citizen_id},
+                "engagement.confirmed_by": {"$ne": citizen_id},
+            },
+            [
+                {
+                    "$set": {
+                        "engagement.confirmations": {"$add": [{"$ifNull": ["$engagement.confirmations", 0]}, 1]},
+                        "engagement.confirmed_by": {
+                            "$concatArrays": [{"$ifNull": ["$engagement.confirmed_by", []]}, [citizen_id]]
+                        },
+                    }
+                },
+                hot_score_stage(),
+            ]
+        )
+        return await self.get(report_id)
+
+    async def update_report(self, report_id: str, update_data: dict) -> Optional[Report]:
+        """Update report fields, moving it between analytics rollups if a dimension changed"""
+        if not update_data:
+            return await self.get(report_id)
+        update_data["updated_at"] = datetime.utcnow()
+        collection = await self.get_collection()
+        previous = await collection.find_one_and_update(
+            {"_id": self.object_id(report_id)},
+            {"$set": update_data},
+            projection=ROLLUP_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not previous:
+            return None
+        if any(field in update_data for field in ("category", "priority")):
+            await self.analytics_manager.record_dimensions_change(previous, update_data)
+        if "priority" in update_data:
+            await collection.update_one({"_id": self.object_id(report_id)}, [hot_score_stage()])
+        return await self.get(report_id)
 
     async def add_media_to_report(self, report_id: str, media_item: dict) -> Optional[Report]:
         return await self.update(report_id, {"$push": {"media": media_item}})
 
-    async def search_reports(self, search: ReportSearch, skip: int = 0, limit: int = 100) -> List[Report]:
+    async def set_media_variants(self, report_id: str, url: str, variants: Dict[str, str]) -> bool:
+        """Record the resized copies of the media item stored at `url`"""
+        collection = await self.get_collection()
+        result = await collection.update_one(
+            {"_id": self.object_id(report_id), "media.url": url},
+            {"$set": {"media.$.variants": variants, "media.$.thumbnail": variants.get("thumbnail.webp")}}
+        )
+        return result.modified_count == 1
+
+    @staticmethod
+    def search_filters(search: ReportSearch, by_distance: bool = True) -> dict:
+        """
+        Query of a search. With `by_distance`, a location search also sorts by
+        distance ($nearSphere); without it, it is a plain unsorted $geoWithin.
+        """
         filters = {}
 
         if search.category:
@@ -51,17 +215,44 @@ class ReportManager(DBManager):
             filters["location.zone"] = search.zone
         if search.near_location and search.radius:
             lat, lng = search.near_location
-            filters["location.coordinates"] = {
-                "$nearSphere": {
-                    "$geometry": {
-                        "type": "Point",
-                        "coordinates": [lng, lat]
-                    },
-                    "$maxDistance": search.radius
+            if by_distance:
+                filters["location.coordinates"] = {
+                    "$nearSphere": {
+                        "$geometry": {
+                            "type": "Point",
+                            "coordinates": [lng, lat]
+                        },
+                        "$maxDistance": search.radius
+                    }
                 }
-            }
+            else:
+                filters["location.coordinates"] = {
+                    "$geoWithin": {"$centerSphere": [[lng, lat], search.radius / EARTH_RADIUS_M]}
+                }
+        return filters
 
-        return await self.get_many(filters, skip=skip, limit=limit)
+    async def search_reports(self, search: ReportSearch, skip: int = 0, limit: int = 100) -> List[Report]:
+        return await self.get_many(self.search_filters(search), skip=skip, limit=limit)
+
+    async def iter_export(
+            self,
+            search: ReportSearch,
+            projection: dict,
+            batch_size: int = 1_000
+    ) -> AsyncIterator[dict]:
+        """Stream the projected fields of every report matching a search, oldest first"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            self.search_filters(search, by_distance=False),
+            projection,
+            batch_size=batch_size
+        ).sort("_id", ASCENDING)
+        try:
+            async for doc in cursor:
+                yield doc
+        finally:
+            # The client may disconnect mid-export: free the server-side cursor now
+            await cursor.close()
 
     async def increment_engagement(
             self,
@@ -69,10 +260,243 @@ class ReportManager(DBManager):
             field: str,
             amount: int = 1
     ) -> Optional[Report]:
-        return await self.update(
-            report_id,
-            {"$inc": {f"engagement.{field}": amount}}
+        """Shift an engagement counter and the hot score with it, in one pipeline update"""
+        collection = await self.get_collection()
+        report = await collection.find_one_and_update(
+            {"_id": self.object_id(report_id)},
+            [
+                {"$set": {f"engagement.{field}": {"$add": [{"$ifNull": [f"$engagement.{field}", 0]}, amount]}}},
+                hot_score_stage(),
+            ],
+            return_document=ReturnDocument.AFTER
         )
+        return self.model(**report) if report else None
+
+    async def apply_vote_deltas(self, deltas: Dict[str, List[Tuple[datetime, int]]]) -> None:
+        """
+        Apply buffered (time, delta) vote changes of many reports in one
+        unordered bulk write. Deltas not newer than the report's
+        `votes_counted_at` are skipped: a rebuild already counted those votes.
+        """
+        operations = []
+        for report_id, entries in deltas.items():
+            if not entries:
+                continue
+            counted_at = {"$ifNull": ["$votes_counted_at", datetime.min]}
+            delta = {"$sum": [{"$cond": [{"$gt": [at, counted_at]}, change, 0]} for at, change in entries]}
+            operations.append(UpdateOne({"_id": self.object_id(report_id)}, [
+                {
+                    "$set": {
+                        "engagement.votes": {
+                            "$max": [0, {"$add": [{"$ifNull": ["$engagement.votes", 0]}, delta]}]
+                        }
+                    }
+                },
+                hot_score_stage(),
+            ]))
+        if operations:
+            collection = await self.get_collection()
+            await collection.bulk_write(operations, ordered=False)
+
+    async def get_engagement(self, report_id: str) -> Optional[dict]:
+        """Engagement counters of a report, None if it does not exist"""
+        collection = await self.get_collection()
+        doc = await collection.find_one({"_id": self.object_id(report_id)}, {"engagement": 1})
+        return doc.get("engagement", {}) if doc else None
+
+    async def recompute_hot_scores(self) -> int:
+        """
+        Recompute hot scores server side (after weight changes, or for reports
+        missing one). Only reports whose score differs are written: with
+        unchanged weights this is a scan without writes.
+        """
+        collection = await self.get_collection()
+        result = await collection.update_many(
+            {"$expr": {"$ne": ["$hot_score", hot_score_expression()]}},
+            [hot_score_stage()]
+        )
+        return result.modified_count
+
+    async def get_trending(
+            self,
+            zone: Optional[str] = None,
+            category: Optional[str] = None,
+            limit: int = 20
+    ) -> List[Report]:
+        """Open reports with the highest hot score: an indexed sorted read"""
+        filters = {"status": {"$nin": list(CLOSED_REPORT_STATUSES)}}
+        if zone:
+            filters["location.zone"] = zone
+        if category:
+            filters["category"] = category
+        return await self.get_many(filters, limit=limit, sort=[("hot_score", DESCENDING)])
+
+    async def increment_intervention_stats(self, report_id: str, session=None, **deltas: int) -> bool:
+        """Atomically shift the per-report intervention counters with `$inc`"""
+        increments = {
+            f"intervention_stats.{counter}": delta
+            for counter, delta in deltas.items()
+            if counter in INTERVENTION_COUNTERS and delta
+        }
+        if not increments:
+            return False
+        collection = await self.get_collection()
+        result = await collection.update_one(
+            {"_id": self.object_id(report_id)},
+            {"$inc": increments},
+            session=session
+        )
+        return result.modified_count > 0
+
+    async def update_report_status_if(
+            self,
+            report_id: str,
+            condition: dict,
+            new_status: str,
+            user_id: str,
+            comment: Optional[str] = None,
+            session=None
+    ) -> Optional[dict]:
+        """
+        Move the report to `new_status` only when it matches `condition`.
+        The check and the write are a single conditional update, so concurrent
+        callers cannot both apply the same transition. Returns the report
+        fields used by analytics as they were before the change, None if
+        nothing matched.
+        """
+        now = datetime.utcnow()
+        collection = await self.get_collection()
+        previous = await collection.find_one_and_update(
+            {"_id": self.object_id(report_id), "status": {"$ne": new_status}, **condition},
+            {
+                "$set": {"status": new_status, "updated_at": now},
+                "$push": {
+                    "status_history": {
+                        "status": new_status,
+                        "date": now,
+                        "userId": PyObjectId(user_id),
+                        "comment": comment or ""
+                    }
+                }
+            },
+            projection=ROLLUP_PROJECTION,
+            return_document=ReturnDocument.BEFORE,
+            session=session
+        )
+        if previous:
+            await self.analytics_manager.record_status_change(previous, new_status, now, session=session)
+        return previous
+
+    async def get_zone_and_citizen(self, report_id: str) -> Tuple[Optional[str], Optional[str]]:
+        """(zone, citizen id) of a report, (None, None) if it does not exist"""
+        collection = await self.get_collection()
+        doc = await collection.find_one(
+            {"_id": self.object_id(report_id)},
+            {"location.zone": 1, "citizen_id": 1}
+        )
+        if not doc:
+            return None, None
+        citizen_id = doc.get("citizen_id")
+        return (doc.get("location") or {}).get("zone"), str(citizen_id) if citizen_id else None
+
+    async def get_locations(self, report_ids: List[str]) -> Dict[str, Tuple[float, float]]:
+        """(lat, lng) of each report, fetched with a single projected query"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {"_id": {"$in": [self.object_id(rid) for rid in report_ids]}},
+            {"location.coordinates": 1}
+        )
+        locations = {}
+        async for doc in cursor:
+            position = point_lat_lng(doc.get("location", {}).get("coordinates"))
+            if position:
+                locations[str(doc["_id"])] = position
+        return locations
+
+    async def open_report_zones(self) -> List[Optional[str]]:
+        """Zones holding open reports; None stands for reports outside every zone"""
+        collection = await self.get_collection()
+        zones = await collection.distinct("location.zone", {"status": {"$nin": list(CLOSED_REPORT_STATUSES)}})
+        return sorted(zone for zone in zones if zone) + [None]
+
+    async def iter_open_reports(self, zone: Optional[str], batch_size: int = 10_000) -> AsyncIterator[dict]:
+        """Stream the merge-relevant fields of the open reports of one zone"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {"status": {"$nin": list(CLOSED_REPORT_STATUSES)}, "location.zone": zone},
+            MERGE_PROJECTION,
+            batch_size=batch_size
+        )
+        async for doc in cursor:
+            yield doc
+
+    async def merge_reports(self, merges: List[Tuple[dict, List[dict]]]) -> int:
+        """
+        Merge each group of duplicates (raw documents from `iter_open_reports`)
+        into its target report: duplicates are rejected with `duplicate_of` set,
+        their authors are added to the target's confirmations. Duplicates whose
+        status changed since they were read are left alone. Returns the number
+        of reports merged.
+        """
+        now = datetime.utcnow()
+        operations = []
+        for target, duplicates in merges:
+            citizens = sorted(
+                {str(doc["citizen_id"]) for doc in duplicates if doc.get("citizen_id")}
+                - {str(target.get("citizen_id"))}
+            )
+            confirmed_by = {"$ifNull": ["$engagement.confirmed_by", []]}
+            operations.append(UpdateOne({"_id": target["_id"]}, [
+                {"$set": {"engagement.confirmed_by": {"$setUnion": [confirmed_by, citizens]}}},
+                {"$set": {"engagement.confirmations": {"$size": "$engagement.confirmed_by"}}},
+                hot_score_stage(),
+            ]))
+            for doc in duplicates:
+                operations.append(UpdateOne(
+                    {"_id": doc["_id"], "status": doc["status"]},
+                    {
+                        "$set": {"status": ReportStatus.REJECTED, "duplicate_of": str(target["_id"]), "updated_at": now},
+                        "$push": {
+                            "status_history": {
+                                "status": ReportStatus.REJECTED,
+                                "date": now,
+                                "userId": None,
+                                "comment": f"Merged into {target['_id']}"
+                            }
+                        }
+                    }
+                ))
+        if not operations:
+            return 0
+        collection = await self.get_collection()
+        await collection.bulk_write(operations, ordered=False)
+
+        # Only the duplicates this call actually rejected move in the analytics rollups
+        previous = {doc["_id"]: doc for _, duplicates in merges for doc in duplicates}
+        merged = [
+            previous[doc["_id"]]
+            async for doc in collection.find(
+                {"_id": {"$in": list(previous)}, "duplicate_of": {"$exists": True}, "updated_at": now},
+                {"_id": 1}
+            )
+        ]
+        await self.analytics_manager.record_status_changes(merged, ReportStatus.REJECTED, now)
+        return len(merged)
+
+    async def iter_snapshot_rows(
+            self,
+            changed_since: Optional[datetime] = None,
+            batch_size: int = 10_000
+    ) -> AsyncIterator[dict]:
+        """Stream the snapshot fields of all reports, or of those updated after `changed_since`"""
+        filters = {"updated_at": {"$gt": changed_since}} if changed_since else {}
+        collection = await self.get_collection()
+        async for doc in collection.find(filters, SNAPSHOT_PROJECTION, batch_size=batch_size):
+            yield doc
+
+    async def estimated_count(self) -> int:
+        collection = await self.get_collection()
+        return await collection.estimated_document_count()
 
 
 def get_report_manager() -> ReportManager:
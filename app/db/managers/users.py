@@ -1,7 +1,10 @@
-from typing import Optional
+from datetime import datetime
+from typing import AsyncIterator, List, Optional
 
 from app.db.managers.base import DBManager
-from app.db.models.users import UserCreate, UserInDB, UserCreateInDB
+from app.db.models.users import UserCreate, UserInDB, UserCreateInDB, UserRole
+
+TECHNICIAN_PROJECTION = {"_id": 1, "role": 1, "status": 1, "location.coordinates": 1, "technician": 1}
 
 
 class UserManager(DBManager):
@@ -21,6 +24,60 @@ class UserManager(DBManager):
             user_dict['hashed_password'] = get_password_hash(user_dict.pop('password'))
         return await self.create(UserCreateInDB(**user_dict))
 
+    async def iter_technicians(self, changed_since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """
+        Stream the dispatch-relevant fields of technicians. With `changed_since`,
+        only users whose technician data changed after that date are returned
+        (including users who stopped being technicians).
+        """
+        if changed_since:
+            filters = {"technician.updated_at": {"$gt": changed_since}}
+        else:
+            filters = {"role": UserRole.TECHNICIAN}
+        collection = await self.get_collection()
+        async for doc in collection.find(filters, TECHNICIAN_PROJECTION):
+            yield doc
+
+    async def iter_moved_technicians(self, moved_since: datetime) -> AsyncIterator[dict]:
+        """Stream the live position of technicians whose position was saved after `moved_since`"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {"technician.position_saved_at": {"$gt": moved_since}},
+            {"technician.position": 1}
+        )
+        async for doc in cursor:
+            yield doc
+
+    async def increment_open_interventions(
+            self,
+            technician_ids: List[str],
+            amount: int,
+            session=None
+    ) -> int:
+        """Shift the open intervention load of technicians used for dispatch ranking"""
+        if not technician_ids or not amount:
+            return 0
+        collection = await self.get_collection()
+        result = await collection.update_many(
+            {"_id": {"$in": [self.object_id(tid) for tid in technician_ids]}},
+            {
+                "$inc": {"technician.open_interventions": amount},
+                "$set": {"technician.updated_at": datetime.utcnow()}
+            },
+            session=session
+        )
+        return result.modified_count
+
+    async def get_last_positions(self) -> AsyncIterator[dict]:
+        """Stream the last known position of every technician that reported one"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {"role": UserRole.TECHNICIAN, "technician.position": {"$exists": True}},
+            {"technician.position": 1, "technician.position_at": 1}
+        )
+        async for doc in cursor:
+            yield doc
+
 
 def get_user_manager() -> UserManager:
     return UserManager()
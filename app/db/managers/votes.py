@@ -0,0 +1,108 @@
+from datetime import datetime
+from typing import AsyncIterator, List, Set
+
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError
+
+from app.db.managers.base import DBManager
+from app.db.hot_score import hot_score_stage
+from app.db.models.votes import Vote
+from app.db.mongodb import get_db
+
+
+class VoteManager(DBManager):
+    """One document per (report, user): the source of truth for who voted"""
+
+    def __init__(self):
+        super().__init__("votes", Vote)
+
+    async def ensure_indexes(self) -> None:
+        collection = await self.get_collection()
+        # Also serves the "did I vote" lookups: report_id $in + user_id equality
+        await collection.create_index([("report_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+
+    async def add_vote(self, report_id: str, user_id: str, at: datetime) -> bool:
+        """Idempotent upsert; True only when this call created the vote"""
+        collection = await self.get_collection()
+        try:
+            result = await collection.update_one(
+                {"report_id": report_id, "user_id": user_id},
+                {"$setOnInsert": {"created_at": at}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # A concurrent upsert of the same vote won the race
+            return False
+        return result.upserted_id is not None
+
+    async def remove_vote(self, report_id: str, user_id: str) -> bool:
+        collection = await self.get_collection()
+        result = await collection.delete_one({"report_id": report_id, "user_id": user_id})
+        return result.deleted_count > 0
+
+    async def voted_report_ids(self, user_id: str, report_ids: List[str]) -> Set[str]:
+        """Which of `report_ids` the user voted for, in one indexed query"""
+        collection = await self.get_collection()
+        cursor = collection.find(
+            {"report_id": {"$in": report_ids}, "user_id": user_id},
+            {"_id": 0, "report_id": 1}
+        )
+        return {doc["report_id"] async for doc in cursor}
+
+    async def iter_voter_ids(self, report_id: str) -> AsyncIterator[str]:
+        """Users who voted for a report, streamed from the (report_id, user_id) index"""
+        collection = await self.get_collection()
+        async for doc in collection.find({"report_id": report_id}, {"_id": 0, "user_id": 1}):
+            yield doc["user_id"]
+
+    async def rebuild_report_vote_counts(self) -> None:
+        """
+        Recompute `engagement.votes` (and hot scores) of every report from the
+        votes cast up to now, counted per report on the (report_id, user_id)
+        index. Only reports whose count drifted are written, including those
+        left with no votes at all, and they are stamped with
+        `votes_counted_at` so that deltas still buffered by any API worker for
+        earlier votes are skipped when flushed instead of counted twice. Votes
+        removed while the rebuild runs can still be counted off by one.
+        """
+        counted_at = datetime.utcnow()
+        pipeline = [
+            {
+                "$lookup": {
+                    "from": self.collection_name,
+                    "let": {"report_id": {"$toString": "$_id"}},
+                    "pipeline": [
+                        {"$match": {"$expr": {"$and": [
+                            {"$eq": ["$report_id", "$$report_id"]},
+                            {"$lte": [{"$ifNull": ["$created_at", datetime.min]}, counted_at]},
+                        ]}}},
+                        {"$count": "votes"},
+                    ],
+                    "as": "counted"
+                }
+            },
+            {
+                "$project": {
+                    "votes": {"$ifNull": [{"$first": "$counted.votes"}, 0]},
+                    "stored": {"$ifNull": ["$engagement.votes", 0]},
+                }
+            },
+            {"$match": {"$expr": {"$ne": ["$votes", "$stored"]}}},
+            {
+                "$merge": {
+                    "into": "reports",
+                    "on": "_id",
+                    "whenMatched": [
+                        {"$set": {"engagement.votes": "$$new.votes", "votes_counted_at": {"$literal": counted_at}}},
+                        hot_score_stage(),
+                    ],
+                    "whenNotMatched": "discard"
+                }
+            },
+        ]
+        async with get_db() as db:
+            await db["reports"].aggregate(pipeline).to_list(length=None)
+
+
+def get_vote_manager() -> VoteManager:
+    return VoteManager()
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app.core.configs import settings
+from app.db.managers.base import DBManager
+from app.db.models.zones import Zone, ZoneCreate
+from app.utils.geospatial import RTree, geometry_bbox, point_in_geometry
+
+logger = logging.getLogger(__name__)
+
+
+class ZoneManager(DBManager):
+    def __init__(self):
+        super().__init__("zones", Zone)
+
+    async def create_zone(self, zone: ZoneCreate) -> Zone:
+        zone_dict = zone.dict()
+        zone_dict["created_at"] = zone_dict["updated_at"] = datetime.utcnow()
+        created = await self.create(zone_dict)
+        await zone_resolver.refresh(force=True)
+        return created
+
+    async def update_zone(self, zone_id: str, update_data: dict) -> Optional[Zone]:
+        update_data["updated_at"] = datetime.utcnow()
+        zone = await self.update(zone_id, update_data)
+        await zone_resolver.refresh(force=True)
+        return zone
+
+    async def delete_zone(self, zone_id: str) -> bool:
+        deleted = await self.delete(zone_id)
+        await zone_resolver.refresh(force=True)
+        return deleted
+
+    async def get_version(self) -> Tuple[int, Optional[datetime]]:
+        """Cheap fingerprint of the zone set: (count, latest updated_at)"""
+        collection = await self.get_collection()
+        latest = await collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        count = await collection.count_documents({})
+        return count, latest.get("updated_at") if latest else None
+
+    async def load_geometries(self) -> List[Tuple[str, dict]]:
+        collection = await self.get_collection()
+        cursor = collection.find({}, {"name": 1, "geometry": 1})
+        return [(doc["name"], doc["geometry"]) async for doc in cursor]
+
+
+class ZoneResolver:
+    """
+    Per-worker point-in-zone index: an R-tree over zone bounding boxes narrows
+    the candidates, then an exact point-in-polygon test picks the zone.
+
+    Zone edits made by this worker rebuild it immediately; edits made by other
+    workers are picked up by comparing the zone set fingerprint at most every
+    ZONES_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self.tree = RTree([])
+        self.version: Optional[Tuple[int, Optional[datetime]]] = None
+        self._checked_at = 0.0
+        self._lock = asyncio.Lock()
+
+    def load(self, zones: List[Tuple[str, dict]]) -> None:
+        entries = []
+        for name, geometry in zones:
+            try:
+                bbox = geometry_bbox(geometry)
+                entries.append((bbox, (name, geometry, bbox)))
+            except (KeyError, TypeError, ValueError):
+                logger.warning(f"Skipping zone {name!r} with an invalid geometry")
+        self.tree = RTree(entries)
+
+    async def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.ZONES_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            zone_manager = get_zone_manager()
+            version = await zone_manager.get_version()
+            if force or version != self.version:
+                self.load(await zone_manager.load_geometries())
+                self.version = version
+            self._checked_at = now
+
+    def resolve(self, lat: float, lng: float) -> Optional[str]:
+        """Name of the zone containing the point; the smallest one when zones overlap"""
+        matches = [
+            (bbox, name)
+            for name, geometry, bbox in self.tree.query_point(lng, lat)
+            if point_in_geometry(lat, lng, geometry)
+        ]
+        if not matches:
+            return None
+        if len(matches) == 1:
+            return matches[0][1]
+        return min(matches, key=lambda m: (m[0][2] - m[0][0]) * (m[0][3] - m[0][1]))[1]
+
+
+zone_resolver = ZoneResolver()
+
+
+def get_zone_manager() -> ZoneManager:
+    return ZoneManager()
@@ -0,0 +1,47 @@
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class RollupGranularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    CURRENT = "current"
+
+
+class DurationMetric(str, Enum):
+    RESOLUTION = "resolution"  # report creation -> RESOLVED
+    FIRST_INTERVENTION = "first_intervention"  # report creation -> first intervention
+
+
+class ReportRollup(BaseModel):
+    id: str = Field(alias="_id")
+    granularity: RollupGranularity
+    bucket: Optional[datetime] = None
+    zone: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+    count: int = 0
+    sketches: Dict[str, Dict[str, int]] = {}
+
+
+class RollupRow(BaseModel):
+    bucket: Optional[datetime] = None
+    zone: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    status: Optional[str] = None
+    count: int
+
+
+class DurationRow(BaseModel):
+    zone: Optional[str] = None
+    category: Optional[str] = None
+    priority: Optional[str] = None
+    count: int
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
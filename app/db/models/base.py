@@ -54,5 +54,5 @@ class TimestampModel(BaseModel):
 class Location(BaseModel):
     address: str
     coordinates: dict  # GeoJSON format
-    zone: str
+    zone: Optional[str] = None  # resolved from the coordinates when they fall in a known zone
     landmark: Optional[str] = None
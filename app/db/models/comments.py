@@ -0,0 +1,40 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.db.models.base import PyObjectId
+
+
+class CommentTarget(str, Enum):
+    REPORT = "report"
+    INTERVENTION = "intervention"
+
+
+class CommentCreate(BaseModel):
+    body: str = Field(min_length=1, max_length=2000)
+    parent_seq: Optional[int] = Field(None, ge=1)  # reply to this comment of the same thread
+
+
+class Comment(BaseModel):
+    seq: int  # position in the thread, from 1; also the comment id
+    author_id: PyObjectId
+    body: str
+    parent_seq: Optional[int] = None
+    created_at: datetime
+    deleted: bool = False
+
+
+class CommentBucket(BaseModel):
+    """A fixed-size page of a thread: comments seq in [page * size + 1, (page + 1) * size]"""
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    target_type: CommentTarget
+    target_id: PyObjectId
+    page: int
+    comments: List[Comment] = []
+
+
+class CommentPage(BaseModel):
+    comments: List[Comment]  # newest first
+    next_cursor: Optional[str] = None  # older comments, None at the start of the thread
@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+
+class StoredFile(BaseModel):
+    """One stored object, shared by every upload with the same content"""
+    sha256: str = Field(alias="_id")
+    key: str
+    size: int
+    content_type: str
+    refs: int = 0  # uploads pointing at the object, 0 while the object is being deleted
+    variants: Dict[str, str] = {}  # resized copies of an image, see MediaItem.variants
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    released_at: Optional[datetime] = None  # last time a reference was dropped
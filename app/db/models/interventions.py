@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
 from typing import List, Optional
 
@@ -16,6 +16,20 @@ class InterventionStatus(str, Enum):
     SUCCESSED = "SUCCESSED"
 
 
+# Interventions still waiting for work: counted in a technician's load and route
+OPEN_INTERVENTION_STATUSES = {
+    InterventionStatus.SCHEDULED,
+    InterventionStatus.ASSIGNED,
+    InterventionStatus.IN_PROGRESS
+}
+
+# Interventions whose work is done: counted in `Report.intervention_stats.completed`
+COMPLETED_INTERVENTION_STATUSES = {
+    InterventionStatus.COMPLETED,
+    InterventionStatus.SUCCESSED
+}
+
+
 class MaterialItem(BaseModel):
     name: str
     quantity: float
@@ -40,6 +54,7 @@ class InterventionBase(BaseModel):
 
 
 class InterventionCreate(InterventionBase):
+    technician_ids: List[PyObjectId] = []  # empty with auto_assign: picked by dispatch
     materials: List[MaterialItem] = []
     estimated_duration: int  # in minutes
 
@@ -52,6 +67,7 @@ class Intervention(InterventionBase, TimestampModel):
     photos: List[dict] = Field(default_factory=list)
     costs: dict = Field(default_factory=dict)
     notes: str = ""
+    comment_count: int = 0
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -60,6 +76,7 @@ class InterventionPublic(InterventionBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     materials: List[MaterialItem]
     progress: dict
+    photos: List[dict] = Field(default_factory=list)
     created_at: datetime
 
 
@@ -68,3 +85,32 @@ class InterventionUpdate(BaseModel):
     description: Optional[str] = None
     status: Optional[InterventionStatus] = None
     notes: Optional[str] = None
+
+
+class TechnicianSuggestion(BaseModel):
+    technician_id: PyObjectId
+    distance: float  # in meters
+    open_interventions: int
+    availability: str
+    score: float  # lower is better
+
+
+class RouteStop(BaseModel):
+    intervention_id: PyObjectId
+    report_id: PyObjectId
+    title: str
+    location: tuple[float, float]  # (lat, lng)
+    distance_from_previous: float  # in meters
+    estimated_duration: int  # in minutes
+    arrival_offset: float  # minutes after departure
+
+
+class RoutePlan(BaseModel):
+    technician_id: PyObjectId
+    day: date
+    stops: List[RouteStop]
+    total_distance: float  # in meters
+    travel_minutes: float
+    work_minutes: float
+    total_minutes: float
+    unlocated_intervention_ids: List[PyObjectId] = []
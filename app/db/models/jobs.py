@@ -0,0 +1,52 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.db.models.base import PyObjectId
+
+
+class JobType(str, Enum):
+    EMAIL = "email.send"
+    NOTIFICATION_FAN_OUT = "notifications.fan_out"
+    ANALYTICS_BACKFILL = "analytics.backfill"
+    VOTES_REBUILD = "votes.rebuild"
+    DIGEST = "notifications.digest"
+    MEDIA_VARIANTS = "media.variants"
+    HOT_SCORES_RECOMPUTE = "reports.hot_scores"
+
+
+class JobStatus(str, Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    DONE = "DONE"
+    DEAD = "DEAD"  # out of attempts, kept for inspection and manual retry
+
+
+class Job(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    type: JobType
+    payload: dict = {}
+    key: Optional[str] = None  # unique when set, so a job is enqueued at most once (e.g. per period)
+    status: JobStatus = JobStatus.PENDING
+    priority: int = 0  # higher runs first
+    attempts: int = 0
+    max_attempts: int
+    run_at: datetime  # not claimed before, pushed back by retries
+    lease_until: Optional[datetime] = None
+    worker_id: Optional[str] = None
+    last_error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    finished_at: Optional[datetime] = None
+
+
+class JobStats(BaseModel):
+    type: JobType
+    status: JobStatus
+    count: int
+    oldest_run_at: Optional[datetime] = None
+
+
+class JobRetry(BaseModel):
+    ids: List[PyObjectId] = Field(..., min_length=1, max_length=500)
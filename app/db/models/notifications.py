@@ -0,0 +1,50 @@
+from datetime import datetime
+from enum import Enum
+from typing import List, Optional
+
+from pydantic import BaseModel, Field
+
+from app.db.models.base import PyObjectId
+
+
+class NotificationType(str, Enum):
+    REPORT_STATUS = "REPORT_STATUS"
+    INTERVENTION_STATUS = "INTERVENTION_STATUS"
+    INTERVENTION_ASSIGNED = "INTERVENTION_ASSIGNED"
+
+
+class DigestFrequency(str, Enum):
+    NONE = "none"
+    DAILY = "daily"
+    WEEKLY = "weekly"
+
+
+DIGEST_PREFERENCE = "digest"  # key of User.preferences holding the DigestFrequency
+
+
+class Notification(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    user_id: PyObjectId
+    type: NotificationType
+    title: str
+    body: str
+    report_id: Optional[PyObjectId] = None
+    intervention_id: Optional[PyObjectId] = None
+    status: Optional[str] = None
+    zone: Optional[str] = None
+    read: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class NotificationPage(BaseModel):
+    notifications: List[Notification]  # newest first
+    next_cursor: Optional[str] = None
+    unread: int = 0
+
+
+class NotificationRead(BaseModel):
+    ids: Optional[List[PyObjectId]] = Field(None, max_length=500)  # None marks the whole inbox read
+
+
+class DigestPreference(BaseModel):
+    frequency: DigestFrequency
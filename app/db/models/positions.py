@@ -0,0 +1,33 @@
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.db.models.base import PyObjectId
+
+
+class PositionPing(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+    recorded_at: datetime
+    accuracy: Optional[float] = None  # in meters
+    speed: Optional[float] = None  # in m/s
+    heading: Optional[float] = None  # in degrees
+
+    @field_validator('recorded_at')
+    def to_naive_utc(cls, v: datetime) -> datetime:
+        """Store UTC without tzinfo, like the datetimes read back from Mongo"""
+        if v.tzinfo is not None:
+            return v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+
+class PositionBatch(BaseModel):
+    pings: List[PositionPing] = Field(min_length=1, max_length=500)
+
+
+class LastKnownPosition(BaseModel):
+    technician_id: PyObjectId
+    lat: float
+    lng: float
+    recorded_at: datetime
@@ -1,6 +1,6 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -32,10 +32,17 @@ class ReportCategory(str, Enum):
     OTHER = "OTHER"
 
 
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    GEOJSON = "geojson"
+
+
 class MediaItem(BaseModel):
     type: str  # "image" or "video"
     url: str
     thumbnail: Optional[str] = None
+    variants: Dict[str, str] = {}  # "<size>.<format>" -> url, e.g. "medium.webp"
     uploaded_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -59,9 +66,12 @@ class Report(ReportBase, TimestampModel):
     citizen_id: PyObjectId
     media: List[MediaItem] = []
     engagement: dict = Field(default_factory=dict)
+    intervention_stats: dict = Field(default_factory=dict)  # total / completed / in_progress
     assignment: Optional[dict] = None
     status_history: List[dict] = Field(default_factory=list)
     tags: List[str] = Field(default_factory=list)
+    duplicate_of: Optional[PyObjectId] = None  # set when merged into another report
+    hot_score: Optional[float] = None  # trending rank, see db.hot_score
 
 
 class ReportPublic(ReportBase):
@@ -70,6 +80,18 @@ class ReportPublic(ReportBase):
     citizen_id: PyObjectId
     media: List[MediaItem]
     created_at: datetime
+    engagement: dict = Field(default_factory=dict)
+    hot_score: Optional[float] = None
+    duplicate: bool = False  # on creation: the submission was linked to this existing report
+
+
+class DuplicateCandidate(BaseModel):
+    report_id: PyObjectId
+    title: str
+    status: ReportStatus
+    distance: float  # in meters
+    similarity: float  # of the titles, in [0, 1]
+    created_at: Optional[datetime] = None
 
 
 class ReportUpdate(BaseModel):
@@ -88,3 +110,12 @@ class ReportSearch(BaseModel):
     zone: Optional[str] = None
     near_location: Optional[tuple[float, float]] = None  # (lat, lng)
     radius: Optional[float] = None  # in meters
+
+
+class MergeProposal(BaseModel):
+    id: PyObjectId = Field(alias="_id")  # the report the duplicates merge into
+    zone: Optional[str] = None
+    category: ReportCategory
+    duplicate_ids: List[PyObjectId]
+    applied: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
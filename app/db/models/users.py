@@ -21,6 +21,12 @@ class UserStatus(str, Enum):
     PENDING = "PENDING"
 
 
+class TechnicianAvailability(str, Enum):
+    AVAILABLE = "AVAILABLE"
+    BUSY = "BUSY"
+    OFF_DUTY = "OFF_DUTY"
+
+
 class UserBase(BaseModel):
     firstname: str
     lastname: str
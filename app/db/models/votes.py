@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from app.db.models.base import PyObjectId
+
+
+class Vote(BaseModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    report_id: PyObjectId
+    user_id: PyObjectId
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class VoteStatus(BaseModel):
+    report_id: PyObjectId
+    voted: bool
+    votes: int  # may lag other workers' votes by VOTES_FLUSH_SECONDS
+
+
+class VoteLookup(BaseModel):
+    report_ids: List[PyObjectId] = Field(max_length=500)
@@ -0,0 +1,52 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, Field, field_validator
+
+from app.db.models.base import PyObjectId, TimestampModel
+
+
+class ZoneBase(BaseModel):
+    name: str
+    code: Optional[str] = None
+    description: Optional[str] = None
+    geometry: dict  # GeoJSON Polygon or MultiPolygon, [lng, lat] positions
+
+    @field_validator('geometry')
+    def validate_geometry(cls, v: dict) -> dict:
+        """Only closed (Multi)Polygons can be used to resolve zones"""
+        if v.get("type") not in ("Polygon", "MultiPolygon"):
+            raise ValueError("Zone geometry must be a GeoJSON Polygon or MultiPolygon")
+        polygons = [v.get("coordinates")] if v["type"] == "Polygon" else v.get("coordinates")
+        try:
+            for rings in polygons:
+                for ring in rings:
+                    if len(ring) < 4 or list(ring[0]) != list(ring[-1]):
+                        raise ValueError("Polygon rings must be closed and have at least 4 positions")
+        except TypeError:
+            raise ValueError("Malformed polygon coordinates")
+        return v
+
+
+class ZoneCreate(ZoneBase):
+    pass
+
+
+class Zone(ZoneBase, TimestampModel):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+
+
+class ZonePublic(ZoneBase):
+    id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
+    updated_at: Optional[datetime] = None
+
+
+class ZoneUpdate(BaseModel):
+    name: Optional[str] = None
+    code: Optional[str] = None
+    description: Optional[str] = None
+    geometry: Optional[dict] = None
+
+    @field_validator('geometry')
+    def validate_geometry(cls, v: Optional[dict]) -> Optional[dict]:
+        return ZoneBase.validate_geometry(v) if v is not None else v
@@ -13,6 +13,7 @@ from app.db.utils import ColorMongoLogger
 monitoring.register(ColorMongoLogger())
 
 client: Optional[AsyncIOMotorClient] = None
+_transactions_supported: Optional[bool] = None
 
 
 # MongoDB connection example
@@ -32,6 +33,29 @@ async def connect_to_db():
     )
 
 
+async def supports_transactions() -> bool:
+    """Multi-document transactions need a replica set or a sharded cluster"""
+    global _transactions_supported
+    if _transactions_supported is None:
+        hello = await client.admin.command("hello")
+        _transactions_supported = bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+    return _transactions_supported
+
+
+@asynccontextmanager
+async def start_transaction():
+    """
+    Yield a session with an open transaction, committed on exit.
+    Yields None on a standalone server, where writes run without a session.
+    """
+    if not await supports_transactions():
+        yield None
+        return
+    async with await client.start_session() as session:
+        async with session.start_transaction():
+            yield session
+
+
 async def close_db_connection():
     global client
     if client:
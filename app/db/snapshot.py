@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from app.core.configs import settings
+from app.db.managers.reports import get_report_manager
+from app.db.models.reports import ReportCategory, ReportPriority, ReportStatus
+from app.utils.geospatial import point_lat_lng
+
+logger = logging.getLogger(__name__)
+
+
+def to_datetime64(date: datetime) -> np.datetime64:
+    """Naive UTC, as dates are stored"""
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return np.datetime64(date, "s")
+
+
+class EnumCodes:
+    """Small integer code of each member of a str Enum (-1 for unknown values)"""
+
+    def __init__(self, enum):
+        self.members = [member.value for member in enum]
+        self.codes = {value: code for code, value in enumerate(self.members)}
+
+    def code(self, value) -> int:
+        return self.codes.get(getattr(value, "value", value), -1)
+
+    def value(self, code: int) -> Optional[str]:
+        return self.members[code] if 0 <= code < len(self.members) else None
+
+
+SNAPSHOT_CODES = {
+    "category": EnumCodes(ReportCategory),
+    "status": EnumCodes(ReportStatus),
+    "priority": EnumCodes(ReportPriority),
+}
+
+
+class ReportSnapshot:
+    """
+    Per-worker columnar copy of the report fields used by scans (heatmaps,
+    clustering, counts): one NumPy array per field plus an id -> row index,
+    so analytical passes run at array speed without touching Mongo.
+
+    Columns: lat / lng (float64), created_at (datetime64[s]), category /
+    status / priority codes (int8) and a `live` flag, 28 bytes per report.
+    With the id index (~140 bytes per entry) a million reports take about
+    170 MB (measured with tracemalloc), plus up to 2x the columns while they
+    grow and the Python lists of a rebuild.
+
+    Built once with a projected cursor, then kept current with delta reads of
+    the reports whose `updated_at` moved (at most every SNAPSHOT_REFRESH_SECONDS,
+    on demand). A full rebuild happens every SNAPSHOT_FULL_REFRESH_SECONDS or
+    when the collection count shows deleted reports. Every change bumps
+    `version`, so results derived from the snapshot can be cached per version.
+    Arrays are only mutated between awaits: a synchronous scan always sees
+    consistent columns.
+    """
+
+    DTYPES = {
+        "lat": np.float64,
+        "lng": np.float64,
+        "created_at": "datetime64[s]",
+        "category": np.int8,
+        "status": np.int8,
+        "priority": np.int8,
+        "live": np.bool_,
+    }
+
+    def __init__(self, capacity: int = 1024):
+        self._columns = {name: np.zeros(capacity, dtype=dtype) for name, dtype in self.DTYPES.items()}
+        self.size = 0
+        self.ids: List[str] = []
+        self.rows: Dict[str, int] = {}
+        self.version = 0
+        self.refreshed_at: Optional[datetime] = None
+        self._checked_at = float("-inf")
+        self._rebuilt_at = float("-inf")
+        self._lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def column(self, name: str) -> np.ndarray:
+        """Read-only view of a column over the used rows"""
+        view = self._columns[name][:self.size]
+        view.flags.writeable = False
+        return view
+
+    def _grow(self) -> None:
+        for name, values in self._columns.items():
+            grown = np.zeros(max(len(values) * 2, 1024), dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self._columns[name] = grown
+
+    def upsert(self, doc: dict) -> None:
+        report_id = str(doc["_id"])
+        position = point_lat_lng((doc.get("location") or {}).get("coordinates"))
+        if position is None:
+            self.remove(report_id)
+            return
+        row = self.rows.get(report_id)
+        if row is None:
+            if self.size == len(self._columns["live"]):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.rows[report_id] = row
+            self.ids.append(report_id)
+        columns = self._columns
+        columns["lat"][row], columns["lng"][row] = position
+        created_at = doc.get("created_at")
+        columns["created_at"][row] = to_datetime64(created_at) if created_at else np.datetime64("NaT")
+        for name, codes in SNAPSHOT_CODES.items():
+            columns[name][row] = codes.code(doc.get(name))
+        columns["live"][row] = True
+
+    async def load(self, docs: AsyncIterator[dict]) -> None:
+        """Fill an empty snapshot, building each column at once (per-row writes are ~10x slower)"""
+        columns = {name: [] for name in self.DTYPES}
+        async for doc in docs:
+            position = point_lat_lng((doc.get("location") or {}).get("coordinates"))
+            report_id = str(doc["_id"])
+            if position is None or report_id in self.rows:
+                continue
+            self.rows[report_id] = len(self.ids)
+            self.ids.append(report_id)
+            columns["lat"].append(position[0])
+            columns["lng"].append(position[1])
+            columns["created_at"].append(doc.get("created_at"))
+            for name, codes in SNAPSHOT_CODES.items():
+                columns[name].append(codes.code(doc.get(name)))
+        columns["live"] = [True] * len(self.ids)
+        self._columns = {name: np.array(values, dtype=self.DTYPES[name]) for name, values in columns.items()}
+        self.size = len(self.ids)
+
+    def remove(self, report_id: str) -> None:
+        """Rows of removed reports stay allocated (not live) until the next rebuild"""
+        row = self.rows.pop(report_id, None)
+        if row is not None:
+            self._columns["live"][row] = False
+
+    async def refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._checked_at < settings.SNAPSHOT_REFRESH_SECONDS:
+            return
+        async with self._lock:
+            if not force and now - self._checked_at < settings.SNAPSHOT_REFRESH_SECONDS:
+                return
+            report_manager = get_report_manager()
+            started_at = datetime.utcnow()
+            rebuild = force or now - self._rebuilt_at >= settings.SNAPSHOT_FULL_REFRESH_SECONDS
+            if not rebuild:
+                # Overlap the previous read so writes committed late are not missed
+                since = self.refreshed_at - timedelta(seconds=settings.SNAPSHOT_REFRESH_SECONDS)
+                changed = 0
+                async for doc in report_manager.iter_snapshot_rows(since):
+                    self.upsert(doc)
+                    changed += 1
+                if changed:
+                    self.version += 1
+                # Deletes leave no trace to read incrementally
+                rebuild = await report_manager.estimated_count() < len(self)
+            if rebuild:
+                # Fill a fresh snapshot and swap it in, so scans never see a partial one
+                fresh = ReportSnapshot()
+                await fresh.load(report_manager.iter_snapshot_rows())
+                self._columns, self.size, self.ids, self.rows = fresh._columns, fresh.size, fresh.ids, fresh.rows
+                self.version += 1
+                self._rebuilt_at = now
+                logger.info(f"Report snapshot rebuilt with {len(self)} reports")
+            self.refreshed_at = started_at
+            self._checked_at = now
+
+    def select(
+            self,
+            category: Optional[str] = None,
+            status: Optional[str] = None,
+            priority: Optional[str] = None,
+            start: Optional[datetime] = None,
+            end: Optional[datetime] = None
+    ) -> np.ndarray:
+        """Boolean mask of the live rows matching the filters"""
+        mask = self.column("live").copy()
+        for name, value in (("category", category), ("status", status), ("priority", priority)):
+            if value is not None:
+                mask &= self.column(name) == SNAPSHOT_CODES[name].code(value)
+        # NaT (no creation date) compares False, so those reports drop out of dated queries
+        if start is not None:
+            mask &= self.column("created_at") >= to_datetime64(start)
+        if end is not None:
+            mask &= self.column("created_at") < to_datetime64(end)
+        return mask
+
+    def count_by(self, name: str, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        """Number of (masked) reports per category, status or priority"""
+        codes = SNAPSHOT_CODES[name]
+        values = self.column(name)[self.column("live") if mask is None else mask]
+        counts = np.bincount(values[values >= 0], minlength=len(codes.members))
+        return {codes.value(code): int(count) for code, count in enumerate(counts) if count}
+
+
+report_snapshot = ReportSnapshot()
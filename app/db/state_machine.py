@@ -0,0 +1,356 @@
+import logging
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+from pydantic import BaseModel, Field
+from pymongo.errors import PyMongoError
+
+from app.db.managers.analytics import FIRST_INTERVENTION_COMMENT
+from app.db.managers.interventions import get_intervention_manager
+from app.db.managers.reports import get_report_manager
+from app.db.managers.users import get_user_manager
+from app.db.models.interventions import (
+    COMPLETED_INTERVENTION_STATUSES,
+    Intervention,
+    InterventionCreate,
+    InterventionStatus,
+    OPEN_INTERVENTION_STATUSES
+)
+from app.db.models.reports import Report, ReportStatus
+from app.db.mongodb import start_transaction
+
+logger = logging.getLogger(__name__)
+
+MAX_TRANSITION_RETRIES = 3
+
+REPORT_TRANSITIONS: Dict[ReportStatus, Set[ReportStatus]] = {
+    ReportStatus.REPORTED: {ReportStatus.VALIDATED, ReportStatus.ASSIGNED, ReportStatus.REJECTED},
+    ReportStatus.VALIDATED: {ReportStatus.ASSIGNED, ReportStatus.REJECTED},
+    ReportStatus.ASSIGNED: {
+        ReportStatus.VALIDATED,
+        ReportStatus.IN_PROGRESS,
+        ReportStatus.COMPLETED,
+        ReportStatus.RESOLVED
+    },
+    ReportStatus.IN_PROGRESS: {ReportStatus.ASSIGNED, ReportStatus.COMPLETED, ReportStatus.RESOLVED},
+    ReportStatus.COMPLETED: {ReportStatus.IN_PROGRESS, ReportStatus.RESOLVED},
+    ReportStatus.RESOLVED: {ReportStatus.IN_PROGRESS},  # re-opened
+    ReportStatus.REJECTED: {ReportStatus.VALIDATED},  # appeal
+}
+
+INTERVENTION_TRANSITIONS: Dict[InterventionStatus, Set[InterventionStatus]] = {
+    InterventionStatus.SCHEDULED: {
+        InterventionStatus.ASSIGNED,
+        InterventionStatus.IN_PROGRESS,
+        InterventionStatus.COMPLETED,
+        InterventionStatus.CANCELLED
+    },
+    InterventionStatus.ASSIGNED: {
+        InterventionStatus.SCHEDULED,
+        InterventionStatus.IN_PROGRESS,
+        InterventionStatus.COMPLETED,
+        InterventionStatus.CANCELLED
+    },
+    InterventionStatus.IN_PROGRESS: {
+        InterventionStatus.ASSIGNED,
+        InterventionStatus.COMPLETED,
+        InterventionStatus.CANCELLED
+    },
+    InterventionStatus.COMPLETED: {InterventionStatus.IN_PROGRESS, InterventionStatus.SUCCESSED},
+    InterventionStatus.SUCCESSED: set(),
+    InterventionStatus.CANCELLED: set(),
+}
+
+
+class TransitionError(Exception):
+    """Raised when the current status does not allow the requested one"""
+
+    def __init__(self, entity: str, current: str, target: str):
+        self.entity = entity
+        self.current = current
+        self.target = target
+        super().__init__(f"Cannot move {entity} from {current} to {target}")
+
+
+class StatusChange(BaseModel):
+    """A committed status change, handed to the registered listeners"""
+    entity: str  # "report" or "intervention"
+    entity_id: str
+    report_id: str
+    previous_status: Optional[str] = None  # None for a new intervention
+    status: str
+    user_id: Optional[str] = None
+    technician_ids: List[str] = []  # interventions only
+    zone: Optional[str] = None  # reports only, when known without a read
+    at: datetime = Field(default_factory=datetime.utcnow)
+
+
+_status_listeners: List[Callable[[StatusChange], None]] = []
+
+
+def add_status_listener(listener: Callable[[StatusChange], None]) -> None:
+    """
+    Call `listener` with every status change once it is committed. Listeners
+    run on the request path and must not block (e.g. enqueue and return).
+    """
+    _status_listeners.append(listener)
+
+
+def allowed_sources(transitions: Dict[str, Set[str]], target: str) -> List[str]:
+    """Statuses from which `target` can be reached"""
+    return [source for source, targets in transitions.items() if target in targets]
+
+
+class StatusStateMachine:
+    """
+    Single entry point for report / intervention status changes.
+
+    Every transition is a compare-and-set: the write is filtered on the
+    statuses allowed to reach the target, so the legality check and the update
+    are one round trip and concurrent callers cannot overwrite each other.
+    Transitions touching both collections run in a transaction when the server
+    supports it and are retried a bounded number of times on transient errors.
+    Status listeners are only called once the changes are committed.
+    """
+
+    def __init__(self):
+        self.report_manager = get_report_manager()
+        self.intervention_manager = get_intervention_manager()
+        self.user_manager = get_user_manager()
+        self._changes: List[StatusChange] = []
+
+    def _emit(self) -> None:
+        changes, self._changes = self._changes, []
+        for change in changes:
+            for listener in _status_listeners:
+                try:
+                    listener(change)
+                except Exception as e:
+                    logger.error(f"Status listener failed on {change.entity} {change.entity_id}: {e}")
+
+    async def _in_transaction(self, operation, *args):
+        for attempt in range(1, MAX_TRANSITION_RETRIES + 1):
+            # Changes recorded by an aborted attempt never happened
+            self._changes = []
+            try:
+                async with start_transaction() as session:
+                    result = await operation(*args, session=session)
+                self._emit()
+                return result
+            except PyMongoError as e:
+                transient = e.has_error_label("TransientTransactionError") or \
+                    e.has_error_label("UnknownTransactionCommitResult")
+                if not transient or attempt == MAX_TRANSITION_RETRIES:
+                    raise
+                logger.warning(f"Retrying {operation.__name__} after transient error ({attempt}): {e}")
+
+    async def _move_report(
+            self,
+            report_id: str,
+            new_status: ReportStatus,
+            user_id: str,
+            comment: Optional[str] = None,
+            condition: Optional[dict] = None,
+            session=None
+    ) -> Optional[dict]:
+        previous = await self.report_manager.update_report_status_if(
+            report_id,
+            {"status": {"$in": allowed_sources(REPORT_TRANSITIONS, new_status)}, **(condition or {})},
+            new_status,
+            user_id,
+            comment,
+            session=session
+        )
+        if previous:
+            self._changes.append(StatusChange(
+                entity="report",
+                entity_id=report_id,
+                report_id=report_id,
+                previous_status=previous.get("status"),
+                status=new_status,
+                user_id=user_id,
+                zone=(previous.get("location") or {}).get("zone")
+            ))
+        return previous
+
+    async def transition_report(
+            self,
+            report_id: str,
+            new_status: ReportStatus,
+            user_id: str,
+            comment: Optional[str] = None
+    ) -> Optional[Report]:
+        """Move a report to `new_status`; None if the report does not exist"""
+        new_status = ReportStatus(new_status)
+        self._changes = []
+        moved = await self._move_report(report_id, new_status, user_id, comment)
+        self._emit()
+        if not moved:
+            report = await self.report_manager.get(report_id)
+            if report is None or report.status == new_status:
+                return report
+            raise TransitionError("report", report.status, new_status)
+        return await self.report_manager.get(report_id)
+
+    async def create_intervention(self, intervention_data: InterventionCreate, user_id: str) -> Intervention:
+        """Insert an intervention, count it on its report and assign the report if it is the first one"""
+        return await self._in_transaction(self._create_intervention, intervention_data, user_id)
+
+    async def _create_intervention(
+            self,
+            intervention_data: InterventionCreate,
+            user_id: str,
+            session=None
+    ) -> Intervention:
+        intervention = await self.intervention_manager.create_intervention(intervention_data, session=session)
+        report_id = str(intervention.report_id)
+        await self.report_manager.increment_intervention_stats(
+            report_id,
+            session=session,
+            **self.intervention_manager.counter_deltas(None, intervention.status)
+        )
+        previous = await self._move_report(
+            report_id,
+            ReportStatus.ASSIGNED,
+            user_id,
+            FIRST_INTERVENTION_COMMENT,
+            condition={"intervention_stats.total": 1},
+            session=session
+        )
+        if previous:
+            await self.report_manager.analytics_manager.record_first_intervention(
+                previous, datetime.utcnow(), session=session
+            )
+        if intervention.status in OPEN_INTERVENTION_STATUSES:
+            await self.user_manager.increment_open_interventions(intervention.technician_ids, 1, session=session)
+        self._changes.append(StatusChange(
+            entity="intervention",
+            entity_id=str(intervention.id),
+            report_id=report_id,
+            status=intervention.status,
+            user_id=user_id,
+            technician_ids=[str(tid) for tid in intervention.technician_ids]
+        ))
+        return intervention
+
+    async def assign_technicians(
+            self,
+            intervention_id: str,
+            technician_ids: List[str],
+            is_primary: bool = False
+    ) -> Optional[Intervention]:
+        """Replace the technicians of an intervention, moving its load from the old ones to the new ones"""
+        return await self._in_transaction(self._assign_technicians, intervention_id, technician_ids, is_primary)
+
+    async def _assign_technicians(
+            self,
+            intervention_id: str,
+            technician_ids: List[str],
+            is_primary: bool = False,
+            session=None
+    ) -> Optional[Intervention]:
+        previous = await self.intervention_manager.assign_technicians(
+            intervention_id,
+            technician_ids,
+            is_primary,
+            session=session
+        )
+        if previous is None:
+            return None
+        if previous["status"] in OPEN_INTERVENTION_STATUSES:
+            old_ids = {str(tid) for tid in previous.get("technician_ids", [])}
+            new_ids = {str(tid) for tid in technician_ids}
+            await self.user_manager.increment_open_interventions(list(old_ids - new_ids), -1, session=session)
+            await self.user_manager.increment_open_interventions(list(new_ids - old_ids), 1, session=session)
+        return await self.intervention_manager.get(intervention_id, session=session)
+
+    async def transition_intervention(
+            self,
+            intervention_id: str,
+            new_status: InterventionStatus,
+            user_id: str
+    ) -> Optional[Intervention]:
+        """
+        Move an intervention to `new_status`, keep the report counters in sync
+        and derive the report status. None if the intervention does not exist.
+        """
+        new_status = InterventionStatus(new_status)
+        return await self._in_transaction(self._transition_intervention, intervention_id, new_status, user_id)
+
+    async def _transition_intervention(
+            self,
+            intervention_id: str,
+            new_status: InterventionStatus,
+            user_id: str,
+            session=None
+    ) -> Optional[Intervention]:
+        previous = await self.intervention_manager.set_status(
+            intervention_id,
+            new_status,
+            allowed_from=allowed_sources(INTERVENTION_TRANSITIONS, new_status),
+            session=session
+        )
+        if previous is None:
+            intervention = await self.intervention_manager.get(intervention_id, session=session)
+            if intervention is None or intervention.status == new_status:
+                return intervention
+            raise TransitionError("intervention", intervention.status, new_status)
+
+        report_id = str(previous["report_id"])
+        await self.report_manager.increment_intervention_stats(
+            report_id,
+            session=session,
+            **self.intervention_manager.counter_deltas(previous["status"], new_status)
+        )
+        self._changes.append(StatusChange(
+            entity="intervention",
+            entity_id=intervention_id,
+            report_id=report_id,
+            previous_status=previous["status"],
+            status=new_status,
+            user_id=user_id,
+            technician_ids=[str(tid) for tid in previous.get("technician_ids", [])]
+        ))
+
+        was_open = previous["status"] in OPEN_INTERVENTION_STATUSES
+        if was_open != (new_status in OPEN_INTERVENTION_STATUSES):
+            await self.user_manager.increment_open_interventions(
+                [str(tid) for tid in previous.get("technician_ids", [])],
+                -1 if was_open else 1,
+                session=session
+            )
+
+        comment = f"Intervention status changed to {new_status.value}"
+        if new_status in COMPLETED_INTERVENTION_STATUSES or new_status == InterventionStatus.CANCELLED:
+            await self._move_report(
+                report_id,
+                ReportStatus.RESOLVED,
+                user_id,
+                "All interventions completed",
+                condition={
+                    "$expr": {
+                        "$and": [
+                            {"$gt": ["$intervention_stats.total", 0]},
+                            {"$eq": ["$intervention_stats.completed", "$intervention_stats.total"]}
+                        ]
+                    }
+                },
+                session=session
+            )
+        elif new_status == InterventionStatus.IN_PROGRESS:
+            await self._move_report(report_id, ReportStatus.IN_PROGRESS, user_id, comment, session=session)
+        elif new_status in (InterventionStatus.SCHEDULED, InterventionStatus.ASSIGNED):
+            await self._move_report(
+                report_id,
+                ReportStatus.ASSIGNED,
+                user_id,
+                comment,
+                condition={"intervention_stats.in_progress": {"$lte": 0}},
+                session=session
+            )
+
+        return await self.intervention_manager.get(intervention_id, session=session)
+
+
+def get_state_machine() -> StatusStateMachine:
+    return StatusStateMachine()
@@ -0,0 +1,91 @@
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from app.api.v1.services.digests import DIGEST_WINDOWS, digest_period_end, get_digest_service
+from app.api.v1.services.email import get_email_service
+from app.api.v1.services.media import get_media_processor
+from app.api.v1.services.notifications import notification_dispatcher
+from app.db.hot_score import hot_score_version
+from app.db.managers.analytics import get_analytics_manager
+from app.db.managers.jobs import retry_delay
+from app.db.managers.reports import get_report_manager
+from app.db.managers.votes import get_vote_manager
+from app.db.models.jobs import JobType
+from app.db.models.notifications import DigestFrequency
+from app.db.state_machine import StatusChange
+
+JobHandler = Callable[[dict], Awaitable[None]]
+
+HANDLERS: Dict[JobType, JobHandler] = {}
+
+
+def scheduled_jobs(now: datetime) -> List[Tuple[JobType, dict, str]]:
+    """
+    (type, payload, key) of the periodic jobs due at `now`. The key names the
+    period, so each one is enqueued once however many workers schedule it.
+    """
+    jobs = []
+    for frequency in DIGEST_WINDOWS:
+        end = digest_period_end(frequency, now)
+        jobs.append((
+            JobType.DIGEST,
+            {"frequency": frequency.value, "end": end},
+            f"digest:{frequency.value}:{end.isoformat()}"
+        ))
+    # Once per scoring configuration, i.e. after a deploy changing the weights
+    version = hot_score_version()
+    jobs.append((JobType.HOT_SCORES_RECOMPUTE, {"version": version}, f"hot_scores:{version}"))
+    return jobs
+
+
+def job_handler(job_type: JobType) -> Callable[[JobHandler], JobHandler]:
+    """Register the coroutine running the jobs of `job_type` with their payload"""
+    def register(handler: JobHandler) -> JobHandler:
+        HANDLERS[job_type] = handler
+        return handler
+    return register
+
+
+@job_handler(JobType.EMAIL)
+async def send_emails(payload: dict) -> None:
+    messages = payload["messages"]
+    email_service = get_email_service()
+    failed = await email_service.send_many(messages)
+    if len(failed) == len(messages):
+        raise RuntimeError(f"Failed to send {len(failed)} emails")
+    if failed:
+        # Retry only what failed, so the recipients already served get no duplicate
+        await email_service.queue_emails(
+            failed,
+            run_at=datetime.utcnow() + timedelta(seconds=retry_delay(1))
+        )
+
+
+@job_handler(JobType.NOTIFICATION_FAN_OUT)
+async def fan_out_notifications(payload: dict) -> None:
+    await notification_dispatcher.fan_out(StatusChange(**payload))
+
+
+@job_handler(JobType.ANALYTICS_BACKFILL)
+async def backfill_rollups(payload: dict) -> None:
+    await get_analytics_manager().backfill()
+
+
+@job_handler(JobType.HOT_SCORES_RECOMPUTE)
+async def recompute_hot_scores(payload: dict) -> None:
+    await get_report_manager().recompute_hot_scores()
+
+
+@job_handler(JobType.VOTES_REBUILD)
+async def rebuild_vote_counts(payload: dict) -> None:
+    await get_vote_manager().rebuild_report_vote_counts()
+
+
+@job_handler(JobType.DIGEST)
+async def send_digests(payload: dict) -> None:
+    await get_digest_service().send_digests(DigestFrequency(payload["frequency"]), payload["end"])
+
+
+@job_handler(JobType.MEDIA_VARIANTS)
+async def create_media_variants(payload: dict) -> None:
+    await get_media_processor().create_variants(payload["target"], payload["owner_id"], payload["url"])
@@ -0,0 +1,129 @@
+"""
+Find duplicate open reports and merge them.
+
+Open reports are streamed zone by zone with a projected cursor and clustered
+with DBSCAN on haversine distance, reports only clustering with their own
+category. Each cluster merges into its report with the most interventions
+(then the oldest); reports that already have interventions are never merged
+away. Memory is bounded by the largest zone (projected documents, about
+1 KB per report).
+
+    python -m app.jobs.merge_duplicates [--apply] [--zone NAME ...] [--eps 30] [--min-samples 2]
+
+Without --apply, merge proposals are written to `report_merge_proposals`.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from app.core.logger import configure_logging
+from app.db.managers.merges import get_merge_proposal_manager
+from app.db.managers.reports import get_report_manager
+from app.db.models.reports import MergeProposal
+from app.db.mongodb import close_db_connection, connect_to_db
+from app.db.snapshot import SNAPSHOT_CODES
+from app.utils.clustering import dbscan
+from app.utils.geospatial import point_lat_lng
+
+logger = logging.getLogger("app.jobs.merge_duplicates")
+
+MERGE_BATCH_SIZE = 1_000  # clusters per bulk write
+
+
+def cluster_zone(docs: List[dict], eps: float, min_samples: int) -> List[Tuple[dict, List[dict]]]:
+    """(target, duplicates) of every cluster found among the reports of one zone"""
+    lats = np.array([doc["_lat"] for doc in docs])
+    lngs = np.array([doc["_lng"] for doc in docs])
+    categories = np.array([SNAPSHOT_CODES["category"].code(doc.get("category")) for doc in docs])
+    labels = dbscan(lats, lngs, eps, min_samples, groups=categories)
+
+    clustered = np.flatnonzero(labels >= 0)
+    clustered = clustered[np.argsort(labels[clustered], kind="stable")]
+    boundaries = np.flatnonzero(np.diff(labels[clustered])) + 1
+    merges = []
+    for members in np.split(clustered, boundaries):
+        if len(members) < 2:
+            continue
+        group = [docs[k] for k in members]
+        target = min(group, key=lambda doc: (
+            -(doc.get("intervention_stats") or {}).get("total", 0),
+            doc.get("created_at") is None,
+            doc.get("created_at") or 0,
+            str(doc["_id"]),
+        ))
+        duplicates = [
+            doc for doc in group
+            if doc is not target and not (doc.get("intervention_stats") or {}).get("total", 0)
+        ]
+        if duplicates:
+            merges.append((target, duplicates))
+    return merges
+
+
+async def process_zone(zone: Optional[str], eps: float, min_samples: int, apply: bool) -> Tuple[int, int]:
+    report_manager = get_report_manager()
+    docs = []
+    async for doc in report_manager.iter_open_reports(zone):
+        position = point_lat_lng((doc.get("location") or {}).get("coordinates"))
+        if position:
+            doc["_lat"], doc["_lng"] = position
+            docs.append(doc)
+    if len(docs) < 2:
+        return len(docs), 0
+
+    merges = cluster_zone(docs, eps, min_samples)
+    merged = 0
+    for start in range(0, len(merges), MERGE_BATCH_SIZE):
+        batch = merges[start:start + MERGE_BATCH_SIZE]
+        if apply:
+            merged += await report_manager.merge_reports(batch)
+        else:
+            await get_merge_proposal_manager().save_proposals([
+                MergeProposal(
+                    _id=str(target["_id"]),
+                    zone=zone,
+                    category=target["category"],
+                    duplicate_ids=[str(doc["_id"]) for doc in duplicates],
+                )
+                for target, duplicates in batch
+            ])
+            merged += sum(len(duplicates) for _, duplicates in batch)
+    return len(docs), merged
+
+
+async def run(zones: Optional[List[str]], eps: float, min_samples: int, apply: bool) -> None:
+    await connect_to_db()
+    try:
+        zones = zones or await get_report_manager().open_report_zones()
+        total_reports = total_merged = 0
+        for zone in zones:
+            started = time.perf_counter()
+            reports, merged = await process_zone(zone, eps, min_samples, apply)
+            total_reports += reports
+            total_merged += merged
+            logger.info(
+                f"zone={zone or '-'} reports={reports} "
+                f"{'merged' if apply else 'proposed'}={merged} in {time.perf_counter() - started:.1f}s"
+            )
+        logger.info(f"{total_reports} open reports, {total_merged} {'merged' if apply else 'proposed for merge'}")
+    finally:
+        await close_db_connection()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cluster and merge duplicate open reports")
+    parser.add_argument("--apply", action="store_true", help="merge instead of writing proposals")
+    parser.add_argument("--zone", action="append", dest="zones", help="only this zone (repeatable)")
+    parser.add_argument("--eps", type=float, default=30, help="neighbourhood radius in meters")
+    parser.add_argument("--min-samples", type=int, default=2, help="reports within eps making a core report")
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(run(args.zones, args.eps, args.min_samples, args.apply))
+
+
+if __name__ == "__main__":
+    main()
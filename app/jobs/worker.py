@@ -0,0 +1,139 @@
+"""
+Run background jobs from the `jobs` collection.
+
+    python -m app.jobs.worker [--concurrency 8] [--type email.send ...]
+
+Each process runs up to --concurrency jobs at once and renews their leases
+while they run; start as many processes as needed, they coordinate through
+the atomic claims only. SIGTERM / SIGINT stop claiming and let running jobs
+finish. Workers also enqueue the periodic jobs (digests), once per period.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+from datetime import datetime
+from typing import List, Optional
+
+from app.api.v1.services.email import get_email_service
+from app.api.v1.services.media import get_media_processor
+from app.core.configs import settings
+from app.core.logger import configure_logging
+from app.db.managers.jobs import get_job_manager
+from app.db.models.jobs import Job, JobType
+from app.db.mongodb import close_db_connection, connect_to_db
+from app.jobs.handlers import HANDLERS, scheduled_jobs
+
+logger = logging.getLogger("app.jobs.worker")
+
+SCHEDULE_SECONDS = 60
+
+
+class Worker:
+    def __init__(self, concurrency: int, job_types: Optional[List[JobType]] = None):
+        self.concurrency = concurrency
+        self.job_types = job_types
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.job_manager = get_job_manager()
+        self.stopping = asyncio.Event()
+
+    async def _pause(self, seconds: float) -> None:
+        """Sleep, waking up early on shutdown"""
+        try:
+            await asyncio.wait_for(self.stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _renew(self, job: Job) -> None:
+        while True:
+            await asyncio.sleep(settings.JOBS_LEASE_SECONDS / 3)
+            if not await self.job_manager.extend_lease(job, self.worker_id):
+                logger.warning(f"Lost the lease of job {job.id} ({job.type}), it may run twice")
+                return
+
+    async def execute(self, job: Job) -> None:
+        renew = asyncio.create_task(self._renew(job))
+        try:
+            handler = HANDLERS.get(job.type)
+            if handler is None:
+                raise LookupError(f"No handler for {job.type}")
+            await handler(job.payload)
+        except Exception as e:
+            logger.exception(f"Job {job.id} ({job.type}) failed, attempt {job.attempts}/{job.max_attempts}")
+            await self.job_manager.fail(job, self.worker_id, f"{type(e).__name__}: {e}")
+        else:
+            await self.job_manager.complete(job, self.worker_id)
+        finally:
+            renew.cancel()
+
+    async def _slot(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                job = await self.job_manager.claim(self.worker_id, self.job_types)
+            except Exception as e:
+                logger.error(f"Failed to claim a job: {e}")
+                job = None
+            if job is None:
+                await self._pause(settings.JOBS_POLL_SECONDS)
+                continue
+            try:
+                await self.execute(job)
+            except Exception as e:
+                # Recording the outcome failed; the lease expires and the job is handed out again
+                logger.error(f"Failed to record the outcome of job {job.id}: {e}")
+
+    async def _reaper(self) -> None:
+        while not self.stopping.is_set():
+            try:
+                requeued = await self.job_manager.requeue_expired()
+                if requeued:
+                    logger.warning(f"Requeued {requeued} jobs with an expired lease")
+            except Exception as e:
+                logger.error(f"Failed to requeue expired jobs: {e}")
+            await self._pause(settings.JOBS_LEASE_SECONDS)
+
+    async def _scheduler(self) -> None:
+        while not self.stopping.is_set():
+            for job_type, payload, key in scheduled_jobs(datetime.utcnow()):
+                try:
+                    if await self.job_manager.enqueue(job_type, payload, key=key):
+                        logger.info(f"Scheduled {key}")
+                except Exception as e:
+                    logger.error(f"Failed to schedule {key}: {e}")
+            await self._pause(SCHEDULE_SECONDS)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            loop.add_signal_handler(sig, self.stopping.set)
+        await connect_to_db()
+        try:
+            await self.job_manager.ensure_indexes()
+            logger.info(f"Worker {self.worker_id} running {self.concurrency} jobs at a time")
+            await asyncio.gather(self._reaper(), self._scheduler(), *(self._slot() for _ in range(self.concurrency)))
+        finally:
+            await get_email_service().pool.close()
+            get_media_processor().shutdown()
+            await close_db_connection()
+        logger.info(f"Worker {self.worker_id} stopped")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--concurrency", type=int, default=settings.JOBS_CONCURRENCY, help="jobs run at once")
+    parser.add_argument(
+        "--type",
+        action="append",
+        dest="job_types",
+        type=JobType,
+        help="only run jobs of this type (repeatable)"
+    )
+    args = parser.parse_args()
+    configure_logging()
+    asyncio.run(Worker(args.concurrency, args.job_types).run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.geospatial import EARTH_RADIUS_M
+
+
+def neighbour_pairs(
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        eps: float,
+        groups: Optional[Sequence[int]] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All pairs (i, j), i < j, within `eps` meters (haversine) and in the same group.
+
+    Points are bucketed on an eps-sized grid (local equirectangular projection);
+    candidates come from the 3x3 neighbouring cells, found for every point at
+    once with searchsorted over the sorted cell keys, then checked exactly.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+    n = len(lat)
+    if n < 2:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    group = np.zeros(n, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+
+    # Cells are at least eps wide everywhere in the partition (cos shrinks towards the poles)
+    cos_lat = max(np.cos(np.abs(lat).max()), 1e-6)
+    cell = eps / EARTH_RADIUS_M
+    cx = np.floor(lng * cos_lat / cell).astype(np.int64)
+    cy = np.floor(lat / cell).astype(np.int64)
+    cx -= cx.min() - 1
+    cy -= cy.min() - 1
+    width = int(cy.max()) + 2
+    height = int(cx.max()) + 2
+    keys = (group * height + cx) * width + cy
+
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    firsts, seconds = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            targets = keys + dx * width + dy
+            left = np.searchsorted(sorted_keys, targets, side="left")
+            right = np.searchsorted(sorted_keys, targets, side="right")
+            counts = right - left
+            total = int(counts.sum())
+            if not total:
+                continue
+            i = np.repeat(np.arange(n), counts)
+            # Position inside each point's candidate range, added to the range start
+            offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            j = order[np.repeat(left, counts) + offsets]
+            keep = i < j
+            firsts.append(i[keep])
+            seconds.append(j[keep])
+    i = np.concatenate(firsts) if firsts else np.empty(0, dtype=np.int64)
+    j = np.concatenate(seconds) if seconds else np.empty(0, dtype=np.int64)
+
+    a = np.sin((lat[j] - lat[i]) / 2) ** 2 + \
+        np.cos(lat[i]) * np.cos(lat[j]) * np.sin((lng[j] - lng[i]) / 2) ** 2
+    distance = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    close = distance <= eps
+    return i[close], j[close]
+
+
+def connected_labels(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Smallest node index of each node's connected component (min-label propagation)"""
+    labels = np.arange(n)
+    while True:
+        previous = labels.copy()
+        low = np.minimum(labels[i], labels[j])
+        np.minimum.at(labels, i, low)
+        np.minimum.at(labels, j, low)
+        # Pointer jumping: follow labels to their own labels until stable
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def dbscan(
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        eps: float,
+        min_samples: int = 2,
+        groups: Optional[Sequence[int]] = None
+) -> np.ndarray:
+    """
+    DBSCAN on haversine distance, points only clustering within their group.
+    Returns a cluster label per point (the index of one of its core points),
+    -1 for noise.
+    """
+    n = len(lats)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    i, j = neighbour_pairs(lats, lngs, eps, groups)
+    neighbours = 1 + np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+    core = neighbours >= min_samples
+
+    # Clusters are the connected components of core points
+    both = core[i] & core[j]
+    labels = connected_labels(n, i[both], j[both])
+    labels[~core] = -1
+
+    # Border points join the cluster of a core neighbour
+    to_border = core[i] & ~core[j]
+    labels[j[to_border]] = labels[i[to_border]]
+    from_border = core[j] & ~core[i]
+    labels[i[from_border]] = labels[j[from_border]]
+    return labels
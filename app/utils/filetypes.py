@@ -0,0 +1,31 @@
+from typing import Optional
+
+SNIFF_BYTES = 16  # enough for every signature below
+
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/gif", "image/webp", "image/heic")
+VIDEO_TYPES = ("video/mp4", "video/quicktime")
+DOCUMENT_TYPES = ("application/pdf",)
+
+HEIF_BRANDS = (b"heic", b"heix", b"hevc", b"hevx", b"mif1", b"msf1")
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    """Content type from the leading (magic) bytes of a file, None if unknown"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[4:8] == b"ftyp":
+        brand = head[8:12]
+        if brand in HEIF_BRANDS:
+            return "image/heic"
+        if brand == b"qt  ":
+            return "video/quicktime"
+        return "video/mp4"
+    if head.startswith(b"%PDF-"):
+        return "application/pdf"
+    return None
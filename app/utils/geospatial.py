@@ -1,4 +1,5 @@
-from typing import List, Dict
+import math
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
 
 
 async def get_nearby_reports(db, latitude: float, longitude: float, max_distance: float = 1000) -> List[Dict]:
@@ -26,3 +27,180 @@ async def get_reports_in_polygon(db, polygon_coordinates: List[List[List[float]]
             }
         }
     }).to_list(None)
+
+
+EARTH_RADIUS_M = 6_371_008.8
+
+
+def point_lat_lng(point: Optional[dict]) -> Optional[Tuple[float, float]]:
+    """(lat, lng) of a GeoJSON Point, None if it is missing or malformed"""
+    try:
+        lng, lat = point["coordinates"][:2]
+        return float(lat), float(lng)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class GridIndex:
+    """
+    In-memory uniform lat/lng grid for radius queries over moving points.
+    Upserts and removals are O(1), a radius query only visits the cells
+    covering the search circle.
+    """
+
+    def __init__(self, cell_size_m: float = 2_000):
+        self.cell_deg = cell_size_m / 111_320
+        self.cells: Dict[Tuple[int, int], Set[Hashable]] = {}
+        self.points: Dict[Hashable, Tuple[float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.points)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lng / self.cell_deg))
+
+    def upsert(self, key: Hashable, lat: float, lng: float) -> None:
+        previous = self.points.get(key)
+        cell = self._cell(lat, lng)
+        if previous is not None:
+            previous_cell = self._cell(*previous)
+            if previous_cell != cell:
+                self._discard(key, previous_cell)
+        self.cells.setdefault(cell, set()).add(key)
+        self.points[key] = (lat, lng)
+
+    def remove(self, key: Hashable) -> None:
+        previous = self.points.pop(key, None)
+        if previous is not None:
+            self._discard(key, self._cell(*previous))
+
+    def _discard(self, key: Hashable, cell: Tuple[int, int]) -> None:
+        members = self.cells.get(cell)
+        if members is not None:
+            members.discard(key)
+            if not members:
+                del self.cells[cell]
+
+    def nearby(self, lat: float, lng: float, radius_m: float) -> List[Tuple[Hashable, float]]:
+        """(key, distance in meters) of every point within `radius_m`"""
+        lat_cells = int(math.ceil(radius_m / 111_320 / self.cell_deg))
+        # Meridians converge towards the poles: widen the longitude span accordingly
+        lng_cells = int(math.ceil(lat_cells / max(math.cos(math.radians(lat)), 0.01)))
+        row, col = self._cell(lat, lng)
+
+        found = []
+        if (2 * lat_cells + 1) * (2 * lng_cells + 1) > len(self.cells):
+            candidates = (key for members in self.cells.values() for key in members)
+        else:
+            candidates = (
+                key
+                for r in range(row - lat_cells, row + lat_cells + 1)
+                for c in range(col - lng_cells, col + lng_cells + 1)
+                for key in self.cells.get((r, c), ())
+            )
+        for key in candidates:
+            distance = haversine_m(lat, lng, *self.points[key])
+            if distance <= radius_m:
+                found.append((key, distance))
+        return found
+
+
+def _point_in_ring(x: float, y: float, ring: List[List[float]]) -> bool:
+    """Even-odd ray casting on a ring of [lng, lat] positions"""
+    inside = False
+    j = len(ring) - 1
+    for i in range(len(ring)):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+
+def point_in_geometry(lat: float, lng: float, geometry: dict) -> bool:
+    """Exact test against a GeoJSON Polygon or MultiPolygon (holes excluded)"""
+    if geometry["type"] == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif geometry["type"] == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError(f"Unsupported geometry type {geometry['type']}")
+    for rings in polygons:
+        if _point_in_ring(lng, lat, rings[0]) and not any(_point_in_ring(lng, lat, hole) for hole in rings[1:]):
+            return True
+    return False
+
+
+def geometry_bbox(geometry: dict) -> Tuple[float, float, float, float]:
+    """(min_lng, min_lat, max_lng, max_lat) of a GeoJSON Polygon or MultiPolygon"""
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+    lngs = [position[0] for rings in polygons for position in rings[0]]
+    lats = [position[1] for rings in polygons for position in rings[0]]
+    return min(lngs), min(lats), max(lngs), max(lats)
+
+
+class RTree:
+    """
+    Static bounding-box R-tree, bulk loaded with Sort-Tile-Recursive packing.
+    Built once from (bbox, item) pairs and rebuilt wholesale when they change.
+    """
+
+    def __init__(self, entries: List[Tuple[Tuple[float, float, float, float], Any]], node_size: int = 8):
+        self.node_size = node_size
+        self.size = len(entries)
+        # A node is (bbox, children, is_leaf); leaf children are the items themselves
+        level = [(bbox, item) for bbox, item in entries]
+        leaf = True
+        while len(level) > node_size or leaf:
+            level = self._pack(level, leaf)
+            leaf = False
+        self.root = (self._union([bbox for bbox, _ in level]), level, False) if level else None
+
+    @staticmethod
+    def _union(boxes: List[Tuple[float, float, float, float]]) -> Tuple[float, float, float, float]:
+        return (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes)
+        )
+
+    def _pack(self, entries: list, leaf: bool) -> list:
+        if not entries:
+            return []
+        slice_count = max(1, math.ceil(math.sqrt(math.ceil(len(entries) / self.node_size))))
+        per_slice = slice_count * self.node_size
+        entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+        nodes = []
+        for s in range(0, len(entries), per_slice):
+            column = sorted(entries[s:s + per_slice], key=lambda e: e[0][1] + e[0][3])
+            for n in range(0, len(column), self.node_size):
+                group = column[n:n + self.node_size]
+                node = (self._union([bbox for bbox, _ in group]), group, leaf)
+                nodes.append((node[0], node))
+        return nodes
+
+    def query_point(self, x: float, y: float) -> List[Any]:
+        """Items whose bounding box contains the point"""
+        if self.root is None:
+            return []
+        found, stack = [], [self.root]
+        while stack:
+            _, children, leaf = stack.pop()
+            for bbox, child in children:
+                if bbox[0] <= x <= bbox[2] and bbox[1] <= y <= bbox[3]:
+                    if leaf:
+                        found.append(child)
+                    else:
+                        stack.append(child)
+        return found
@@ -0,0 +1,50 @@
+import math
+from typing import Optional, Tuple
+
+import numpy as np
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def mercator(lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+    """Normalised Web Mercator coordinates in [0, 1) (x east, y south), as used by z/x/y tiles"""
+    lat = np.radians(np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(lngs, dtype=np.float64) + 180.0) / 360.0
+    y = (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0
+    return x, y
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """(south, west, north, east) in degrees of a z/x/y tile"""
+    n = 2 ** z
+
+    def lat(tile_y: float) -> float:
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+
+    return lat(y + 1), x / n * 360.0 - 180.0, lat(y), (x + 1) / n * 360.0 - 180.0
+
+
+def density_grid(
+        mx: np.ndarray,
+        my: np.ndarray,
+        z: int,
+        x: int,
+        y: int,
+        size: int = 256,
+        mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Point counts of a z/x/y tile on a size x size grid (row 0 is the north edge).
+
+    Equivalent to `numpy.histogram2d` over the tile's uniform bins, but cells
+    are computed directly from the Mercator coordinates and counted with
+    `bincount`, which skips histogram2d's per-axis binary searches (~10x faster).
+    """
+    scale = (2 ** z) * size
+    cols = np.floor(mx * scale - x * size)
+    rows = np.floor(my * scale - y * size)
+    inside = (cols >= 0) & (cols < size) & (rows >= 0) & (rows < size)
+    if mask is not None:
+        inside &= mask
+    cells = rows[inside].astype(np.int64) * size + cols[inside].astype(np.int64)
+    return np.bincount(cells, minlength=size * size).reshape(size, size)
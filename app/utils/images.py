@@ -0,0 +1,38 @@
+import io
+from typing import Dict, Iterable, Tuple
+
+from PIL import Image, ImageOps
+
+CONTENT_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+
+def make_variants(
+        data: bytes,
+        sizes: Dict[str, int],
+        formats: Iterable[str] = ("webp", "jpeg"),
+        quality: int = 80
+) -> Dict[str, Tuple[bytes, str]]:
+    """
+    Resized copies of an image, keyed "<size name>.<format>", each fitting in
+    a `sizes[name]` pixels square. The EXIF orientation is applied and no
+    metadata (GPS position, camera, ...) is written to the copies.
+
+    JPEGs are decoded straight at a reduced scale (`draft`), which skips most
+    of the decoding work of large photos. CPU bound: run it in a process pool.
+    """
+    largest = max(sizes.values())
+    with Image.open(io.BytesIO(data)) as image:
+        image.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+
+        variants = {}
+        # Largest first, each size reduced from the previous one
+        for name, size in sorted(sizes.items(), key=lambda item: -item[1]):
+            image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            for fmt in formats:
+                buffer = io.BytesIO()
+                image.save(buffer, format=fmt.upper(), quality=quality, optimize=fmt == "jpeg")
+                variants[f"{name}.{fmt}"] = (buffer.getvalue(), CONTENT_TYPES[fmt])
+        return variants
@@ -0,0 +1,92 @@
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from app.utils.geospatial import EARTH_RADIUS_M
+
+
+def haversine_matrix(lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Pairwise great-circle distances in meters, computed in one vectorized pass"""
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lngs, dtype=np.float64))
+    d_phi = phi[:, None] - phi[None, :]
+    d_lam = lam[:, None] - lam[None, :]
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(d_lam / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def nearest_neighbour_tour(distances: np.ndarray, start: int = 0) -> List[int]:
+    """Greedy open path visiting every node once, starting at `start`"""
+    n = len(distances)
+    visited = np.zeros(n, dtype=bool)
+    tour = [start]
+    visited[start] = True
+    for _ in range(n - 1):
+        row = np.where(visited, np.inf, distances[tour[-1]])
+        nxt = int(np.argmin(row))
+        tour.append(nxt)
+        visited[nxt] = True
+    return tour
+
+
+def two_opt(distances: np.ndarray, tour: List[int], max_passes: int = 50) -> List[int]:
+    """
+    Improve an open path by segment reversal, keeping the first node fixed.
+    For each segment start every candidate end is evaluated at once with NumPy.
+    """
+    n = len(tour)
+    if n < 4:
+        return list(tour)
+    # A virtual end node at distance 0 from everything turns the open path into a cycle
+    padded = np.zeros((len(distances) + 1, len(distances) + 1))
+    padded[:-1, :-1] = distances
+    route = np.array(list(tour) + [len(distances)])
+
+    for _ in range(max_passes):
+        improved = False
+        for i in range(1, n - 1):
+            a, b = route[i - 1], route[i]
+            c = route[i + 1:n]
+            d = route[i + 2:n + 1]
+            delta = padded[a, c] + padded[b, d] - padded[a, b] - padded[c, d]
+            j = int(np.argmin(delta))
+            if delta[j] < -1e-6:
+                end = i + 1 + j
+                route[i:end + 1] = route[i:end + 1][::-1]
+                improved = True
+        if not improved:
+            break
+    return route[:-1].tolist()
+
+
+def path_length(distances: np.ndarray, tour: Sequence[int]) -> float:
+    tour = np.asarray(tour)
+    return float(distances[tour[:-1], tour[1:]].sum()) if len(tour) > 1 else 0.0
+
+
+def plan_route(
+        lats: Sequence[float],
+        lngs: Sequence[float],
+        start: Optional[tuple] = None
+) -> tuple:
+    """
+    Visiting order of the given stops (nearest neighbour + 2-opt).
+    With `start` = (lat, lng) the path begins there; returns (order, legs) where
+    `order` indexes the stops and `legs[k]` is the distance in meters to stop `order[k]`.
+    """
+    lats, lngs = list(lats), list(lngs)
+    if not lats:
+        return [], []
+    offset = 0
+    if start is not None:
+        lats, lngs = [start[0]] + lats, [start[1]] + lngs
+        offset = 1
+
+    distances = haversine_matrix(lats, lngs)
+    # Without a depot, start from the most outlying stop rather than an arbitrary one
+    first = 0 if start is not None else int(np.argmax(distances.sum(axis=1)))
+    tour = two_opt(distances, nearest_neighbour_tour(distances, first))
+
+    legs = [0.0] + [float(distances[tour[k - 1], tour[k]]) for k in range(1, len(tour))]
+    order = [node - offset for node in tour[offset:]]
+    return order, legs[offset:]
@@ -0,0 +1,66 @@
+import math
+from typing import Dict, Iterable, Optional
+
+
+class LogSketch:
+    """
+    Mergeable quantile sketch with relative-error guarantees (DDSketch style).
+
+    Values are counted in logarithmic bins: every value in bin `k` lies in
+    (gamma^(k-1), gamma^k], so any quantile is returned within
+    `relative_accuracy` of the true value. A sketch is just {bin: count}:
+    merging two sketches sums their bins and adding a value is a single
+    increment, which lets rollup documents maintain sketches with `$inc`.
+    The number of bins grows with log(max / min), e.g. ~430 bins cover
+    1 second to 1 year at 2% accuracy.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, bins: Optional[Dict[int, int]] = None):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: Dict[int, int] = {}
+        if bins:
+            self.merge(bins)
+
+    def key(self, value: float) -> int:
+        """Bin of a value; values below 1 share bin 0"""
+        return max(0, math.ceil(math.log(max(value, 1.0)) / self.log_gamma))
+
+    def add(self, value: float, count: int = 1) -> None:
+        k = self.key(value)
+        self.bins[k] = self.bins.get(k, 0) + count
+
+    def merge(self, other) -> None:
+        bins = other.bins if isinstance(other, LogSketch) else other
+        for k, count in bins.items():
+            k = int(k)
+            self.bins[k] = self.bins.get(k, 0) + count
+
+    @property
+    def count(self) -> int:
+        return sum(count for count in self.bins.values() if count > 0)
+
+    def value(self, k: int) -> float:
+        """Representative value of a bin (minimises the relative error)"""
+        if k == 0:
+            return 1.0
+        return 2 * self.gamma ** k / (self.gamma + 1)
+
+    def quantile(self, q: float) -> Optional[float]:
+        total = self.count
+        if not total:
+            return None
+        rank = q * (total - 1)
+        seen = 0
+        for k in sorted(self.bins):
+            count = self.bins[k]
+            if count <= 0:
+                continue
+            seen += count
+            if seen > rank:
+                return self.value(k)
+        return self.value(max(self.bins))
+
+    def quantiles(self, qs: Iterable[float]) -> Dict[str, Optional[float]]:
+        return {f"p{round(q * 100):g}": self.quantile(q) for q in qs}
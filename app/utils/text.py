@@ -0,0 +1,31 @@
+import re
+import unicodedata
+from typing import Set
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase, accents stripped, words separated by single spaces"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    ascii_text = "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+    return " ".join(WORD_PATTERN.findall(ascii_text))
+
+
+def trigrams(text: str) -> Set[str]:
+    text = normalize(text)
+    if not text:
+        return set()
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: str, b: str) -> float:
+    """
+    Jaccard similarity of character trigrams, in [0, 1]. Tolerant to typos,
+    accents and word order ("Lampadaire cassé" ~ "lampadaire casse rue 12").
+    """
+    grams_a, grams_b = trigrams(a), trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
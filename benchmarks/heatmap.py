@@ -0,0 +1,62 @@
+"""
+Heatmap tile benchmark: direct cell computation + bincount against
+numpy.histogram2d and a pure Python loop, on random points around a city.
+
+    python -m benchmarks.heatmap [points ...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from app.utils.heatmap import density_grid, mercator
+
+# Zoom 11 tile covering the sample area
+Z, X, Y, SIZE = 11, 1037, 987, 256
+
+
+def histogram2d_grid(mx, my, mask):
+    scale = 2 ** Z
+    grid, _, _ = np.histogram2d(
+        my[mask], mx[mask],
+        bins=SIZE,
+        range=[[Y / scale, (Y + 1) / scale], [X / scale, (X + 1) / scale]]
+    )
+    return grid
+
+
+def python_grid(mx, my, mask):
+    scale = 2 ** Z * SIZE
+    grid = [[0] * SIZE for _ in range(SIZE)]
+    for px, py, keep in zip(mx.tolist(), my.tolist(), mask.tolist()):
+        col, row = int(px * scale - X * SIZE), int(py * scale - Y * SIZE)
+        if keep and 0 <= col < SIZE and 0 <= row < SIZE:
+            grid[row][col] += 1
+    return grid
+
+
+def timed(fn, *args, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best * 1000
+
+
+def main(sizes):
+    rng = np.random.default_rng(42)
+    print(f"{'points':>9} {'bincount':>9} {'hist2d':>9} {'python':>9}  (ms, one 256x256 tile, 1 filter)")
+    for n in sizes:
+        mx, my = mercator(6.3 + rng.random(n) * 0.3, 2.2 + rng.random(n) * 0.4)
+        categories = rng.integers(0, 5, n).astype(np.int8)
+        mask = categories == 1
+        fast = timed(lambda: density_grid(mx, my, Z, X, Y, SIZE, mask=categories == 1))
+        hist = timed(lambda: histogram2d_grid(mx, my, categories == 1))
+        slow = timed(python_grid, mx, my, mask, repeat=1)
+        assert density_grid(mx, my, Z, X, Y, SIZE, mask=mask).sum() == histogram2d_grid(mx, my, mask).sum()
+        print(f"{n:>9} {fast:>9.1f} {hist:>9.1f} {slow:>9.1f}")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100_000, 1_000_000])
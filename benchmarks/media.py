@@ -0,0 +1,75 @@
+"""
+Photo variant benchmark: make_variants (reduced-scale JPEG decoding) against
+a plain full decode + resize, then make_variants in a process pool.
+
+    python -m benchmarks.media [images] [processes]
+"""
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from app.utils.images import make_variants
+
+SIZES = {"thumbnail": 320, "medium": 1280}
+FORMATS = ("webp", "jpeg")
+
+
+def sample_photo(seed: int, width: int = 4032, height: int = 3024) -> bytes:
+    """A 12 MP JPEG with smooth gradients and sensor-like noise, about 3-4 MB"""
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = np.stack([x / width * 200, y / height * 200, (x + y) / (width + height) * 255], axis=-1)
+    pixels = np.clip(base + rng.normal(0, 12, base.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=92)
+    return buffer.getvalue()
+
+
+def full_decode_variants(data: bytes) -> dict:
+    variants = {}
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        for name, size in SIZES.items():
+            copy = image.copy()
+            copy.thumbnail((size, size), Image.Resampling.LANCZOS)
+            for fmt in FORMATS:
+                buffer = io.BytesIO()
+                copy.save(buffer, format=fmt.upper(), quality=80)
+                variants[f"{name}.{fmt}"] = buffer.getvalue()
+    return variants
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else min(4, os.cpu_count() or 1)
+    photos = [sample_photo(seed) for seed in range(4)]
+    images = [photos[i % len(photos)] for i in range(count)]
+    print(f"{count} photos of {sum(map(len, photos)) / len(photos) / 1e6:.1f} MB, {os.cpu_count()} CPUs")
+
+    started = time.perf_counter()
+    for data in images:
+        full_decode_variants(data)
+    baseline = time.perf_counter() - started
+    print(f"full decode + resize   {count / baseline:6.1f} photos/s")
+
+    started = time.perf_counter()
+    for data in images:
+        make_variants(data, SIZES, FORMATS)
+    serial = time.perf_counter() - started
+    print(f"make_variants          {count / serial:6.1f} photos/s  ({baseline / serial:.1f}x)")
+
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        list(pool.map(make_variants, images[:processes], [SIZES] * processes, [FORMATS] * processes))  # warm up
+        started = time.perf_counter()
+        list(pool.map(make_variants, images, [SIZES] * count, [FORMATS] * count))
+        pooled = time.perf_counter() - started
+    print(f"make_variants x{processes} proc  {count / pooled:6.1f} photos/s  ({baseline / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,12 @@ from fastapi.routing import APIRoute
 from starlette.middleware.cors import CORSMiddleware
 
 from app.api.main import api_router
+from app.api.v1.services.events import event_hub
+from app.api.v1.services.notifications import notification_dispatcher
+from app.api.v1.services.tracking import position_tracker
+from app.api.v1.services.votes import vote_counter
 from app.core.configs import settings
+from app.db.indexes import ensure_indexes
 from app.db.mongodb import connect_to_db, close_db_connection
 
 
@@ -38,10 +43,19 @@ if settings.BACKEND_CORS_ORIGINS:
 @app.on_event("startup")
 async def startup_db_client():
     await connect_to_db()
+    await ensure_indexes()
+    await position_tracker.start()
+    vote_counter.start()
+    notification_dispatcher.start()
+    event_hub.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await vote_counter.stop()
+    await notification_dispatcher.stop()
+    await event_hub.stop()
+    await position_tracker.stop()
     await close_db_connection()
 
 
@@ -0,0 +1,15 @@
+import os
+
+# Settings required by app.core.configs, for tests that never reach Mongo, S3 or SMTP
+for name, value in {
+    "PROJECT_NAME": "test",
+    "ADMIN_EMAIL": "admin@example.com",
+    "MONGO_DATABASE_NAME": "test",
+    "AWS_ACCESS_KEY_ID": "test",
+    "AWS_SECRET_ACCESS_KEY": "test",
+    "AWS_STORAGE_BUCKET_NAME": "test",
+    "AWS_STORAGE_ENDPOINT_URL": "http://s3.test",
+    "EMAIL_FROM": "noreply@example.com",
+    "EMAIL_SERVER": "localhost",
+}.items():
+    os.environ.setdefault(name, value)
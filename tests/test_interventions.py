@@ -0,0 +1,14 @@
+from app.db.managers.interventions import InterventionManager
+
+
+def test_successed_stays_completed():
+    assert InterventionManager.counter_deltas("COMPLETED", "SUCCESSED") == {"total": 0, "completed": 0, "in_progress": 0}
+
+
+def test_counter_deltas_round_trip():
+    path = [None, "SCHEDULED", "IN_PROGRESS", "COMPLETED", "SUCCESSED"]
+    totals = {"total": 0, "completed": 0, "in_progress": 0}
+    for old, new in zip(path, path[1:]):
+        for counter, delta in InterventionManager.counter_deltas(old, new).items():
+            totals[counter] += delta
+    assert totals == {"total": 1, "completed": 1, "in_progress": 0}
@@ -0,0 +1,25 @@
+from app.api.v1.services.media_urls import MediaUrlService
+from app.core.configs import settings
+from app.db.models.interventions import Intervention
+
+
+def test_sign_interventions_signs_photos_and_variants():
+    stored = f"{settings.AWS_STORAGE_ENDPOINT_URL}/{settings.AWS_STORAGE_BUCKET_NAME}/content/ab/abc.jpg"
+    variant = f"{settings.AWS_STORAGE_ENDPOINT_URL}/{settings.AWS_STORAGE_BUCKET_NAME}/content/ab/abc-thumbnail.webp"
+    intervention = Intervention(
+        report_id="65f000000000000000000001",
+        technician_ids=[],
+        title="Fix",
+        description="Fix it",
+        priority="HIGH",
+        photos=[
+            {"type": "progress", "url": stored, "thumbnail": variant, "variants": {"thumbnail.webp": variant}},
+            {"type": "progress", "url": "https://elsewhere.test/photo.jpg"},
+        ]
+    )
+    MediaUrlService().sign_intervention(intervention)
+    signed, external = intervention.photos
+    assert signed["url"].startswith(stored + "?") and "X-Amz-Signature=" in signed["url"]
+    assert signed["thumbnail"].startswith(variant + "?")
+    assert signed["variants"]["thumbnail.webp"] == signed["thumbnail"]
+    assert external == {"type": "progress", "url": "https://elsewhere.test/photo.jpg"}
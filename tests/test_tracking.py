@@ -0,0 +1,36 @@
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+
+from app.api.v1.services.tracking import PositionTracker
+
+
+class FailingPositionManager:
+    async def insert_pings(self, docs):
+        raise ConnectionError("mongo is down")
+
+    async def save_last_positions(self, positions):
+        pass
+
+
+def test_failed_flush_drops_the_oldest_pings():
+    tracker = PositionTracker()
+    tracker.position_manager = FailingPositionManager()
+    tracker.buffer = deque(maxlen=5)
+    start = datetime(2026, 1, 1)
+    batch = [{"recorded_at": start + timedelta(seconds=i)} for i in range(4)]
+    newer = [{"recorded_at": start + timedelta(seconds=i)} for i in range(4, 7)]
+
+    async def flush_while_receiving():
+        tracker.buffer.extend(batch)
+        original = tracker.position_manager.insert_pings
+
+        async def insert_pings(docs):
+            tracker.buffer.extend(newer)  # pings received while the write is pending
+            await original(docs)
+
+        tracker.position_manager.insert_pings = insert_pings
+        return await tracker.flush()
+
+    assert asyncio.run(flush_while_receiving()) == 0
+    assert list(tracker.buffer) == batch[2:] + newer
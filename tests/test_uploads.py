@@ -0,0 +1,43 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.api.v1.services.uploads import avatar_upload, report_media_upload
+from app.core.configs import settings
+from main import app
+
+REPORT_ID = "5f0000000000000000000000"
+JPEG_HEADER = b"\xff\xd8\xff\xe0\x00\x10JFIF\x00"
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def multipart(field: str, size: int) -> dict:
+    return {field: ("photo.jpg", JPEG_HEADER + b"\x00" * (size - len(JPEG_HEADER)), "image/jpeg")}
+
+
+def test_limits_are_in_bytes():
+    assert settings.MAX_UPLOAD_SIZE == 10 * 1024 * 1024
+    assert report_media_upload.max_bytes == settings.MAX_UPLOAD_SIZE
+    assert avatar_upload.max_bytes == settings.MAX_AVATAR_SIZE == 5 * 1024 * 1024
+
+
+def test_report_media_over_limit_is_rejected(client):
+    response = client.post(f"/api/v1/reports/{REPORT_ID}/media", files=multipart("media_file", 11 * 1024 * 1024))
+    assert response.status_code == 413
+
+
+def test_report_media_over_limit_without_content_length_is_rejected(client):
+    body = b"".join(
+        [b"--b\r\nContent-Disposition: form-data; name=\"media_file\"; filename=\"photo.jpg\"\r\n",
+         b"Content-Type: image/jpeg\r\n\r\n", JPEG_HEADER, b"\x00" * (11 * 1024 * 1024), b"\r\n--b--\r\n"]
+    )
+    chunks = (body[i:i + 64 * 1024] for i in range(0, len(body), 64 * 1024))
+    response = client.post(
+        f"/api/v1/reports/{REPORT_ID}/media",
+        content=chunks,
+        headers={"content-type": "multipart/form-data; boundary=b"}
+    )
+    assert response.status_code == 413